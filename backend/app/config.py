@@ -14,14 +14,62 @@ class Settings(BaseSettings):
     
     # Rate Limiting
     RATE_LIMIT_PER_SECOND: int = 10
+    BATCH_MAX_QUERIES: int = 50  # Queries accepted by one /search/batch or /recommend/batch call
+    RATE_LIMIT_BATCH_QUERIES_PER_SECOND: int = 100  # Batch queries per IP per second, across both batch routes
     
     # SciBERT Service
     SCIBERT_URL: str = "http://scibert:8080"
+    SCIBERT_MAX_CONNECTIONS: int = 16  # Pooled keep-alive connections per worker
     
     # Model Configuration
     MODEL_BATCH_SIZE: int = 32
     MODEL_MAX_LENGTH: int = 512
     
+    # Summarization (Hugging Face Inference API)
+    SUMMARIZER_TIMEOUT: float = 30.0  # Seconds allowed for one summarization call
+    SUMMARIZER_MAX_CONNECTIONS: int = 20  # Pooled keep-alive connections per worker
+    DESCRIBE_DEADLINE: float = 10.0  # Seconds budgeted for a whole /describe request
+    SUMMARY_CACHE_PATH: str = "data/summaries.sqlite"  # Summaries shared by all workers, "" keeps them in memory only
+    SUMMARY_CACHE_SIZE: int = 1024  # Summaries held in each worker's in-memory LRU
+    SUMMARY_CACHE_MAX_ROWS: int = 100000  # Summaries kept in the shared file, newest first; 0 = unbounded
+    
+    # Redis (coordinates summarization calls across workers)
+    REDIS_HOST: str = ""  # Empty coalesces identical summarizations per worker only
+    REDIS_PORT: int = 6379
+    REDIS_PASSWORD: str = ""
+    
+    # Semantic Search
+    EMBEDDING_DTYPE: str = "float16"  # Storage type of the embedding memmap: float16 or float32
+    ANN_MIN_ROWS: int = 20000  # Embedding jobs build the IVF index from this many rows up
+    ANN_LISTS: int = 0  # IVF lists, 0 = 4 * sqrt(rows)
+    ANN_PQ_SUBVECTORS: int = 0  # Product quantization subvectors, 0 = rescore candidates exactly
+    ANN_NPROBE: int = 16  # Default IVF lists scanned per semantic query, 0 = exact search
+    ANN_REFINE: int = 256  # Candidates rescored exactly after product quantization
+    HYBRID_CANDIDATES: int = 100  # Results taken from each ranking before fusion in mode=hybrid
+    HYBRID_RRF_K: int = 60  # Reciprocal rank fusion constant; larger flattens rank differences
+    HYBRID_EMBED_TIMEOUT: float = 2.0  # Seconds mode=hybrid waits for the query embedding before serving keywords alone
+    HYBRID_FALLBACK_LOG_INTERVAL: float = 60.0  # Seconds between warnings that mode=hybrid served keywords alone
+    
+    # Dataset Loading
+    DATA_SOURCE: str = "data/nasa_bio_data.json"  # JSON/JSONL file, or a directory of shards
+    LOADER_WORKERS: int = 0  # Processes parsing shards, 0 = one per CPU
+    SEARCH_BACKEND: str = "memory"  # "memory", or "sqlite" to serve from a shared on-disk index
+    DEDUP_THRESHOLD: float = 0.9  # Estimated Jaccard similarity that collapses records, 0 disables
+    
+    # Dataset Reload
+    ADMIN_TOKEN: str = ""  # Enables /admin endpoints when set
+    DATA_RELOAD_INTERVAL: float = 0  # Seconds between data file checks, 0 disables
+    
+    # Recommendations
+    NEIGHBORS: int = 10  # Precomputed most-similar datasets per dataset
+    TOPIC_NEIGHBORS: int = 20  # Related keywords kept per keyword in the co-occurrence graph
+    TOPIC_EXPANSION: int = 3  # Related keywords added to free-text /recommend queries, 0 disables
+    TOPIC_EXPANSION_WEIGHT: float = 0.5  # Term weight of expansion keywords relative to the query's
+    
+    # Search Ranking (BM25F)
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -30,4 +78,4 @@ class Settings(BaseSettings):
 def get_settings():
     return Settings()
 
-settings = get_settings()pip
\ No newline at end of file
+settings = get_settings()
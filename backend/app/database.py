@@ -1,53 +1,418 @@
-import json
+import sqlite3
+import threading
+import time
 from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-def load_data():
+from app.config import settings
+from app.utils.ann import build_ann
+from app.utils.autocomplete import PHRASE_FIELDS, TERM_FIELDS, Autocomplete
+from app.utils.dedup import (
+    BAND_ROWS,
+    DEDUP_FIELDS,
+    MAX_BUCKET_PAIRS,
+    NUM_PERM,
+    SHINGLE_SIZE,
+    DuplicateIndex,
+)
+from app.utils.embeddings import (
+    EmbeddingIndex,
+    SciBertClient,
+    build_embeddings,
+    embedding_text,
+    open_embeddings,
+)
+from app.utils.facets import FACET_FIELDS, FacetIndex
+from app.utils.fuzzy import FUZZY_FIELDS, TrigramIndex
+from app.utils.indexing import InvertedIndex
+from app.utils.ranking import FIELD_WEIGHTS, BM25Ranker
+from app.utils.loader import load_segments, shard_paths
+from app.utils.neighbors import NeighborTable
+from app.utils.serialization import RecordFragments
+from app.utils.similarity import SIMILARITY_FIELDS, TfidfModel
+from app.utils.snapshot import fingerprint, read_snapshot, write_snapshot
+from app.utils.sqlite_index import (
+    SqliteAutocomplete,
+    SqliteDatabase,
+    SqliteFacetIndex,
+    SqliteFragments,
+    SqliteHashes,
+    SqliteIndex,
+    SqliteRanker,
+    SqliteRecords,
+    SqliteTrigramIndex,
+    build_database,
+    load_duplicates,
+    load_neighbors,
+    load_similarity,
+    load_topics,
+    open_database,
+)
+from app.utils.store import LOWERCASE_FIELDS, RecordStore
+from app.utils.topics import MIN_COOCCURRENCE, KeywordGraph
+
+DATA_PATH = Path(settings.DATA_SOURCE)
+SNAPSHOT_PATH = DATA_PATH.with_suffix(".snapshot")
+SQLITE_PATH = DATA_PATH.with_suffix(".sqlite")
+EMBEDDINGS_PATH = DATA_PATH.with_suffix(".embeddings.npy")
+ANN_PATH = DATA_PATH.with_suffix(".ann")
+
+class DataState(NamedTuple):
+    """
+    Everything a request reads, swapped as one reference on reload so
+    in-flight requests keep a consistent view.
+    """
+    store: RecordStore
+    index: InvertedIndex
+    ranker: BM25Ranker
+    facets: FacetIndex
+    fuzzy: TrigramIndex
+    autocomplete: Autocomplete
+    similarity: TfidfModel
+    neighbors: NeighborTable
+    topics: KeywordGraph
+    duplicates: DuplicateIndex
+    fragments: RecordFragments
+    digest: bytes
+    hashes: Dict[str, str]  # record id -> content hash
+    embeddings: Optional[EmbeddingIndex] = None  # attached after load, never snapshotted
+
+def load_data() -> Tuple[RecordStore, List[str]]:
     """
-    Load preprocessed NASA bio data from JSON file.
-    Validates and cleans data to prevent null-related issues.
+    Load preprocessed NASA bio data from the JSON file or shard directory.
+
+    Shards (JSON arrays or JSON lines) are streamed, normalized to the schema
+    in utils/schema.py and column-encoded in a process pool, then merged into
+    one store, so the raw corpus is never held in memory at once.
+    Returns the store and the content hash of each record.
     """
-    data_path = Path("data/nasa_bio_data.json")
+    paths = shard_paths(DATA_PATH)
     
-    if not data_path.exists():
-        print(f"⚠️ Warning: Data file not found at {data_path.resolve()}")
+    if not paths:
+        print(f"⚠️ Warning: No data found at {DATA_PATH.resolve()}")
         print("⚠️ Starting with empty dataset. Add nasa_bio_data.json to continue.")
-        return []
+        return RecordStore(()), []
     
-    try:
-        with open(data_path, "r", encoding="utf-8") as f:
-            raw_data = json.load(f)
-        
-        # Validate and clean data
-        cleaned_data = []
-        for item in raw_data:
-            # Ensure required fields exist
-            if not isinstance(item, dict):
+    hashes: List[str] = []
+    
+    def merged_segments():
+        for segment in load_segments(paths, settings.LOADER_WORKERS):
+            if segment.error:
+                print(f"❌ Error: Invalid data in {segment.path}: {segment.error}")
                 continue
-            
-            # Add defaults for missing fields
-            cleaned_item = {
-                "id": item.get("id", "unknown"),
-                "title": item.get("title", "Untitled Dataset"),
-                "domain": item.get("domain", None),
-                "description": item.get("description", ""),
-                "keywords": item.get("keywords") if isinstance(item.get("keywords"), list) else [],
-                "data_url": item.get("data_url", None),
-                "data_type": item.get("data_type", None),
-                "release_date": item.get("release_date", None),
-                "authors": item.get("authors") if isinstance(item.get("authors"), list) else [],
-                "variables": item.get("variables") if isinstance(item.get("variables"), list) else []
-            }
-            
-            cleaned_data.append(cleaned_item)
-        
-        print(f"✅ Loaded {len(cleaned_data)} datasets successfully")
-        return cleaned_data
-        
-    except json.JSONDecodeError as e:
-        print(f"❌ Error: Invalid JSON in {data_path}: {e}")
-        return []
+            if segment.skipped:
+                print(f"⚠️ Warning: Skipped {segment.skipped} invalid entries in {segment.path}")
+            hashes.extend(segment.hashes)
+            yield segment.store
+    
+    try:
+        store = RecordStore.merge(merged_segments())
     except Exception as e:
         print(f"❌ Error loading data: {e}")
-        return []
+        return RecordStore(()), []
+    
+    print(f"✅ Loaded {len(store)} datasets from {len(paths)} file(s) successfully")
+    return store, hashes
+
+def build_state(
+    store: RecordStore,
+    hashes: List[str],
+    digest: bytes = b"",
+    previous: Optional[DataState] = None,
+) -> DataState:
+    """
+    Build the search structures routes query instead of scanning records
+    over a loaded store, keyed for reload diffs by record ID. Near-duplicate
+    records are first collapsed into their earliest copy. Given the
+    previous state, only changed records are re-signed for deduplication
+    and the neighbor table is only recomputed where records changed.
+    """
+    duplicates = DuplicateIndex.build(
+        store, hashes, settings.DEDUP_THRESHOLD, previous.duplicates if previous else None
+    )
+    if len(duplicates.kept) < len(store):
+        store = store.take(duplicates.kept)
+        hashes = [hashes[i] for i in duplicates.kept]
+        print(f"🧬 Collapsed {len(duplicates.leaders) - len(store)} near-duplicate datasets")
+    if len(duplicates.flagged):
+        print(f"⚠️ {len(duplicates.flagged)} new datasets are possible duplicates: "
+              f"{', '.join(duplicates.ids[i] or '?' for i in duplicates.flagged[:10])}")
+    
+    by_id = {}
+    for record_id, content_hash in zip(store.text["id"], hashes):
+        # Disambiguate repeated IDs (e.g. "unknown") by occurrence
+        key, n = record_id, 1
+        while key in by_id:
+            key, n = f"{record_id}#{n}", n + 1
+        by_id[key] = content_hash
+    
+    similarity = TfidfModel(store)
+    if previous is None:
+        neighbors = NeighborTable.build(similarity, settings.NEIGHBORS)
+    else:
+        neighbors, recomputed = NeighborTable.update(
+            similarity, settings.NEIGHBORS, by_id, previous.neighbors, previous.hashes
+        )
+        print(f"🔁 Recomputed neighbors for {recomputed} of {len(store)} datasets")
+    
+    index = InvertedIndex(store)
+    return DataState(
+        store,
+        index,
+        BM25Ranker(store, substrings=index.substrings),
+        FacetIndex(store),
+        TrigramIndex(store),
+        Autocomplete(store),
+        similarity,
+        neighbors,
+        KeywordGraph.build(store, settings.TOPIC_NEIGHBORS),
+        duplicates,
+        RecordFragments(store),
+        digest,
+        by_id,
+    )
+
+def build_parameters() -> tuple:
+    """
+    Every setting and constant that shapes the built state, so changing
+    any of them invalidates the snapshot and the SQLite index. Query-time
+    settings are left out.
+    """
+    return (
+        ("bm25", settings.BM25_K1, settings.BM25_B, FIELD_WEIGHTS),
+        ("dedup", settings.DEDUP_THRESHOLD, DEDUP_FIELDS, NUM_PERM, BAND_ROWS, SHINGLE_SIZE,
+         MAX_BUCKET_PAIRS),
+        ("tfidf", SIMILARITY_FIELDS, settings.NEIGHBORS),
+        ("topics", settings.TOPIC_NEIGHBORS, MIN_COOCCURRENCE),
+        ("fields", FACET_FIELDS, FUZZY_FIELDS, TERM_FIELDS, PHRASE_FIELDS, LOWERCASE_FIELDS),
+    )
+
+def source_digest() -> bytes:
+    return fingerprint(shard_paths(DATA_PATH), *build_parameters())
+
+def sqlite_state(db: SqliteDatabase) -> DataState:
+    """
+    Dataset state served from a SQLite index file: the same interfaces as
+    the in-memory structures, queried through this worker's connection.
+    """
+    return DataState(
+        SqliteRecords(db),
+        SqliteIndex(db),
+        SqliteRanker(db),
+        SqliteFacetIndex(db),
+        SqliteTrigramIndex(db),
+        SqliteAutocomplete(db),
+        load_similarity(db),
+        load_neighbors(db),
+        load_topics(db),
+        load_duplicates(db),
+        SqliteFragments(db),
+        db.digest,
+        SqliteHashes(db),
+    )
+
+def load_sqlite_state(digest: bytes, previous: Optional[DataState] = None) -> DataState:
+    """
+    Open the shared SQLite index, building it from the source files first if
+    it is missing or stale. Falls back to in-memory indexes if it cannot be
+    built here.
+    """
+    db = open_database(SQLITE_PATH, digest)
+    if db is None:
+        state = build_state(*load_data(), digest, previous)
+        if not len(state.store):
+            return state
+        try:
+            build_database(SQLITE_PATH, state, digest)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ Warning: Could not build SQLite index {SQLITE_PATH}: {e}")
+            print("⚠️ Serving from in-memory indexes instead.")
+            return state
+        del state
+        print(f"✅ Built SQLite index at {SQLITE_PATH}")
+        db = open_database(SQLITE_PATH, digest)
+    print(f"✅ Serving {db.size} datasets from SQLite index")
+    return sqlite_state(db)
+
+def content_hashes(state: DataState) -> List[str]:
+    """Content hash of each record, in position order."""
+    return [content_hash for _, content_hash in state.hashes.items()]
 
-DATA = load_data()
+def load_state(previous: Optional[DataState] = None) -> DataState:
+    """
+    Load the dataset state and attach the semantic embedding index, if one
+    has been built. `previous` lets a reload reuse work for unchanged records.
+    """
+    state = load_indexes(previous)
+    return state._replace(
+        embeddings=open_embeddings(EMBEDDINGS_PATH, content_hashes(state), ANN_PATH)
+    )
+
+def load_indexes(previous: Optional[DataState] = None) -> DataState:
+    """
+    Load records and prebuilt indexes from the compiled snapshot, rebuilding
+    it from the source files whenever their hash changes. With
+    SEARCH_BACKEND=sqlite, serve from the shared SQLite index instead.
+    """
+    if not shard_paths(DATA_PATH):
+        return build_state(*load_data())
+    
+    digest = source_digest()
+    if settings.SEARCH_BACKEND == "sqlite":
+        return load_sqlite_state(digest, previous)
+    
+    snapshot = read_snapshot(SNAPSHOT_PATH, digest)
+    if snapshot is not None:
+        print(f"✅ Loaded {len(snapshot.store)} datasets from snapshot")
+        return snapshot
+    
+    store, hashes = load_data()
+    state = build_state(store, hashes, digest, previous)
+    if len(store) and write_snapshot(SNAPSHOT_PATH, digest, state):
+        print(f"✅ Compiled snapshot to {SNAPSHOT_PATH}")
+    return state
+
+_state = load_state()
+_reload_lock = threading.Lock()
+last_reload: Dict[str, object] = {}
+
+def get_state() -> DataState:
+    """
+    Current dataset state. Read it once per request and use that reference
+    throughout, so a concurrent reload never mixes old and new indexes.
+    """
+    return _state
+
+def diff_hashes(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    """Record IDs added, changed and removed between two states."""
+    return {
+        "added": sorted(new.keys() - old.keys()),
+        "changed": sorted(k for k in new.keys() & old.keys() if new[k] != old[k]),
+        "removed": sorted(old.keys() - new.keys()),
+    }
+
+def reload_data() -> Optional[Dict[str, object]]:
+    """
+    Rebuild the dataset state from disk and swap it in atomically.
+
+    Requests keep serving the old state while the new one is built. Any
+    record change rebuilds the store, inverted index, ranker, facets and
+    autocomplete in full; only near-duplicate signatures and neighbor
+    rows of unchanged records are carried over. If the source file
+    changed but no record did, the existing indexes stay in service. The
+    added/changed/removed IDs are reported, not applied one by one.
+    Returns a summary of the diff, or None if a reload is already running.
+    """
+    global _state
+    
+    if not _reload_lock.acquire(blocking=False):
+        return None
+    try:
+        started = time.time()
+        old = _state
+        new = load_state(previous=old)
+        diff = diff_hashes(old.hashes, new.hashes)
+        swapped = any(diff.values()) or len(new.store) != len(old.store)
+        if swapped:
+            _state = new
+        else:
+            # Records that only added aliases leave every index unchanged
+            _state = old._replace(digest=new.digest, duplicates=new.duplicates)
+        
+        result = {
+            "swapped": swapped,
+            "datasets": len(_state.store),
+            "added": len(diff["added"]),
+            "changed": len(diff["changed"]),
+            "removed": len(diff["removed"]),
+            "diff": diff,
+            "possible_duplicates": [new.duplicates.ids[i] for i in new.duplicates.flagged],
+            "duration": round(time.time() - started, 3),
+            "finished_at": time.time(),
+        }
+        last_reload.clear()
+        last_reload.update(result)
+        print(
+            f"🔄 Reloaded datasets: +{result['added']} ~{result['changed']} "
+            f"-{result['removed']} in {result['duration']}s"
+        )
+        return result
+    finally:
+        _reload_lock.release()
+
+_embed_lock = threading.Lock()
+
+def embed_data() -> Optional[Dict[str, object]]:
+    """
+    Embed every record whose content hash has no vector yet with the
+    SciBERT service, rewrite the embedding matrix, and attach it to the
+    current state. From ANN_MIN_ROWS rows up, the IVF index is rebuilt too
+    whenever it no longer matches the matrix. Returns a summary, or None if
+    a job is already running.
+    """
+    global _state
+    
+    if not _embed_lock.acquire(blocking=False):
+        return None
+    try:
+        started = time.time()
+        state = _state
+        reused, embedded = build_embeddings(
+            EMBEDDINGS_PATH,
+            content_hashes(state),
+            lambda pos: embedding_text(state.store.record(pos)),
+            SciBertClient().embed_batch,
+        )
+        embeddings = open_embeddings(EMBEDDINGS_PATH, content_hashes(state), ANN_PATH)
+        if embeddings and embeddings.ann is None and len(embeddings.matrix) >= settings.ANN_MIN_ROWS:
+            meta = build_ann(
+                EMBEDDINGS_PATH, ANN_PATH, settings.ANN_LISTS, settings.ANN_PQ_SUBVECTORS
+            )
+            print(f"🧭 Built ANN index: {meta['nlist']} lists over {meta['rows']} embeddings")
+        with _reload_lock:
+            # Rows are matched by content hash, so a state swapped in by a
+            # reload meanwhile still lines up
+            _state = _state._replace(
+                embeddings=open_embeddings(EMBEDDINGS_PATH, content_hashes(_state), ANN_PATH)
+            )
+        result = {
+            "embedded": embedded,
+            "reused": reused,
+            "searchable": _state.embeddings.count if _state.embeddings else 0,
+            "ann": _state.embeddings is not None and _state.embeddings.ann is not None,
+            "duration": round(time.time() - started, 3),
+        }
+        print(f"🧠 Embedded {embedded} datasets, reused {reused} in {result['duration']}s")
+        return result
+    finally:
+        _embed_lock.release()
+
+def watch_data(interval: float) -> threading.Thread:
+    """
+    Poll the data files and reload in a background thread when any changes.
+    """
+    def source_stat():
+        try:
+            stats = []
+            for path in shard_paths(DATA_PATH):
+                stat = path.stat()
+                stats.append((str(path), stat.st_mtime_ns, stat.st_size))
+            return tuple(stats) or None
+        except FileNotFoundError:
+            return None
+    
+    def loop():
+        seen = source_stat()
+        while True:
+            time.sleep(interval)
+            current = source_stat()
+            if current is not None and current != seen:
+                seen = current
+                try:
+                    reload_data()
+                except Exception as e:
+                    print(f"❌ Error reloading data: {e}")
+    
+    thread = threading.Thread(target=loop, name="data-watcher", daemon=True)
+    thread.start()
+    return thread
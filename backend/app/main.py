@@ -1,14 +1,18 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
-from app.routes import search, recommend, describe, scibert
-from app.database import DATA
+from app.routes import search, recommend, describe, autocomplete, scibert, admin
+from app.database import get_state, watch_data
+from app.utils import embeddings
+from app.utils.summarizer import close_client, summary_cache
 from app.config import settings
 from app.monitoring import setup_monitoring, setup_logging, setup_elasticsearch
 import sys
 from typing import Callable
+import orjson
 import time
 import asyncio
 from cachetools import TTLCache
@@ -21,16 +25,30 @@ logger = logging.getLogger(__name__)
 # Initialize cache
 response_cache = TTLCache(maxsize=100, ttl=settings.CACHE_TTL)
 
+# Routes answering many queries per call, charged per query
+BATCH_PATHS = ("/search/batch", "/recommend/batch")
+
+async def batch_cost(request: Request) -> int:
+    """Queries in a batch request body; malformed bodies cost one and fail validation."""
+    try:
+        queries = orjson.loads(await request.body()).get("queries")
+    except (orjson.JSONDecodeError, AttributeError):
+        return 1
+    return max(len(queries), 1) if isinstance(queries, list) else 1
+
 # Rate limiting middleware
 class RateLimitMiddleware(BaseHTTPMiddleware):
     def __init__(
         self,
         app,
-        calls_per_second: int = settings.RATE_LIMIT_PER_SECOND
+        calls_per_second: int = settings.RATE_LIMIT_PER_SECOND,
+        batch_queries_per_second: int = settings.RATE_LIMIT_BATCH_QUERIES_PER_SECOND
     ):
         super().__init__(app)
         self.calls_per_second = calls_per_second
+        self.batch_queries_per_second = batch_queries_per_second
         self.request_timestamps = {}
+        self.batch_charges = {}  # ip -> [(timestamp, queries)]
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         client_ip = request.client.host
@@ -39,6 +57,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Clean old timestamps
         self.request_timestamps = {ip: ts for ip, ts in self.request_timestamps.items() 
                                  if now - ts[-1] < 1}
+        self.batch_charges = {ip: charges for ip, charges in self.batch_charges.items()
+                              if now - charges[-1][0] < 1}
         
         # Get timestamps for this IP
         timestamps = self.request_timestamps.get(client_ip, [])
@@ -49,6 +69,15 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         if len(timestamps) >= self.calls_per_second:
             return Response("Too many requests", status_code=429)
         
+        # Batch routes also draw one unit per query from their own budget
+        if request.method == "POST" and request.url.path.rstrip("/") in BATCH_PATHS:
+            cost = await batch_cost(request)
+            charges = [c for c in self.batch_charges.get(client_ip, []) if now - c[0] < 1]
+            if sum(n for _, n in charges) + cost > self.batch_queries_per_second:
+                return Response("Too many batch queries", status_code=429)
+            charges.append((now, cost))
+            self.batch_charges[client_ip] = charges
+        
         timestamps.append(now)
         self.request_timestamps[client_ip] = timestamps
         
@@ -59,6 +88,7 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     version="1.0",
     description="Backend for NASA BioVerse project 🚀",
+    default_response_class=ORJSONResponse,
 )
 
 # Add Gzip compression
@@ -86,7 +116,20 @@ es_client = setup_elasticsearch()
 app.include_router(search.router)
 app.include_router(recommend.router)
 app.include_router(describe.router)
+app.include_router(autocomplete.router)
 app.include_router(scibert.router)
+app.include_router(admin.router)
+
+@app.on_event("startup")
+def start_data_watcher():
+    if settings.DATA_RELOAD_INTERVAL > 0:
+        watch_data(settings.DATA_RELOAD_INTERVAL)
+
+@app.on_event("shutdown")
+async def close_summarizer():
+    await close_client()
+    summary_cache.close()
+    embeddings.close_client()
 
 # Add request logging middleware
 @app.middleware("http")
@@ -112,7 +155,7 @@ def root():
     return {
         "message": "BioVerse API is live 🚀",
         "version": "1.0",
-        "endpoints": ["/search", "/recommend", "/describe", "/health"],
+        "endpoints": ["/search", "/recommend", "/describe", "/autocomplete", "/health"],
         "docs": "/docs"
     }
 
@@ -135,12 +178,13 @@ def health_check():
         "status": "healthy",
         "api_version": "1.0",
         "python_version": f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
-        "datasets_loaded": len(DATA),
+        "datasets_loaded": len(get_state().store),
         "summarizer_status": summarizer_status,
         "endpoints": {
             "search": "/search?q=<keyword>",
             "recommend": "/recommend?q=<keyword>",
-            "describe": "/describe?q=<keyword>"
+            "describe": "/describe?q=<keyword>",
+            "autocomplete": "/autocomplete?q=<prefix>"
         }
     }
 
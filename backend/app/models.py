@@ -1,12 +1,18 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, constr
 from typing import List, Optional
 
+from app.config import settings
+
 class Dataset(BaseModel):
     id: str
     title: str
     domain: Optional[str] = None
     description: Optional[str] = None
+    detailed_description: Optional[str] = None
+    organism: Optional[str] = None
+    platform: Optional[str] = None
     keywords: Optional[List[str]] = None
+    source_url: Optional[str] = None
     data_url: Optional[str] = None
     data_type: Optional[str] = None
     release_date: Optional[str] = None
@@ -14,3 +20,25 @@ class Dataset(BaseModel):
     variables: Optional[List[str]] = None
 
 
+
+# Same constraints as the `q` query parameter of /search and /recommend
+BatchQuery = constr(strip_whitespace=True, min_length=1, max_length=200, pattern="^[a-zA-Z0-9\\s\\-_]+$")
+
+class BatchFilters(BaseModel):
+    """Facet filters applied to every query of a batch; fields are ANDed."""
+    organism: Optional[List[str]] = None
+    platform: Optional[List[str]] = None
+    domain: Optional[List[str]] = None
+    data_type: Optional[List[str]] = None
+
+class SearchBatchRequest(BaseModel):
+    queries: List[BatchQuery] = Field(..., min_length=1, max_length=settings.BATCH_MAX_QUERIES)
+    fuzzy: bool = True
+    limit: int = Field(25, ge=1, le=100)
+    filters: BatchFilters = BatchFilters()
+    fields: Optional[str] = None
+
+class RecommendBatchRequest(BaseModel):
+    queries: List[BatchQuery] = Field(..., min_length=1, max_length=settings.BATCH_MAX_QUERIES)
+    filters: BatchFilters = BatchFilters()
+    fields: Optional[str] = None
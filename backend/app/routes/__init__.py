@@ -2,6 +2,6 @@
 API route modules for BioVerse
 """
 
-from . import search, recommend, describe
+from . import search, recommend, describe, autocomplete, admin
 
-__all__ = ["search", "recommend", "describe"]
+__all__ = ["search", "recommend", "describe", "autocomplete", "admin"]
@@ -0,0 +1,86 @@
+import secrets
+
+from fastapi import APIRouter, BackgroundTasks, Header, HTTPException
+
+from app.config import settings
+from app.database import embed_data, get_state, last_reload, reload_data
+from app.utils.summarizer import summary_cache
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+def require_admin(token: str):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not secrets.compare_digest(token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@router.post("/reload", status_code=202)
+def trigger_reload(
+    background_tasks: BackgroundTasks,
+    x_admin_token: str = Header("", description="Value of ADMIN_TOKEN"),
+):
+    """
+    Rebuild the dataset and indexes in the background and swap them in.
+    Only reloads the worker serving this request; set DATA_RELOAD_INTERVAL
+    to have every worker pick up file changes.
+    """
+    require_admin(x_admin_token)
+    background_tasks.add_task(reload_data)
+    return {"status": "reload scheduled"}
+
+@router.get("/reload")
+def reload_status(x_admin_token: str = Header("", description="Value of ADMIN_TOKEN")):
+    """
+    Result of the last reload in this worker.
+    """
+    require_admin(x_admin_token)
+    return {
+        "datasets_loaded": len(get_state().store),
+        "last_reload": last_reload or None,
+    }
+
+@router.post("/embeddings", status_code=202)
+def trigger_embedding(
+    background_tasks: BackgroundTasks,
+    x_admin_token: str = Header("", description="Value of ADMIN_TOKEN"),
+):
+    """
+    Embed new and changed datasets with the SciBERT service in the
+    background and attach the updated index for semantic search. Records
+    whose content hash already has a vector are not re-embedded.
+    """
+    require_admin(x_admin_token)
+    background_tasks.add_task(embed_data)
+    return {"status": "embedding scheduled"}
+
+@router.get("/embeddings")
+def embedding_status(x_admin_token: str = Header("", description="Value of ADMIN_TOKEN")):
+    """
+    Coverage of the semantic index in this worker.
+    """
+    require_admin(x_admin_token)
+    embeddings = get_state().embeddings
+    return {
+        "datasets_loaded": len(get_state().store),
+        "datasets_embedded": embeddings.count if embeddings else 0,
+        "dimensions": embeddings.dim if embeddings else None,
+    }
+
+@router.get("/duplicates")
+def duplicate_report(x_admin_token: str = Header("", description="Value of ADMIN_TOKEN")):
+    """
+    Near-duplicate datasets collapsed at load: each canonical dataset ID
+    with the alias IDs folded into it and their estimated similarity, plus
+    records added at the last reload that turned out to be duplicates.
+    """
+    require_admin(x_admin_token)
+    return get_state().duplicates.report()
+
+@router.get("/summaries")
+def summary_cache_report(x_admin_token: str = Header("", description="Value of ADMIN_TOKEN")):
+    """
+    Summary cache hits (in-memory LRU and shared SQLite file) and misses
+    in this worker, with the number of summaries held in each.
+    """
+    require_admin(x_admin_token)
+    return summary_cache.report()
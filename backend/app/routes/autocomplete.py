@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Query
+from app.database import get_state
+
+router = APIRouter(prefix="/autocomplete", tags=["Autocomplete"])
+
+@router.get("/")
+def autocomplete(
+    q: str = Query(
+        ...,
+        description="Prefix typed so far",
+        min_length=1,
+        max_length=100,
+        pattern="^[a-zA-Z0-9\\s\\-_]+$"
+    ),
+    limit: int = Query(10, ge=1, le=10, description="Maximum suggestions"),
+):
+    """
+    Popularity-ranked completions from titles, keywords and organisms,
+    cheap enough to call on every keystroke.
+    """
+    return {
+        "query": q,
+        "suggestions": get_state().autocomplete.complete(q, limit)
+    }
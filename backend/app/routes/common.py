@@ -0,0 +1,66 @@
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+
+from app.utils.store import FIELDS, LIST_VIEW_FIELDS, SOURCE_FIELDS
+
+def facet_filters(
+    organism: Optional[List[str]] = Query(None, description="Filter by organism (repeat to OR values)"),
+    platform: Optional[List[str]] = Query(None, description="Filter by platform (repeat to OR values)"),
+    domain: Optional[List[str]] = Query(None, description="Filter by domain (repeat to OR values)"),
+    data_type: Optional[List[str]] = Query(None, description="Filter by data type (repeat to OR values)"),
+) -> Dict[str, List[str]]:
+    """
+    Facet filter parameters shared by list endpoints. Different fields are
+    combined with AND.
+    """
+    filters = {
+        "organism": organism,
+        "platform": platform,
+        "domain": domain,
+        "data_type": data_type,
+    }
+    return {field: values for field, values in filters.items() if values}
+
+def parse_fields(fields: Optional[str], default: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Validate a comma-separated `fields` parameter; 'all' selects every field.
+    """
+    if not fields:
+        return default
+    if fields.strip().lower() == "all":
+        return tuple(FIELDS)
+    
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in FIELDS]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown) or fields}. "
+                   f"Available: {', '.join(FIELDS)}"
+        )
+    return requested
+
+def projection(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return, or 'all'. "
+                    "Defaults to every field except detailed_description."
+    ),
+) -> Tuple[str, ...]:
+    """
+    Fields to include in each returned record of a list view.
+    """
+    return parse_fields(fields, LIST_VIEW_FIELDS)
+
+def source_projection(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated source fields to return, or 'all'. "
+                    "Defaults to id, title, organism, platform and data_url."
+    ),
+) -> Tuple[str, ...]:
+    """
+    Fields to include in each cited source record.
+    """
+    return parse_fields(fields, SOURCE_FIELDS)
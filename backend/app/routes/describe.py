@@ -1,31 +1,27 @@
-from fastapi import APIRouter, Query, HTTPException
-from app.database import DATA
-from app.utils.summarizer import summarize_text
+import time
+from typing import Tuple
+
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from app.config import settings
+from app.database import get_state
+from app.routes.common import source_projection
+from app.utils.singleflight import SingleFlight
+from app.utils.summarizer import summarize_text_async
 
 router = APIRouter(prefix="/describe", tags=["Describe"])
 
-@router.get("/")
-def describe(q: str = Query(
-    ..., 
-    description="Topic or keyword to summarize",
-    min_length=1,
-    max_length=200,
-    pattern="^[a-zA-Z0-9\\s\\-_]+$"
-)):
+# Index work in progress in this worker, by (query, fields)
+_flights = SingleFlight()
+
+def describe_sources(q: str, fields: Tuple[str, ...]):
     """
-    Combine descriptions of top-matching datasets and return AI-generated summary.
+    Index work for a /describe query: the top five matches' projected
+    sources, their combined descriptions and the total match count.
     """
-    q = q.strip().lower()
-    
-    if not q:
-        raise HTTPException(status_code=400, detail="Query cannot be empty")
-    
-    matched = [
-        d for d in DATA
-        if q in d["title"].lower()
-        or q in d.get("description", "").lower()
-        or any(q in kw.lower() for kw in d.get("keywords", []))
-    ]
+    state = get_state()
+    matched = state.index.search(q)
 
     if not matched:
         raise HTTPException(
@@ -33,28 +29,58 @@ def describe(q: str = Query(
             detail=f"No datasets found matching '{q}'"
         )
 
+    top = [pos for pos, _ in state.ranker.top_k(q, 5, candidates=matched)]
+    sources = [state.fragments.fragment(pos, fields) for pos in top]
+
     # Combine top few descriptions with null checks
     descriptions = []
-    for d in matched[:5]:
-        desc = d.get("description")
+    for pos in top:
+        desc = state.store.value(pos, "description")
         if desc and desc.strip():  # Null check
             descriptions.append(desc.strip())
+    return sources, " ".join(descriptions), len(matched)
+
+@router.get("/", response_class=ORJSONResponse)
+async def describe(q: str = Query(
+    ..., 
+    description="Topic or keyword to summarize",
+    min_length=1,
+    max_length=200,
+    pattern="^[a-zA-Z0-9\\s\\-_]+$"
+), fields: Tuple[str, ...] = Depends(source_projection)):
+    """
+    Combine descriptions of top-matching datasets and return AI-generated summary.
+    Sources are projected to a compact set of fields unless `fields` is given.
+
+    The summary is awaited on the shared connection pool rather than in a
+    worker thread, within a DESCRIBE_DEADLINE budget for the whole request;
+    past it, the combined descriptions are returned truncated. Identical
+    concurrent requests share the index work and the summarization call.
+    """
+    deadline = time.monotonic() + settings.DESCRIBE_DEADLINE
+    q = q.strip().lower()
     
-    if not descriptions:
-        return {
+    if not q:
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    # Index work is brief but CPU-bound; keep it off the event loop
+    sources, combined_text, match_count = await _flights.do(
+        (q, fields), lambda: run_in_threadpool(describe_sources, q, fields)
+    )
+    
+    if not combined_text:
+        return ORJSONResponse({
             "query": q,
             "summary": "Datasets found but no descriptions available.",
-            "sources": matched[:5]
-        }
-    
-    combined_text = " ".join(descriptions)
+            "sources": sources
+        })
 
     # Generate summary using AI
-    summary = summarize_text(combined_text)
+    summary = await summarize_text_async(combined_text, deadline=deadline)
 
-    return {
+    return ORJSONResponse({
         "query": q,
         "summary": summary,
-        "sources": matched[:5],
-        "source_count": len(matched)
-    }
+        "sources": sources,
+        "source_count": match_count
+    })
@@ -1,49 +1,169 @@
-from fastapi import APIRouter, Query, HTTPException
-from app.database import DATA
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import ORJSONResponse
+from app.config import settings
+from app.database import DataState, get_state
+from app.models import RecommendBatchRequest
+from app.routes.common import facet_filters, parse_fields, projection
+from app.utils.facets import BitmapMask, bitmap_from_positions
+from app.utils.similarity import bitmap_array
+from app.utils.store import LIST_VIEW_FIELDS
 
 router = APIRouter(prefix="/recommend", tags=["Recommend"])
 
-@router.get("/")
+@router.get("/", response_class=ORJSONResponse)
 def recommend(q: str = Query(
     ..., 
     description="Keyword or dataset ID",
     min_length=1,
     max_length=200,
     pattern="^[a-zA-Z0-9\\s\\-_]+$"
-)):
+), filters: Dict[str, List[str]] = Depends(facet_filters),
+   fields: Tuple[str, ...] = Depends(projection)):
     """
-    Recommend similar datasets based on keyword overlap.
+    Recommend similar datasets by TF-IDF cosine similarity over title,
+    description and keywords. A dataset ID ("more like this") is answered
+    from the precomputed neighbor table; other queries are scored against
+    the query text, expanded with keywords that co-occur with the ones it
+    names (see `/recommend/topics`), falling back to BM25F ranking of
+    substring hits when no whole term matches. Optionally restricted by
+    facet filters; facet counts describe the neighbors or matches considered.
+
+    After a hot reload that changed only a few datasets, the neighbor table
+    is patched rather than rebuilt: neighbors of the changed datasets are
+    exact, but scores between two unchanged datasets are those computed
+    before the reload, so their order can lag behind corpus-wide IDF
+    shifts until the next full rebuild.
     """
     q = q.strip().lower()
     
     if not q:
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     
-    results = []
-    for d in DATA:
-        score = 0
-        if q in d["id"].lower():
-            score += 3
-        if q in d["title"].lower():
-            score += 2
-        if q in d.get("description", "").lower():
-            score += 1
-        if any(q in kw.lower() for kw in d.get("keywords", [])):
-            score += 1
-        if score > 0:
-            results.append((score, d))
-
-    results.sort(key=lambda x: x[0], reverse=True)
+    state = get_state()
+    allowed = state.facets.filter(filters) if filters else None
+    return ORJSONResponse(recommendations(state, q, allowed, fields))
+
+@router.post("/batch", response_class=ORJSONResponse)
+def recommend_batch(request: RecommendBatchRequest):
+    """
+    Recommendations for many keywords or dataset IDs in one request, keyed
+    by query. Queries share the facet filters, resolved once for the whole
+    batch, and the field projection; identical queries run once, and BM25F
+    fallbacks fetch each distinct term's postings once.
+    """
+    fields = parse_fields(request.fields, LIST_VIEW_FIELDS)
+    filters = {f: v for f, v in request.filters.model_dump().items() if v}
+    state = get_state()
+    allowed = state.facets.filter(filters) if filters else None
+    postings: Dict[str, list] = {}
+    answers = {}
+    results = {}
+    for raw in request.queries:
+        q = raw.lower()
+        if q not in answers:
+            answers[q] = recommendations(state, q, allowed, fields, postings)
+        results[raw] = answers[q]
+    return ORJSONResponse({"results": results})
+
+def recommendations(
+    state: DataState,
+    q: str,
+    allowed: Optional[int],
+    fields: Tuple[str, ...],
+    postings: Optional[Dict[str, list]] = None,
+) -> dict:
+    """
+    Top recommendations for one normalized query, restricted to the facet
+    filter bitmap `allowed` when given.
+    """
+    size = len(state.store)
+    results = None
+    expansion = []
+    source = state.store.position(q)
+    if source is None:
+        # IDs of collapsed near-duplicates resolve to their canonical record
+        source = state.duplicates.position(q)
+    if source is not None:
+        neighbors = state.neighbors.neighbors(source)
+        bitmap = bitmap_from_positions((pos for pos, _ in neighbors), size)
+        candidates = neighbors
+        if allowed is not None:
+            bitmap &= allowed
+            mask = BitmapMask(bitmap)
+            candidates = [n for n in neighbors if n[0] in mask]
+        # A full row filtered below five may hide matches past the table
+        if len(candidates) >= 5 or len(neighbors) < state.neighbors.n:
+            results = candidates[:5]
+        else:
+            scores = state.similarity.similar(source)
+    else:
+        expansion = state.topics.expand(q, settings.TOPIC_EXPANSION)
+        scores = state.similarity.scores(q, expansion, settings.TOPIC_EXPANSION_WEIGHT)
+    
+    if results is None:
+        matched = np.flatnonzero(scores).tolist()
+        if matched:
+            bitmap = bitmap_from_positions(matched, size)
+            mask = None
+            if allowed is not None:
+                bitmap &= allowed
+                mask = bitmap_array(bitmap, size)
+            results = state.similarity.top_k(scores, 5, mask=mask)
+        else:
+            scores = state.ranker.scores(q, postings)
+            bitmap = bitmap_from_positions(scores, size)
+            mask = None
+            if allowed is not None:
+                bitmap &= allowed
+                mask = BitmapMask(bitmap)
+            results = state.ranker.select(scores, 5, mask=mask)
     
     if not results:
         return {
             "query": q, 
             "message": "No recommendations found",
-            "results": []
+            "results": [],
+            "facets": state.facets.counts(bitmap)
         }
     
-    return {
+    response = {
         "query": q, 
-        "results": [r[1] for r in results[:5]]
+        "results": [state.fragments.fragment(pos, fields) for pos, _ in results],
+        "facets": state.facets.counts(bitmap)
     }
+    if expansion:
+        response["expanded_with"] = expansion
+    return response
+
+@router.get("/topics", response_class=ORJSONResponse)
+def related_topics(q: str = Query(
+    ...,
+    description="Keyword, or text containing keywords",
+    min_length=1,
+    max_length=200,
+    pattern="^[a-zA-Z0-9\\s\\-_]+$"
+), limit: int = Query(
+    10, ge=1, le=50, description="Related topics per keyword"
+)):
+    """
+    Keywords that co-occur with the query's keywords more often than
+    chance, strongest pointwise mutual information first. Each keyword
+    found in the query gets its own list from the precomputed graph.
+    """
+    q = q.strip().lower()
+    
+    if not q:
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    topics = get_state().topics
+    return ORJSONResponse({
+        "query": q,
+        "topics": [
+            {"keyword": keyword, "related": topics.related(keyword, limit)}
+            for keyword in topics.find(q)
+        ]
+    })
 
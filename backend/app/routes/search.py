@@ -1,35 +1,341 @@
-from fastapi import APIRouter, Query, HTTPException
-from app.database import DATA
-from app.models import Dataset
+import logging
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from app.config import settings
+from app.database import DataState, get_state
+from app.models import Dataset, SearchBatchRequest
+from app.routes.common import facet_filters, parse_fields, projection
+from app.utils.embeddings import SciBertClient
+from app.utils.facets import bitmap_count, bitmap_from_positions, bitmap_positions
+from app.utils.indexing import tokenize
+from app.utils.pagination import cursor_context, decode_cursor, encode_cursor
+from app.utils.ranking import reciprocal_rank_fusion
+from app.utils.similarity import bitmap_array
+from app.utils.store import LIST_VIEW_FIELDS
 
 router = APIRouter(prefix="/search", tags=["Search"])
+logger = logging.getLogger(__name__)
+_fallback_logged_at = float("-inf")
+
+def log_hybrid_fallback(reason: str) -> None:
+    """
+    Log that hybrid search served keywords alone: a warning at most once
+    per HYBRID_FALLBACK_LOG_INTERVAL, debug otherwise, so an outage of the
+    SciBERT service does not log on every request.
+    """
+    global _fallback_logged_at
+    now = time.monotonic()
+    if now - _fallback_logged_at >= settings.HYBRID_FALLBACK_LOG_INTERVAL:
+        _fallback_logged_at = now
+        logger.warning("Hybrid search falling back to keywords: %s", reason)
+    else:
+        logger.debug("Hybrid search falling back to keywords: %s", reason)
+
+def match(state: DataState, q: str, fuzzy: bool, filters: Dict[str, List[str]]):
+    """
+    Match set for a query: exact index hits, or typo-tolerant ones when
+    nothing matches, narrowed by facet filters. Returns the matched
+    positions, their bitmap, the query to rank by and any corrections.
+    """
+    ranked_query = q
+    corrections = None
+    matched = state.index.search(q)
+    if not matched and fuzzy:
+        matched, corrections = state.fuzzy.search(q)
+        ranked_query = " ".join(corrections.get(t, t) for t in tokenize(q))
+    
+    bitmap = bitmap_from_positions(matched, len(state.store))
+    if filters:
+        bitmap &= state.facets.filter(filters)
+        matched = bitmap_positions(bitmap)
+    return matched, bitmap, ranked_query, corrections
+
+def keyword_search(
+    state: DataState,
+    q: str,
+    fuzzy: bool,
+    limit: int,
+    after: Optional[Tuple[int, float]],
+    context: str,
+    filters: Dict[str, List[str]],
+    fields: Tuple[str, ...],
+    postings: Optional[Dict[str, list]] = None,
+) -> dict:
+    """
+    One page of matches ranked by BM25F. `postings` memoizes term postings
+    across the queries of a batch.
+    """
+    matched, bitmap, ranked_query, corrections = match(state, q, fuzzy, filters)
+    scores = state.ranker.scores(ranked_query, postings)
+    # One extra item tells us whether another page exists
+    top = state.ranker.select(scores, limit + 1, candidates=matched, after=after)
+    next_cursor = encode_cursor(*top[limit - 1], context) if len(top) > limit else None
+    
+    response = {
+        "query": q,
+        "count": len(matched),
+        "results": [state.fragments.fragment(pos, fields) for pos, _ in top[:limit]],
+        "next_cursor": next_cursor,
+        "facets": state.facets.counts(bitmap)
+    }
+    if corrections and matched:
+        response["corrected_query"] = ranked_query
+    return response
+
+def semantic_scores(
+    state: DataState, vector: np.ndarray, filters: Dict[str, List[str]], nprobe: int
+) -> Tuple[np.ndarray, int]:
+    """
+    Similarity scores of the records a semantic query can page through,
+    -inf elsewhere, and the bitmap of those records.
+    """
+    size = len(state.store)
+    mask = bitmap_array(state.facets.filter(filters), size) if filters else None
+    scores = state.embeddings.scores(vector, nprobe, mask=mask)
+    reachable = np.flatnonzero(np.isfinite(scores))
+    return scores, bitmap_from_positions(reachable.tolist(), size)
+
+def semantic_search(
+    state: DataState,
+    q: str,
+    limit: int,
+    after: Optional[Tuple[int, float]],
+    context: str,
+    filters: Dict[str, List[str]],
+    fields: Tuple[str, ...],
+    nprobe: int,
+) -> ORJSONResponse:
+    """
+    One page of datasets ranked by cosine similarity between the query's
+    SciBERT embedding and the memory-mapped record embeddings, scanning
+    only the `nprobe` nearest IVF lists when an ANN index is built. The
+    count and facets describe the records reached, all of which can be
+    paged through.
+    """
+    if state.embeddings is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Semantic search is unavailable until dataset embeddings are built"
+        )
+    try:
+        vector = SciBertClient().embed(q)
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=f"Could not embed query: {e}")
+    
+    if state.embeddings.ann is None:
+        nprobe = 0
+    scores, bitmap = semantic_scores(state, vector, filters, nprobe)
+    top = state.embeddings.top_k(scores, limit + 1, after=after)
+    next_cursor = encode_cursor(*top[limit - 1], context) if len(top) > limit else None
+    
+    return ORJSONResponse({
+        "query": q,
+        "mode": "semantic",
+        "nprobe": nprobe,
+        "count": bitmap_count(bitmap),
+        "results": [state.fragments.fragment(pos, fields) for pos, _ in top[:limit]],
+        "next_cursor": next_cursor,
+        "facets": state.facets.counts(bitmap)
+    })
+
+def hybrid_search(
+    state: DataState,
+    q: str,
+    fuzzy: bool,
+    limit: int,
+    after: Optional[Tuple[int, float]],
+    context: str,
+    filters: Dict[str, List[str]],
+    fields: Tuple[str, ...],
+    nprobe: int,
+) -> ORJSONResponse:
+    """
+    One page of the lexical and semantic rankings fused by reciprocal rank.
+
+    The query is embedded on a worker thread while the lexical index is
+    searched, and each side contributes only its top HYBRID_CANDIDATES, so
+    fusion costs little more than the slower side alone. Without
+    embeddings, or if the SciBERT service fails or takes longer than
+    HYBRID_EMBED_TIMEOUT, the lexical ranking is served alone and
+    `semantic` is false. The count is the length of the fused list, which
+    is what pages through; facets describe the lexical matches and the
+    semantic candidates that were fused.
+    """
+    embedding = None
+    if state.embeddings is not None:
+        embedding = SciBertClient().submit(q)
+    
+    n = settings.HYBRID_CANDIDATES
+    matched, bitmap, ranked_query, corrections = match(state, q, fuzzy, filters)
+    lexical = state.ranker.select(state.ranker.scores(ranked_query), n, candidates=matched)
+    rankings = [lexical]
+    
+    if embedding is not None:
+        try:
+            vector = embedding.result(timeout=settings.HYBRID_EMBED_TIMEOUT)
+        except FutureTimeoutError:
+            log_hybrid_fallback("embedding timed out")
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            log_hybrid_fallback(str(e))
+        else:
+            if state.embeddings.ann is None:
+                nprobe = 0
+            scores, _ = semantic_scores(state, vector, filters, nprobe)
+            semantic = state.embeddings.top_k(scores, n)
+            rankings.append(semantic)
+            bitmap |= bitmap_from_positions((pos for pos, _ in semantic), len(state.store))
+    
+    fused = reciprocal_rank_fusion(rankings)
+    top = state.ranker.select(fused, limit + 1, after=after)
+    next_cursor = encode_cursor(*top[limit - 1], context) if len(top) > limit else None
+    
+    response = {
+        "query": q,
+        "mode": "hybrid",
+        "semantic": len(rankings) > 1,
+        "count": len(fused),
+        "results": [state.fragments.fragment(pos, fields) for pos, _ in top[:limit]],
+        "next_cursor": next_cursor,
+        "facets": state.facets.counts(bitmap)
+    }
+    if corrections and matched:
+        response["corrected_query"] = ranked_query
+    return ORJSONResponse(response)
 
-@router.get("/", response_model=dict)
+@router.get("/", response_class=ORJSONResponse)
 def search(q: str = Query(
     ..., 
     description="Search keyword",
     min_length=1,
     max_length=200,
     pattern="^[a-zA-Z0-9\\s\\-_]+$"  # Only alphanumeric, spaces, hyphens, underscores
-)):
+), fuzzy: bool = Query(
+    True,
+    description="Fall back to typo-tolerant matching when nothing matches exactly"
+), limit: int = Query(
+    25, ge=1, le=100, description="Results per page"
+), cursor: Optional[str] = Query(
+    None, description="next_cursor from the previous page"
+), mode: str = Query(
+    "keyword",
+    description="keyword: substring match ranked by BM25F; "
+                "semantic: SciBERT embedding similarity; "
+                "hybrid: both, fused by reciprocal rank",
+    pattern="^(keyword|semantic|hybrid)$"
+), nprobe: Optional[int] = Query(
+    None, ge=0, le=4096,
+    description="Semantic and hybrid modes: IVF lists scanned; more is slower and closer to exact, "
+                "0 scans every embedding. Defaults to ANN_NPROBE"
+), filters: Dict[str, List[str]] = Depends(facet_filters),
+   fields: Tuple[str, ...] = Depends(projection)):
     """
-    Keyword-based search through title, description, and keywords.
+    Keyword-based search through every searchable field, ranked by BM25F
+    relevance, or with `mode=semantic`, every embedded dataset ranked by
+    similarity to the query's SciBERT embedding (approximately, through
+    the IVF index, unless `nprobe=0`), or with `mode=hybrid`, the best
+    of both rankings fused by reciprocal rank. Optional facet filters
+    narrow the matches; facet counts describe the filtered match set. If
+    nothing matches, misspelled terms are corrected against titles,
+    keywords and organisms. Pass `next_cursor` back as `cursor` to fetch
+    the following page.
     """
     q = q.strip().lower()
     
     if not q:
         raise HTTPException(status_code=400, detail="Search query cannot be empty")
     
-    results = [
-        d for d in DATA
-        if q in d["title"].lower()
-        or q in d.get("description", "").lower()
-        or any(q in kw.lower() for kw in d.get("keywords", []))
-    ]
+    state = get_state()
+    if nprobe is None:
+        nprobe = settings.ANN_NPROBE
+    context = cursor_context(
+        q, fuzzy, mode, nprobe if mode != "keyword" else None,
+        filters, state.digest.hex(), len(state.store)
+    )
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, context)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
-    return {
-        "query": q,
-        "count": len(results),
-        "results": results[:25]
-    }
+    if mode == "semantic":
+        return semantic_search(state, q, limit, after, context, filters, fields, nprobe)
+    if mode == "hybrid":
+        return hybrid_search(state, q, fuzzy, limit, after, context, filters, fields, nprobe)
+    
+    return ORJSONResponse(
+        keyword_search(state, q, fuzzy, limit, after, context, filters, fields)
+    )
+
+@router.post("/batch", response_class=ORJSONResponse)
+def search_batch(request: SearchBatchRequest):
+    """
+    First pages of many keyword searches in one request, keyed by query.
+    Queries share the limit, facet filters and field projection; identical
+    queries run once, and each distinct term's postings are fetched once
+    for the whole batch. Continue any query with GET /search and its
+    `next_cursor`.
+    """
+    fields = parse_fields(request.fields, LIST_VIEW_FIELDS)
+    filters = {f: v for f, v in request.filters.model_dump().items() if v}
+    state = get_state()
+    postings: Dict[str, list] = {}
+    pages = {}
+    results = {}
+    for raw in request.queries:
+        q = raw.lower()
+        if q not in pages:
+            context = cursor_context(
+                q, request.fuzzy, "keyword", None, filters, state.digest.hex(), len(state.store)
+            )
+            pages[q] = keyword_search(
+                state, q, request.fuzzy, request.limit, None, context, filters, fields, postings
+            )
+        results[raw] = pages[q]
+    return ORJSONResponse({"results": results})
 
+@router.get("/stream")
+def search_stream(q: str = Query(
+    ..., 
+    description="Search keyword",
+    min_length=1,
+    max_length=200,
+    pattern="^[a-zA-Z0-9\\s\\-_]+$"
+), fuzzy: bool = Query(
+    True,
+    description="Fall back to typo-tolerant matching when nothing matches exactly"
+), limit: int = Query(
+    1000, ge=1, le=10000, description="Maximum records to stream"
+), filters: Dict[str, List[str]] = Depends(facet_filters),
+   fields: Tuple[str, ...] = Depends(projection)):
+    """
+    Stream ranked matches as newline-delimited JSON, one record per line,
+    for exports too large for a single response body.
+    """
+    q = q.strip().lower()
+    
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query cannot be empty")
+    
+    state = get_state()
+    matched, _, ranked_query, _ = match(state, q, fuzzy, filters)
+    scores = state.ranker.scores(ranked_query)
+    
+    def lines():
+        ranked = state.ranker.iter_ranked(scores, candidates=matched)
+        for n, (pos, _) in enumerate(ranked):
+            if n >= limit:
+                break
+            yield state.fragments.record(pos, fields) + b"\n"
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Total-Count": str(len(matched))}
+    )
@@ -0,0 +1,354 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Container layout: magic, header length, JSON header, 64-byte aligned arrays
+ANN_MAGIC = b"BVANN\x00\x01\x00"
+ANN_FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Rows sampled to train quantizers, and rows assigned per matrix product
+TRAIN_SAMPLE = 1 << 16
+CHUNK_ROWS = 1 << 15
+KMEANS_ITERATIONS = 20
+PQ_CENTROIDS = 256
+
+
+def matrix_fingerprint(hashes: np.ndarray) -> str:
+    """Identity of an embedding matrix: the content hashes of its rows, in order."""
+    return hashlib.sha1(np.ascontiguousarray(hashes).tobytes()).hexdigest()
+
+
+def save_arrays(path: Path, arrays: Dict[str, np.ndarray], meta: dict) -> None:
+    """
+    Write named arrays and metadata to one file, atomically, laid out so
+    every array can be memory-mapped in place.
+    """
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {"dtype": values.dtype.str, "shape": values.shape, "offset": offset}
+        offset += values.nbytes
+    header = json.dumps({"meta": meta, "arrays": layout}).encode()
+    data_start = -(-(len(ANN_MAGIC) + 4 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(ANN_MAGIC + struct.pack("<I", len(header)) + header)
+        for name, values in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(values).tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_arrays(path: Path) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Metadata and read-only memory-mapped arrays of a `save_arrays` file."""
+    with open(path, "rb") as f:
+        if f.read(len(ANN_MAGIC)) != ANN_MAGIC:
+            raise ValueError(f"Not a save_arrays file: {path}")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+    data_start = -(-(len(ANN_MAGIC) + 4 + length) // ALIGNMENT) * ALIGNMENT
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if not np.prod(shape):
+            arrays[name] = np.empty(shape, dtype=spec["dtype"])
+            continue
+        arrays[name] = np.memmap(
+            path, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"], shape=shape
+        )
+    return header["meta"], arrays
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, spherical: bool) -> np.ndarray:
+    """Nearest centroid of each row: by inner product, or by Euclidean distance."""
+    labels = np.empty(len(x), dtype=np.int32)
+    sq_norms = None if spherical else (centroids ** 2).sum(axis=1)
+    for start in range(0, len(x), CHUNK_ROWS):
+        chunk = np.asarray(x[start:start + CHUNK_ROWS], dtype=np.float32)
+        products = chunk @ centroids.T
+        if spherical:
+            labels[start:start + len(chunk)] = products.argmax(axis=1)
+        else:
+            labels[start:start + len(chunk)] = (sq_norms - 2 * products).argmin(axis=1)
+    return labels
+
+
+def kmeans(
+    x: np.ndarray,
+    k: int,
+    spherical: bool = True,
+    iterations: int = KMEANS_ITERATIONS,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Lloyd's k-means. Spherical k-means (unit centroids, inner-product
+    assignment) suits normalized embeddings; plain k-means trains PQ
+    codebooks. Empty clusters are reseeded from random rows.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=np.float32)
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(x, centroids, spherical)
+        counts = np.bincount(labels, minlength=k)
+        order = np.argsort(labels, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.add.reduceat(x[order], starts[filled], axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+        if spherical:
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            centroids /= np.where(norms > 0, norms, 1.0)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file index over embedding rows: spherical k-means splits the
+    rows into lists, and a query scans only the `nprobe` lists whose
+    centroids are most similar to it.
+
+    With product quantization, candidates are first scored from 1-byte
+    codes per subvector through a per-query lookup table, and only the best
+    `refine` are rescored exactly from the embedding matrix; without it,
+    every candidate is scored exactly.
+    """
+
+    def __init__(self, meta: dict, arrays: Dict[str, np.ndarray]):
+        self.meta = meta
+        self.fingerprint: str = meta["fingerprint"]
+        self.centroids = arrays["centroids"]
+        self.offsets = arrays["offsets"]
+        self.order = arrays["order"]
+        self.codes = arrays.get("codes")
+        self.codebooks = arrays.get("codebooks")
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        fingerprint: str,
+        nlist: int = 0,
+        pq_subvectors: int = 0,
+        seed: int = 0,
+    ) -> Tuple[dict, Dict[str, np.ndarray]]:
+        """
+        Train and fill an index over `vectors` (rows of the embedding
+        matrix). Returns the metadata and arrays to save.
+        """
+        rows, dim = vectors.shape
+        nlist = nlist or max(1, int(4 * np.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(rows, min(rows, TRAIN_SAMPLE), replace=False))
+        train = np.asarray(vectors[sample], dtype=np.float32)
+
+        centroids = kmeans(train, nlist, spherical=True, seed=seed)
+        labels = _assign(vectors, centroids, spherical=True)
+        order = np.argsort(labels, kind="stable").astype(np.int32)
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=len(centroids)))))
+        arrays = {
+            "centroids": centroids.astype(np.float32),
+            "offsets": offsets.astype(np.int64),
+            "order": order,
+        }
+
+        if pq_subvectors:
+            if dim % pq_subvectors:
+                raise ValueError(f"{dim} dimensions do not split into {pq_subvectors} subvectors")
+            width = dim // pq_subvectors
+            codebooks = np.empty((pq_subvectors, min(PQ_CENTROIDS, len(train)), width), np.float32)
+            codes = np.empty((rows, pq_subvectors), dtype=np.uint8)
+            for j in range(pq_subvectors):
+                part = slice(j * width, (j + 1) * width)
+                codebooks[j] = kmeans(train[:, part], PQ_CENTROIDS, spherical=False, seed=seed + j)
+            # Codes are stored in list order, so a probed list is one slice
+            for start in range(0, rows, CHUNK_ROWS):
+                chunk = np.asarray(vectors[order[start:start + CHUNK_ROWS]], dtype=np.float32)
+                for j in range(pq_subvectors):
+                    part = slice(j * width, (j + 1) * width)
+                    codes[start:start + len(chunk), j] = _assign(chunk[:, part], codebooks[j], spherical=False)
+            arrays["codes"] = codes
+            arrays["codebooks"] = codebooks
+
+        meta = {
+            "version": ANN_FORMAT_VERSION,
+            "fingerprint": fingerprint,
+            "rows": rows,
+            "dim": dim,
+            "nlist": len(centroids),
+            "pq_subvectors": pq_subvectors,
+        }
+        return meta, arrays
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        meta, arrays = load_arrays(path)
+        if meta.get("version") != ANN_FORMAT_VERSION:
+            raise ValueError("ANN index from another format version")
+        return cls(meta, arrays)
+
+    def search(
+        self,
+        query: np.ndarray,
+        vectors: np.ndarray,
+        nprobe: int,
+        refine: int,
+        row_mask: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, exact scores) of candidate rows for a normalized query. Rows
+        outside `row_mask` (a boolean array over rows) are dropped before
+        product quantization picks the `refine` best, so a filter does not
+        eat into them.
+        """
+        nprobe = min(nprobe, self.nlist)
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        sorted_idx = np.concatenate(
+            [np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists]
+        )
+        if row_mask is not None:
+            sorted_idx = sorted_idx[row_mask[self.order[sorted_idx]]]
+        if self.codes is not None:
+            width = len(query) // len(self.codebooks)
+            table = np.einsum("jcw,jw->jc", self.codebooks, query.reshape(len(self.codebooks), width))
+            codes = self.codes[sorted_idx]
+            approx = table[np.arange(len(self.codebooks)), codes].sum(axis=1)
+            if len(approx) > refine:
+                sorted_idx = sorted_idx[np.argpartition(-approx, refine - 1)[:refine]]
+        rows = np.sort(self.order[sorted_idx])
+        scores = np.asarray(vectors[rows], dtype=np.float32) @ query
+        return rows, scores
+
+
+def build_ann(embeddings_path: Path, ann_path: Path, nlist: int = 0, pq_subvectors: int = 0) -> dict:
+    """Build and persist the IVF index for an embedding matrix file."""
+    matrix = np.load(embeddings_path, mmap_mode="r")
+    meta, arrays = IVFIndex.build(
+        matrix["vector"], matrix_fingerprint(matrix["hash"]), nlist, pq_subvectors
+    )
+    save_arrays(ann_path, arrays, meta)
+    return meta
+
+
+def benchmark(
+    vectors: np.ndarray,
+    index: IVFIndex,
+    k: int = 10,
+    queries: int = 200,
+    nprobes=(1, 2, 4, 8, 16, 32, 64),
+    refine: int = 200,
+    seed: int = 1,
+) -> list:
+    """
+    Recall@k and mean latency of the ANN index against exact search, per
+    nprobe. Queries are perturbed copies of random rows.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), min(queries, len(vectors)), replace=False)
+    sample = np.asarray(vectors[np.sort(picks)], dtype=np.float32)
+    sample += rng.normal(scale=0.05, size=sample.shape).astype(np.float32)
+    sample /= np.linalg.norm(sample, axis=1, keepdims=True)
+
+    def exact(query):
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), CHUNK_ROWS):
+            scores[start:start + CHUNK_ROWS] = np.asarray(
+                vectors[start:start + CHUNK_ROWS], dtype=np.float32
+            ) @ query
+        return np.argpartition(-scores, k - 1)[:k]
+
+    started = time.perf_counter()
+    truth = [set(exact(q).tolist()) for q in sample]
+    results = [{"nprobe": 0, "recall": 1.0, "ms": (time.perf_counter() - started) / len(sample) * 1e3}]
+    for nprobe in nprobes:
+        if nprobe > index.nlist:
+            break
+        hits = 0
+        started = time.perf_counter()
+        for query, expected in zip(sample, truth):
+            rows, scores = index.search(query, vectors, nprobe, refine)
+            top = rows[np.argpartition(-scores, min(k, len(rows)) - 1)[:k]] if len(rows) else rows
+            hits += len(expected & set(top.tolist()))
+        results.append({
+            "nprobe": nprobe,
+            "recall": hits / (k * len(sample)),
+            "ms": (time.perf_counter() - started) / len(sample) * 1e3,
+        })
+    return results
+
+
+def _synthetic(rows: int, dim: int, clusters: int = 256, seed: int = 0) -> Path:
+    """A clustered, normalized float16 embedding file standing in for SciBERT output."""
+    from app.utils.embeddings import _record_dtype
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    path = Path(tempfile.mkdtemp()) / "synthetic.embeddings.npy"
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype=_record_dtype(dim, "float16"), shape=(rows,))
+    for start in range(0, rows, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, rows - start)
+        chunk = centers[rng.integers(clusters, size=n)] + rng.normal(scale=0.6, size=(n, dim))
+        matrix["vector"][start:start + n] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+        matrix["hash"][start:start + n] = [b"%040d" % i for i in range(start, start + n)]
+    matrix.flush()
+    return path
+
+
+def main() -> None:
+    from app.config import settings
+
+    parser = argparse.ArgumentParser(description="Build or benchmark the embedding ANN index")
+    parser.add_argument("command", choices=("build", "benchmark"))
+    parser.add_argument("--nlist", type=int, default=settings.ANN_LISTS)
+    parser.add_argument("--pq", type=int, default=settings.ANN_PQ_SUBVECTORS, help="PQ subvectors, 0 = exact rescoring")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--refine", type=int, default=settings.ANN_REFINE)
+    parser.add_argument("--synthetic", type=int, default=0, metavar="ROWS", help="benchmark on generated data")
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        embeddings_path = _synthetic(args.synthetic, args.dim)
+        ann_path = embeddings_path.with_suffix(".ann")
+    else:
+        from app.database import ANN_PATH, EMBEDDINGS_PATH
+
+        embeddings_path, ann_path = EMBEDDINGS_PATH, ANN_PATH
+    if args.command == "build" or args.synthetic or not ann_path.exists():
+        started = time.perf_counter()
+        meta = build_ann(embeddings_path, ann_path, args.nlist, args.pq)
+        print(f"✅ Built ANN index over {meta['rows']} rows, {meta['nlist']} lists "
+              f"in {time.perf_counter() - started:.1f}s")
+    if args.command == "benchmark":
+        vectors = np.load(embeddings_path, mmap_mode="r")["vector"]
+        index = IVFIndex.load(ann_path)
+        print(f"recall@{args.k} vs exact, {args.queries} queries")
+        print(f"{'nprobe':>7} {'recall':>7} {'ms/query':>9}")
+        for row in benchmark(vectors, index, args.k, args.queries, refine=args.refine):
+            label = row["nprobe"] or "exact"
+            print(f"{label:>7} {row['recall']:>7.3f} {row['ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    # python -m app.utils.ann build | benchmark [--synthetic ROWS]
+    main()
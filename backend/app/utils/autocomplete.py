@@ -0,0 +1,85 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from app.utils.indexing import tokenize
+from app.utils.store import RecordStore
+
+# Fields whose single terms are suggested
+TERM_FIELDS = ("title", "keywords", "organism")
+# Fields whose whole values are also suggested as phrases
+PHRASE_FIELDS = ("keywords", "organism")
+
+
+class Autocomplete:
+    """
+    Sorted dictionary of completions weighted by how many records use them.
+
+    Top-k completions are precomputed for every prefix up to `depth`
+    characters, so short prefixes (most keystrokes) are a dict lookup; longer
+    prefixes bisect the sorted array, where matching ranges are small.
+    """
+
+    def __init__(
+        self,
+        store: RecordStore,
+        k: int = 10,
+        depth: int = 6,
+        term_fields: Sequence[str] = TERM_FIELDS,
+        phrase_fields: Sequence[str] = PHRASE_FIELDS,
+    ):
+        self.k = k
+        self.depth = depth
+
+        counts: Counter = Counter()
+        for pos in range(len(store)):
+            entries = set()
+            for value in store.lower_values(pos, phrase_fields):
+                phrase = " ".join(tokenize(value))
+                if " " in phrase:
+                    entries.add(phrase)
+            for field in term_fields:
+                entries.update(t for t in store.tokens(pos, field) if len(t) > 1)
+            counts.update(entries)
+
+        self.terms: List[str] = sorted(counts)
+        self.weights = array("I", (counts[t] for t in self.terms))
+
+        self.top: Dict[str, Tuple[int, ...]] = {}
+        for length in range(1, depth + 1):
+            start = 0
+            while start < len(self.terms):
+                prefix = self.terms[start][:length]
+                end = start + 1
+                if len(prefix) < length:
+                    # Term shorter than the prefix length; it owns no node
+                    start = end
+                    continue
+                while end < len(self.terms) and self.terms[end].startswith(prefix):
+                    end += 1
+                self.top[prefix] = self._best(start, end)
+                start = end
+
+    def _best(self, start: int, end: int) -> Tuple[int, ...]:
+        """Ids of the k heaviest terms in a sorted range, ties alphabetical."""
+        return tuple(heapq.nsmallest(
+            self.k, range(start, end), key=lambda i: (-self.weights[i], i)
+        ))
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Most used completions of a prefix."""
+        prefix = " ".join(tokenize(prefix)) + (" " if prefix[-1:].isspace() else "")
+        if not prefix.strip():
+            return []
+        if len(prefix) <= self.depth:
+            ids = self.top.get(prefix, ())
+        else:
+            start = bisect_left(self.terms, prefix)
+            end = bisect_left(self.terms, prefix + "\uffff", start)
+            ids = self._best(start, end)
+        return [
+            {"text": self.terms[i], "count": self.weights[i]}
+            for i in ids[:limit]
+        ]
@@ -1,20 +1,30 @@
-def recommend_similar(data, query):
+from app.utils.ranking import BM25Ranker
+from app.utils.schema import normalize_record
+from app.utils.similarity import TfidfModel
+from app.utils.store import RecordStore
+
+
+def recommend_similar(data, query, k: int = 5):
     """
-    Placeholder for ML-based similarity.
-    Currently uses keyword matching.
+    Top-k records most similar to a query, or to the record whose ID it is,
+    by TF-IDF cosine similarity; falls back to BM25F substring ranking when
+    no whole term matches. Reuses the models built at load time when given
+    the loaded store.
     """
-    q = query.lower()
-    results = []
-    for d in data:
-        score = 0
-        if q in d["title"].lower():
-            score += 2
-        if q in d.get("description", "").lower():
-            score += 1
-        if any(q in kw.lower() for kw in d.get("keywords", [])):
-            score += 1
-        if score > 0:
-            results.append((score, d))
-    results.sort(key=lambda x: x[0], reverse=True)
-    return [r[1] for r in results[:5]]
+    from app.database import get_state
+
+    state = get_state()
+    if data is state.store:
+        store, similarity, ranker = state.store, state.similarity, state.ranker
+    else:
+        store = RecordStore([normalize_record(record) for record in data])
+        similarity, ranker = TfidfModel(store), None
 
+    source = store.position(query)
+    scores = similarity.similar(source) if source is not None else similarity.scores(query)
+    top = similarity.top_k(scores, k)
+    if not top:
+        top = (ranker or BM25Ranker(data)).top_k(query, k)
+    if data is state.store:
+        return [store.record(pos) for pos, _ in top]
+    return [data[pos] for pos, _ in top]
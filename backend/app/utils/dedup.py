@@ -0,0 +1,197 @@
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.store import RecordStore
+
+# Fields a record's shingles are drawn from; detailed descriptions are often
+# templated, which makes unrelated studies look alike
+DEDUP_FIELDS = ("title", "description")
+
+# MinHash permutations, split into LSH bands of BAND_ROWS rows: records
+# agreeing on a whole band become candidates, which makes pairs with
+# Jaccard similarity around (1 / BANDS) ** (1 / BAND_ROWS) ~ 0.5 and up
+# likely to meet in some bucket
+NUM_PERM = 64
+BAND_ROWS = 4
+BANDS = NUM_PERM // BAND_ROWS
+
+# Consecutive tokens per shingle
+SHINGLE_SIZE = 3
+
+# Buckets larger than this are verified as a chain, not all pairs
+MAX_BUCKET_PAIRS = 32
+
+# Multiply-shift hash family (odd 64-bit multipliers), fixed so signatures
+# are comparable across reloads
+_rng = np.random.default_rng(0x5EED)
+_MULTIPLIERS = _rng.integers(1, 1 << 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64)
+_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64)
+_EMPTY = np.iinfo(np.uint32).max
+
+
+def _term_hashes(store: RecordStore) -> np.ndarray:
+    """CRC-32 of every vocabulary term, so shingles do not depend on term ids."""
+    return np.array(
+        [zlib.crc32(term.encode("utf-8")) for term in store.vocabulary.values], dtype=np.uint64
+    )
+
+
+def signature(term_hashes: np.ndarray) -> np.ndarray:
+    """
+    MinHash signature of a token sequence given as term hashes: per hash
+    function, the minimum over its shingles. All _EMPTY when there are none.
+    """
+    if len(term_hashes) < SHINGLE_SIZE:
+        shingles = term_hashes
+    else:
+        width = len(term_hashes) - SHINGLE_SIZE + 1
+        shingles = sum(term_hashes[i:i + width] * _MIX[i] for i in range(SHINGLE_SIZE))
+    if not len(shingles):
+        return np.full(NUM_PERM, _EMPTY, dtype=np.uint32)
+    hashed = (shingles[:, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)
+    return hashed.min(axis=0).astype(np.uint32)
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+class DuplicateIndex:
+    """
+    Near-duplicate groups among the records as loaded, before collapsing.
+
+    Every loaded record keeps its MinHash signature and content hash, so a
+    reload only signs records whose content changed. `leaders` maps each
+    loaded record to the first record of its group, the canonical copy;
+    the others are served as aliases of it.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        hashes: List[str],
+        signatures: np.ndarray,
+        leaders: np.ndarray,
+        flagged: Sequence[int] = (),
+    ):
+        self.ids = ids
+        self.hashes = hashes
+        self.signatures = signatures
+        self.leaders = leaders
+        # Loaded records first seen at the last reload that joined a group
+        self.flagged = np.asarray(flagged, dtype=np.int32)
+        kept = leaders == np.arange(len(leaders))
+        # Position in the collapsed store of each loaded record's leader
+        self.positions = (np.cumsum(kept) - 1)[leaders] if len(leaders) else leaders
+        self.kept = np.flatnonzero(kept)
+        self.aliases: Dict[str, int] = {
+            (ids[i] or "").lower(): int(self.positions[i])
+            for i in np.flatnonzero(~kept)
+            if ids[i]
+        }
+
+    @classmethod
+    def build(
+        cls,
+        store: RecordStore,
+        hashes: List[str],
+        threshold: float,
+        previous: Optional["DuplicateIndex"] = None,
+    ) -> "DuplicateIndex":
+        """
+        Sign every record (reusing signatures of unchanged records from
+        `previous`), find candidate pairs by LSH banding and join pairs
+        whose estimated Jaccard similarity reaches `threshold`; a threshold
+        of 0 disables detection.
+        """
+        size = len(store)
+        if threshold <= 0:
+            return cls(
+                list(store.text["id"]), list(hashes),
+                np.zeros((size, 0), dtype=np.uint32), np.arange(size),
+            )
+        signatures = np.empty((size, NUM_PERM), dtype=np.uint32)
+        old_rows = {}
+        if previous is not None:
+            old_rows = {h: row for row, h in enumerate(previous.hashes)}
+        fields = [f for f in DEDUP_FIELDS if f in store.token_offsets]
+        term_hashes = _term_hashes(store)
+        new = []
+        for pos in range(size):
+            row = old_rows.get(hashes[pos])
+            if row is not None:
+                signatures[pos] = previous.signatures[row]
+                continue
+            new.append(pos)
+            ids = np.concatenate(
+                [np.frombuffer(store.token_ids(pos, f), dtype=np.uint32) for f in fields]
+            ) if fields else np.zeros(0, dtype=np.uint32)
+            signatures[pos] = signature(term_hashes[ids])
+
+        parent = np.arange(size)
+        signed = np.flatnonzero((signatures != _EMPTY).any(axis=1))
+        for band in range(BANDS):
+            columns = signatures[signed, band * BAND_ROWS:(band + 1) * BAND_ROWS].astype(np.uint64)
+            keys = np.zeros(len(signed), dtype=np.uint64)
+            for column in columns.T:
+                keys = keys * np.uint64(0x100000001B3) + column
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            ends = np.r_[starts[1:], len(order)]
+            for start, end in zip(starts, ends):
+                if end - start < 2:
+                    continue
+                members = signed[order[start:end]]
+                if end - start <= MAX_BUCKET_PAIRS:
+                    pairs = [(a, b) for i, a in enumerate(members) for b in members[i + 1:]]
+                else:
+                    pairs = list(zip(members[:-1], members[1:]))
+                for a, b in pairs:
+                    root_a, root_b = _find(parent, a), _find(parent, b)
+                    if root_a == root_b:
+                        continue
+                    if np.mean(signatures[a] == signatures[b]) >= threshold:
+                        # The earlier record stays canonical
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        leaders = np.array([_find(parent, i) for i in range(size)], dtype=np.int64)
+        grouped = np.bincount(leaders, minlength=size)[leaders] > 1
+        flagged = [pos for pos in new if grouped[pos]] if previous is not None else []
+        return cls(list(store.text["id"]), list(hashes), signatures, leaders, flagged)
+
+    def position(self, record_id: str) -> Optional[int]:
+        """Position of the canonical record an alias ID was collapsed into."""
+        return self.aliases.get(record_id.strip().lower())
+
+    def similarity(self, a: int, b: int) -> float:
+        """Estimated Jaccard similarity of two loaded records."""
+        return float(np.mean(self.signatures[a] == self.signatures[b]))
+
+    def report(self) -> dict:
+        """Duplicate groups: each canonical ID with its aliases and their similarity."""
+        groups: Dict[int, List[int]] = {}
+        for i in np.flatnonzero(self.leaders != np.arange(len(self.leaders))):
+            groups.setdefault(int(self.leaders[i]), []).append(int(i))
+        return {
+            "records_loaded": len(self.leaders),
+            "records_kept": len(self.kept),
+            "aliases": int(sum(len(members) for members in groups.values())),
+            "groups": [
+                {
+                    "id": self.ids[leader],
+                    "aliases": [
+                        {"id": self.ids[i], "similarity": round(self.similarity(leader, i), 3)}
+                        for i in members
+                    ],
+                }
+                for leader, members in groups.items()
+            ],
+            "new_possible_duplicates": [self.ids[i] for i in self.flagged],
+        }
@@ -0,0 +1,319 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from app.config import settings
+from app.utils.ann import IVFIndex, matrix_fingerprint
+
+# Record fields embedded for semantic search
+EMBEDDING_FIELDS = ("title", "description", "keywords", "organism")
+
+# Rows scored per chunk, bounding the float32 copy of the memmap
+SCORE_CHUNK_ROWS = 1 << 15
+
+# Content hashes are hex SHA-1 digests
+HASH_DTYPE = "S40"
+
+# Embeds queries off the request thread, e.g. while hybrid search ranks keywords
+_embed_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="embed")
+
+# Shared client: one connection pool to the SciBERT service, kept alive
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def embedding_text(record: dict) -> str:
+    """Text a record is embedded from."""
+    parts = []
+    for field in EMBEDDING_FIELDS:
+        value = record.get(field)
+        if isinstance(value, list):
+            value = ", ".join(str(v) for v in value if v)
+        if value:
+            parts.append(str(value))
+    return ". ".join(parts)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, so cosine similarity is a dot product."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def get_client() -> httpx.Client:
+    """
+    The process-wide SciBERT client. Request threads and the embedding
+    pool share its keep-alive connections, so query embeddings skip the
+    TCP setup.
+    """
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=settings.SCIBERT_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SCIBERT_MAX_CONNECTIONS,
+                    keepalive_expiry=60,
+                ),
+            )
+        return _client
+
+
+def close_client() -> None:
+    """Close the shared client's pooled connections, e.g. on shutdown."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+class SciBertClient:
+    """
+    Mean-pooled SciBERT embeddings from the SciBERT service. Instances are
+    cheap; every one sends through the shared client's connection pool.
+    """
+
+    def __init__(
+        self,
+        base_url: str = settings.SCIBERT_URL,
+        batch_size: int = settings.MODEL_BATCH_SIZE,
+        timeout: float = 30.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embedding of one text, such as a search query."""
+        response = get_client().post(
+            f"{self.base_url}/predict", json={"text": text}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return np.asarray(response.json()["embeddings"], dtype=np.float32)
+
+    def submit(self, text: str) -> "Future[np.ndarray]":
+        """Embed one text on the shared embedding threads."""
+        return _embed_pool.submit(self.embed, text)
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeddings of many texts, sent in batches the service accepts."""
+        vectors = []
+        client = get_client()
+        for start in range(0, len(texts), self.batch_size):
+            response = client.post(
+                f"{self.base_url}/batch_predict",
+                json={"texts": list(texts[start:start + self.batch_size])},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            vectors.extend(response.json()["embeddings"])
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def _record_dtype(dim: int, dtype: str) -> np.dtype:
+    return np.dtype([("hash", HASH_DTYPE), ("vector", dtype, (dim,))])
+
+
+def build_embeddings(
+    path: Path,
+    hashes: Sequence[str],
+    text: Callable[[int], str],
+    embed_batch: Callable[[Sequence[str]], np.ndarray],
+    dtype: str = settings.EMBEDDING_DTYPE,
+) -> Tuple[int, int]:
+    """
+    Write the embedding matrix for records with the given content hashes,
+    one row per record, reusing rows of the existing file whose hash is
+    unchanged and embedding only the rest (`text(pos)` gives the text).
+
+    Each row stores its content hash next to the L2-normalized vector, so
+    the single .npy file is self-describing and replaced atomically.
+    Returns (rows reused, rows embedded).
+    """
+    previous = None
+    old_rows = {}
+    if path.exists():
+        try:
+            previous = np.load(path, mmap_mode="r")
+            old_rows = {h: row for row, h in enumerate(previous["hash"].tolist())}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Warning: Ignoring unreadable embeddings {path}: {e}")
+            previous = None
+
+    keys = [h.encode("ascii") for h in hashes]
+    missing = [pos for pos, key in enumerate(keys) if key not in old_rows]
+    fresh = np.zeros((0, 0), dtype=np.float32)
+    if missing:
+        fresh = normalize_rows(embed_batch([text(pos) for pos in missing]))
+    if previous is not None:
+        dim = previous.dtype["vector"].shape[0]
+    else:
+        dim = fresh.shape[1] if len(fresh) else 0
+    if len(fresh) and fresh.shape[1] != dim:
+        # The model changed; nothing previous can be reused
+        previous, old_rows = None, {}
+        missing = list(range(len(keys)))
+        fresh = normalize_rows(embed_batch([text(pos) for pos in missing]))
+        dim = fresh.shape[1]
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp.npy")
+    matrix = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=_record_dtype(dim, dtype), shape=(len(keys),)
+    )
+    matrix["hash"] = keys
+    reused = [pos for pos, key in enumerate(keys) if key in old_rows]
+    for start in range(0, len(reused), SCORE_CHUNK_ROWS):
+        chunk = reused[start:start + SCORE_CHUNK_ROWS]
+        matrix["vector"][chunk] = previous["vector"][[old_rows[keys[pos]] for pos in chunk]]
+    if missing:
+        matrix["vector"][missing] = fresh
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, path)
+    return len(reused), len(missing)
+
+
+class EmbeddingIndex:
+    """
+    Memory-mapped record embeddings, aligned to the current records by
+    content hash so rows of unchanged records stay valid across reloads.
+
+    The matrix is never loaded whole: scoring streams it in chunks, and the
+    pages are shared by every worker through the OS page cache. When an IVF
+    index built from this exact matrix exists, queries may scan only part
+    of it instead.
+    """
+
+    def __init__(self, path: Path, hashes: Sequence[str], ann_path: Optional[Path] = None):
+        self.path = path
+        self.matrix = np.load(path, mmap_mode="r")
+        self.ann: Optional[IVFIndex] = None
+        if ann_path is not None and ann_path.exists():
+            try:
+                ann = IVFIndex.load(ann_path)
+                if ann.fingerprint == matrix_fingerprint(self.matrix["hash"]):
+                    self.ann = ann
+                else:
+                    print(f"⚠️ Warning: ANN index {ann_path} is stale, using exact search")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Warning: Ignoring unreadable ANN index {ann_path}: {e}")
+        row_of = {h: row for row, h in enumerate(self.matrix["hash"].tolist())}
+        self.size = len(hashes)
+        # Matrix row of each record position, -1 where not yet embedded
+        self.rows = np.array(
+            [row_of.get(h.encode("ascii"), -1) for h in hashes], dtype=np.int64
+        )
+        self.embedded = self.rows >= 0
+        # Record position of each matrix row, -1 for rows of stale records
+        self.positions = np.full(len(self.matrix), -1, dtype=np.int64)
+        self.positions[self.rows[self.embedded]] = np.flatnonzero(self.embedded)
+        self.dim = self.matrix.dtype["vector"].shape[0]
+
+    @property
+    def count(self) -> int:
+        return int(self.embedded.sum())
+
+    def scores(
+        self,
+        vector: np.ndarray,
+        nprobe: int = 0,
+        refine: int = settings.ANN_REFINE,
+        mask: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Cosine similarity of records to a query embedding; -inf for records
+        without an embedding, outside `mask` (a boolean array) or not
+        reached by the ANN index. The finite scores are exactly what can be
+        paged through.
+
+        With `nprobe` > 0 and an ANN index, only records in the closest IVF
+        lists are scored (with product quantization, the best `refine` of
+        them). A filter leaving no more records than `nprobe` lists hold is
+        scored exactly instead, as that costs no more; otherwise `nprobe`
+        is doubled until `refine` filtered records are reached or every
+        list is probed, so a filter cannot starve the result.
+        """
+        query = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        wanted = self.embedded if mask is None else self.embedded & mask
+        scores = np.full(self.size, -np.inf, dtype=np.float32)
+        vectors = self.matrix["vector"]
+        ann = self.ann
+        if nprobe and ann is not None:
+            selected = int(wanted.sum())
+            if selected <= nprobe * len(self.matrix) / ann.nlist:
+                positions = np.flatnonzero(wanted)
+                rows = self.rows[positions]
+                order = np.argsort(rows)
+                for start in range(0, len(rows), SCORE_CHUNK_ROWS):
+                    chunk = order[start:start + SCORE_CHUNK_ROWS]
+                    scores[positions[chunk]] = vectors[rows[chunk]].astype(np.float32) @ query
+                return scores
+            row_mask = np.zeros(len(self.matrix), dtype=bool)
+            row_mask[self.rows[wanted]] = True
+            target = min(refine, selected)
+            while True:
+                rows, row_scores = ann.search(query, vectors, nprobe, refine, row_mask)
+                if len(rows) >= target or nprobe >= ann.nlist:
+                    break
+                nprobe = min(nprobe * 2, ann.nlist)
+            scores[self.positions[rows]] = row_scores
+            return scores
+        row_scores = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), SCORE_CHUNK_ROWS):
+            chunk = vectors[start:start + SCORE_CHUNK_ROWS]
+            row_scores[start:start + len(chunk)] = chunk.astype(np.float32) @ query
+        scores[wanted] = row_scores[self.rows[wanted]]
+        return scores
+
+    @staticmethod
+    def top_k(
+        scores: np.ndarray,
+        k: int,
+        mask: Optional[np.ndarray] = None,
+        after: Optional[Tuple[int, float]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Highest scoring (position, score) pairs among embedded records, ties
+        broken by corpus order, restricted to `mask` (a boolean array) and to
+        items ranked below `after` when given.
+        """
+        keep = np.isfinite(scores)
+        if mask is not None:
+            keep &= mask
+        if after is not None:
+            positions = np.arange(len(scores))
+            bound_pos, bound_score = after
+            keep &= (scores < bound_score) | ((scores == bound_score) & (positions > bound_pos))
+        candidates = np.flatnonzero(keep)
+        if len(candidates) > k:
+            values = scores[candidates]
+            kth = np.partition(values, len(values) - k)[len(values) - k]
+            candidates = candidates[values >= kth]
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+
+def open_embeddings(
+    path: Path, hashes: Sequence[str], ann_path: Optional[Path] = None
+) -> Optional[EmbeddingIndex]:
+    """The embedding index for these records, or None if none is built."""
+    if not path.exists():
+        return None
+    try:
+        return EmbeddingIndex(path, hashes, ann_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Warning: Ignoring unreadable embeddings {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    # Batch job: python -m app.utils.embeddings
+    from app.database import embed_data
+
+    print(embed_data())
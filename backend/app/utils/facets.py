@@ -0,0 +1,112 @@
+import heapq
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from app.utils.store import CATEGORY, RecordStore
+
+# Categorical fields exposed as filters and facet counts
+FACET_FIELDS = ("organism", "platform", "domain", "data_type")
+
+# Bit positions set in each byte value, for decoding bitmaps
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def bitmap_from_positions(positions: Iterable[int], size: int) -> int:
+    """Build a bitmap (Python int, bit i = record i) from record positions."""
+    buf = bytearray((size + 7) // 8)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, "little")
+
+
+def bitmap_positions(bitmap: int) -> List[int]:
+    """Record positions set in a bitmap, ascending."""
+    positions = []
+    for i, byte in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")):
+        if byte:
+            base = i << 3
+            positions.extend(base + bit for bit in _BYTE_BITS[byte])
+    return positions
+
+
+def bitmap_count(bitmap: int) -> int:
+    return bin(bitmap).count("1")
+
+
+class BitmapMask:
+    """Constant-time membership test over a bitmap."""
+
+    __slots__ = ("_bytes",)
+
+    def __init__(self, bitmap: int):
+        self._bytes = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+    def __contains__(self, pos: int) -> bool:
+        i = pos >> 3
+        return i < len(self._bytes) and bool(self._bytes[i] >> (pos & 7) & 1)
+
+
+class FacetIndex:
+    """
+    Per-value bitmaps over categorical fields. Filters combine values of one
+    field with OR and fields with AND; facet counts are popcounts of the
+    result bitmap intersected with each value's bitmap.
+    """
+
+    def __init__(self, store: RecordStore, fields: Iterable[str] = FACET_FIELDS):
+        self.size = len(store)
+        self.all = (1 << self.size) - 1
+        self.values: Dict[str, List[str]] = {}
+        self.bitmaps: Dict[str, List[int]] = {}
+        self.lookup: Dict[str, Dict[str, List[int]]] = {}
+
+        for field in fields:
+            if store.fields.get(field) != CATEGORY:
+                raise ValueError(f"Facet field {field} must be a category column")
+            dictionary = store.dictionaries[field]
+            positions: Dict[int, List[int]] = defaultdict(list)
+            for pos, code in enumerate(store.categories[field]):
+                if code >= 0:
+                    positions[code].append(pos)
+            self.values[field] = list(dictionary.values)
+            self.bitmaps[field] = [
+                bitmap_from_positions(positions[code], self.size)
+                for code in range(len(dictionary))
+            ]
+            lookup: Dict[str, List[int]] = defaultdict(list)
+            for code, lower in enumerate(dictionary.lower):
+                lookup[lower].append(code)
+            self.lookup[field] = dict(lookup)
+
+    def filter(self, filters: Dict[str, Optional[List[str]]]) -> int:
+        """
+        Bitmap of records matching every field's filter. Values are matched
+        case-insensitively; within a field any listed value may match.
+        """
+        result = self.all
+        for field, wanted in filters.items():
+            if not wanted:
+                continue
+            field_bitmap = 0
+            lookup = self.lookup[field]
+            bitmaps = self.bitmaps[field]
+            for value in wanted:
+                for code in lookup.get(value.strip().lower(), ()):
+                    field_bitmap |= bitmaps[code]
+            result &= field_bitmap
+            if not result:
+                break
+        return result
+
+    def counts(self, bitmap: int, limit: int = 10) -> Dict[str, List[dict]]:
+        """Top facet values by count within a result bitmap."""
+        facets = {}
+        for field, bitmaps in self.bitmaps.items():
+            values = self.values[field]
+            counts = (
+                (bitmap_count(bitmap & value_bitmap), code)
+                for code, value_bitmap in enumerate(bitmaps)
+            )
+            top = heapq.nlargest(limit, (c for c in counts if c[0]), key=lambda c: (c[0], -c[1]))
+            facets[field] = [{"value": values[code], "count": count} for count, code in top]
+        return facets
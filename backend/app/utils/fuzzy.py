@@ -0,0 +1,132 @@
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+from app.utils.indexing import tokenize
+from app.utils.store import RecordStore
+
+# Fields searched for typo-tolerant matches
+FUZZY_FIELDS = ("title", "keywords", "organism")
+
+
+def trigrams(term: str) -> set:
+    """Character trigrams of a term padded with boundary markers."""
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(term: str) -> int:
+    """Edit budget by term length; short terms must match exactly."""
+    if len(term) <= 3:
+        return 0
+    if len(term) <= 7:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance between `a` and `b` counting adjacent transpositions as one
+    edit (optimal string alignment), or `limit + 1` as soon as it is known
+    to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            )
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class TrigramIndex:
+    """
+    Trigram index over the vocabulary of titles, keywords and organisms.
+
+    Trigram posting lists narrow a misspelled token to the few terms that
+    share enough trigrams with it; only those are checked with a bounded
+    edit distance, and their record postings answer the query.
+    """
+
+    def __init__(self, store: RecordStore, fields: Sequence[str] = FUZZY_FIELDS):
+        self.size = len(store)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for pos in range(self.size):
+            terms = set()
+            for field in fields:
+                terms.update(store.tokens(pos, field))
+            for term in terms:
+                postings[term].append(pos)
+
+        self.terms: List[str] = sorted(postings)
+        self.postings: List[array] = [array("I", postings[t]) for t in self.terms]
+        grams: Dict[str, array] = defaultdict(lambda: array("I"))
+        for term_id, term in enumerate(self.terms):
+            for gram in trigrams(term):
+                grams[gram].append(term_id)
+        self.grams: Dict[str, array] = dict(grams)
+
+    def _similar(self, token: str) -> List[Tuple[int, int]]:
+        """(term id, distance) for terms within the token's edit budget."""
+        limit = max_edits(token)
+        token_grams = trigrams(token)
+        # Each edit (a transposition included) destroys at most four trigrams
+        needed = len(token_grams) - 4 * limit
+        if needed > 0:
+            shared: Dict[int, int] = defaultdict(int)
+            for gram in token_grams:
+                for term_id in self.grams.get(gram, ()):
+                    shared[term_id] += 1
+            candidates = [term_id for term_id, count in shared.items() if count >= needed]
+        else:
+            # Short tokens can be within budget of terms sharing no trigram
+            # ("bnoe", "bone"); check every term of a possible length
+            candidates = [
+                term_id for term_id, term in enumerate(self.terms)
+                if abs(len(term) - len(token)) <= limit
+            ]
+
+        matches = []
+        for term_id in candidates:
+            distance = bounded_edit_distance(token, self.terms[term_id], limit)
+            if distance <= limit:
+                matches.append((term_id, distance))
+        # Closest first, then commonest
+        matches.sort(key=lambda m: (m[1], -len(self.postings[m[0]]), m[0]))
+        return matches
+
+    def similar_terms(self, token: str) -> List[Tuple[str, int]]:
+        """Vocabulary terms within the token's edit budget, best first."""
+        return [(self.terms[term_id], distance) for term_id, distance in self._similar(token)]
+
+    def search(self, q: str) -> Tuple[List[int], Dict[str, str]]:
+        """
+        Records containing, for every query token, some term within its edit
+        budget. Also returns the best correction for each token.
+        """
+        result = None
+        corrections: Dict[str, str] = {}
+        for token in dict.fromkeys(tokenize(q)):
+            similar = self._similar(token)
+            if not similar:
+                return [], {}
+            corrections[token] = self.terms[similar[0][0]]
+            positions = set()
+            for term_id, _ in similar:
+                positions.update(self.postings[term_id])
+            result = positions if result is None else result & positions
+            if not result:
+                return [], corrections
+        return sorted(result or ()), corrections
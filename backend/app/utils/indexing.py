@@ -0,0 +1,155 @@
+import re
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from app.utils.schema import TEXT
+
+if TYPE_CHECKING:
+    from app.utils.store import RecordStore
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split lowercase text into alphanumeric terms."""
+    return TOKEN_RE.findall(text.lower())
+
+
+# Tokens this long match every term containing them; shorter ones, whole terms only
+MIN_SUBSTRING_LENGTH = 3
+
+
+class SubstringIndex:
+    """
+    Trigram postings over a sorted vocabulary, answering which terms
+    contain a token without scanning the vocabulary: only the terms that
+    share the token's rarest trigram are checked.
+    """
+
+    def __init__(self, vocabulary: Sequence[str]):
+        self.vocabulary = vocabulary
+        self.ids: Dict[str, int] = {term: term_id for term_id, term in enumerate(vocabulary)}
+        grams: Dict[str, array] = defaultdict(lambda: array("I"))
+        for term_id, term in enumerate(vocabulary):
+            for gram in {term[i:i + 3] for i in range(len(term) - 2)}:
+                grams[gram].append(term_id)
+        self.grams: Dict[str, array] = dict(grams)
+
+    def terms(self, token: str) -> tuple:
+        """Vocabulary terms that contain `token`, exact match first, then in order."""
+        if len(token) < MIN_SUBSTRING_LENGTH:
+            return (token,) if token in self.ids else ()
+        rarest = min(
+            (self.grams.get(token[i:i + 3], ()) for i in range(len(token) - 2)), key=len
+        )
+        vocabulary = self.vocabulary
+        terms = [vocabulary[term_id] for term_id in rarest if token in vocabulary[term_id]]
+        terms.sort(key=lambda t: t != token)
+        return tuple(terms)
+
+
+def field_tokens(records: Sequence, pos: int, field: str) -> List[str]:
+    """
+    Terms of one field of one record: pre-tokenized when `records` is a
+    RecordStore, tokenized on the fly for plain dicts.
+    """
+    if field in getattr(records, "searchable", ()):
+        return records.tokens(pos, field)
+    tokens = []
+    for value in field_values(records[pos], (field,)):
+        tokens.extend(tokenize(value))
+    return tokens
+
+
+def field_values(record: dict, fields: Sequence[str]) -> List[str]:
+    """Flatten the searchable fields of a record into lowercase strings."""
+    values = []
+    for field in fields:
+        value = record.get(field)
+        if isinstance(value, list):
+            values.extend(str(v).lower() for v in value if v)
+        elif value:
+            values.append(str(value).lower())
+    return values
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index (term -> posting list of record positions).
+    Built once at load time so queries never rescan or re-lowercase the corpus;
+    phrase matches are verified against the store's lowercase columns, and
+    long text is lowercased only for records its postings already matched.
+    """
+
+    def __init__(self, store: "RecordStore", fields: Optional[Sequence[str]] = None):
+        self.store = store
+        self.fields = tuple(fields or store.searchable)
+        self.size = len(store)
+        # Phrase checks try precomputed lowercase values before long text
+        self.match_order = tuple(sorted(
+            self.fields, key=lambda f: store.fields[f] == TEXT and f not in store.lowercase
+        ))
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for pos in range(self.size):
+            terms = set()
+            for field in self.fields:
+                terms.update(store.tokens(pos, field))
+            for term in terms:
+                postings[term].append(pos)
+
+        self.postings: Dict[str, List[int]] = dict(postings)
+        self.vocabulary: List[str] = sorted(self.postings)
+        self.substrings = SubstringIndex(self.vocabulary)
+        self._expand = lru_cache(maxsize=4096)(self._expand_uncached)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_expand"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._expand = lru_cache(maxsize=4096)(self._expand_uncached)
+
+    def _expand_uncached(self, token: str) -> frozenset:
+        """
+        Positions of records containing a term that contains `token`, or
+        the term itself for tokens under MIN_SUBSTRING_LENGTH characters.
+        """
+        positions = set()
+        for term in self.substrings.terms(token):
+            positions.update(self.postings[term])
+        return frozenset(positions)
+
+    def candidates(self, q: str) -> List[int]:
+        """Intersect posting lists for every query token."""
+        tokens = tokenize(q)
+        if not tokens:
+            return list(range(self.size))
+
+        sets = sorted((self._expand(t) for t in set(tokens)), key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            if not result:
+                break
+            result &= s
+        return sorted(result)
+
+    def matches(self, pos: int, q: str) -> bool:
+        """Check `q` as a substring of any single field value of a record."""
+        return any(q in value for value in self.store.iter_lower_values(pos, self.match_order))
+
+    def search(self, q: str) -> List[int]:
+        """
+        Record positions with a searchable field containing `q`, in corpus order.
+        """
+        q = q.lower()
+        candidates = self.candidates(q)
+        # A single bare token is already proven by its posting lists;
+        # phrases and punctuation still need a substring check per field.
+        if tokenize(q) == [q]:
+            return candidates
+        return [pos for pos in candidates if self.matches(pos, q)]
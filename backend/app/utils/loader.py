@@ -0,0 +1,180 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator, List, NamedTuple, Optional, Sequence, TextIO
+
+from app.utils.schema import normalize_record
+from app.utils.store import RecordStore
+
+# Files picked up as shards when the data source is a directory
+SHARD_SUFFIXES = (".json", ".jsonl", ".ndjson")
+
+# Segments parsed ahead of the merge, per worker; bounds loader memory
+PREFETCH_PER_WORKER = 2
+
+# Loader workers start clean instead of forking the serving process, whose
+# threads (reload watcher, embedding and HTTP pools) may hold locks mid-fork
+POOL_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+class Segment(NamedTuple):
+    """One shard parsed into its own columnar store, ready to merge."""
+    path: str
+    store: RecordStore
+    hashes: List[str]  # content hash per record, in store order
+    skipped: int       # entries that were not JSON objects or did not parse
+    error: Optional[str] = None
+
+
+def shard_paths(source: Path) -> List[Path]:
+    """
+    Shard files of a data source: the file itself, or every JSON/JSONL file
+    under a directory in sorted order, so record positions are stable.
+    """
+    if source.is_dir():
+        return sorted(
+            path for path in source.rglob("*")
+            if path.is_file()
+            and path.suffix in SHARD_SUFFIXES
+            and not path.name.startswith(".")
+        )
+    return [source] if source.exists() else []
+
+
+def iter_json_array(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Decode the items of a top-level JSON array one at a time, reading the
+    file in chunks instead of parsing it whole.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        # Read at least as much as is buffered, so retrying a large item
+        # that spans many chunks stays linear
+        nonlocal buffer, pos, eof
+        chunk = f.read(max(chunk_size, len(buffer) - pos))
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+        return not eof
+
+    expect = "["
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            if not fill():
+                raise ValueError("Unexpected end of file inside JSON array")
+            continue
+
+        char = buffer[pos]
+        if expect == "[":
+            if char != "[":
+                raise ValueError("Expected a JSON array")
+            pos += 1
+            expect = "first"
+        elif expect == "," or (expect == "first" and char == "]"):
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            pos += 1
+            expect = "item"
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            if not eof and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                # A number may continue in the next chunk; decode it again
+                fill()
+                continue
+            yield item
+            pos = end
+            expect = ","
+
+
+def iter_records(path: Path) -> Iterator[Any]:
+    """
+    Stream raw entries from one shard: a JSON array, or one JSON value per
+    line. Unparseable lines are yielded as None.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(256).lstrip(_WHITESPACE)
+        f.seek(0)
+        if path.suffix == ".json" and head.startswith("["):
+            yield from iter_json_array(f)
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def record_hash(record: dict) -> str:
+    """Content hash of one cleaned record, used to diff reloads."""
+    encoded = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def build_segment(path: Path) -> Segment:
+    """
+    Parse, normalize and column-encode one shard. Runs in a worker process,
+    so only the compact store crosses back to the parent, never raw JSON.
+    """
+    records: List[dict] = []
+    hashes: List[str] = []
+    skipped = 0
+    try:
+        for item in iter_records(path):
+            if not isinstance(item, dict):
+                skipped += 1
+                continue
+            record = normalize_record(item)
+            records.append(record)
+            hashes.append(record_hash(record))
+    except (OSError, ValueError) as e:
+        return Segment(str(path), RecordStore(()), [], skipped, str(e))
+    return Segment(str(path), RecordStore(records), hashes, skipped)
+
+
+def load_segments(paths: Sequence[Path], workers: int = 0) -> Iterator[Segment]:
+    """
+    Build the segments of every shard, in shard order.
+
+    Shards are parsed in a process pool with a bounded number in flight, so
+    memory holds a few segments at a time rather than the whole raw corpus.
+    A single shard, or `workers=1`, is parsed in-process. Workers are
+    started with forkserver (spawn where unavailable), never forked.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        for path in paths:
+            yield build_segment(path)
+        return
+
+    context = multiprocessing.get_context(POOL_START_METHOD)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending: deque = deque()
+        for path in paths:
+            pending.append(pool.submit(build_segment, path))
+            if len(pending) >= workers * PREFETCH_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
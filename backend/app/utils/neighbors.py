@@ -0,0 +1,150 @@
+from collections import defaultdict
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.utils.similarity import TfidfModel
+
+# Rebuild every row instead of patching when more records than this changed
+FULL_REBUILD_FRACTION = 0.25
+
+# Similarity scores materialized at once while building (float64, ~32 MB)
+BLOCK_CELLS = 1 << 22
+
+
+class NeighborTable:
+    """
+    The top-n most similar records of every record, precomputed so that
+    "more like this" for a dataset ID is a row lookup.
+
+    Stored as two (records x n) arrays: neighbor positions, padded with -1,
+    and their TF-IDF cosine similarities.
+    """
+
+    def __init__(self, positions: np.ndarray, scores: np.ndarray):
+        self.positions = positions
+        self.scores = scores
+        self.n = positions.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def neighbors(self, pos: int) -> List[Tuple[int, float]]:
+        """(position, similarity) of a record's neighbors, most similar first."""
+        return [
+            (int(p), float(s))
+            for p, s in zip(self.positions[pos], self.scores[pos])
+            if p >= 0
+        ]
+
+    @staticmethod
+    def _empty(size: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        return np.full((size, n), -1, dtype=np.int32), np.zeros((size, n), dtype=np.float32)
+
+    @staticmethod
+    def _fill(positions: np.ndarray, scores: np.ndarray, pos: int, row: List[Tuple[int, float]]):
+        for i, (neighbor, score) in enumerate(row):
+            positions[pos, i] = neighbor
+            scores[pos, i] = score
+
+    @staticmethod
+    def _fill_block(positions: np.ndarray, scores: np.ndarray, start: int, block: np.ndarray):
+        """Rows from `start` on: the top positive scores of each block row, ties by position."""
+        n = min(positions.shape[1], block.shape[1])
+        width = block.shape[1]
+        # The n-th highest score of each row, and never below the least positive one
+        kth = np.partition(block, width - n, axis=1)[:, width - n]
+        kth = np.maximum(kth, np.nextafter(0.0, 1.0))
+        rows, columns = np.nonzero(block >= kth[:, None])
+        values = block[rows, columns]
+        order = np.lexsort((columns, -values, rows))
+        rows, columns, values = rows[order], columns[order], values[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = rank < n
+        positions[start + rows[keep], rank[keep]] = columns[keep]
+        scores[start + rows[keep], rank[keep]] = values[keep]
+
+    @classmethod
+    def build(cls, similarity: TfidfModel, n: int) -> "NeighborTable":
+        """
+        Compute every record's neighbors from scratch, scoring blocks of
+        records against the corpus at once and partitioning each row.
+        """
+        positions, scores = cls._empty(similarity.size, n)
+        if n > 0:
+            for start, block in similarity.similar_blocks(BLOCK_CELLS):
+                cls._fill_block(positions, scores, start, block)
+        return cls(positions, scores)
+
+    @classmethod
+    def update(
+        cls,
+        similarity: TfidfModel,
+        n: int,
+        hashes: Mapping[str, str],
+        previous: Optional["NeighborTable"],
+        previous_hashes: Mapping[str, str],
+    ) -> Tuple["NeighborTable", int]:
+        """
+        Neighbors for a reloaded corpus, reusing the previous table.
+
+        `hashes` and `previous_hashes` map record keys to content hashes in
+        position order. Only added and changed records, and records that
+        lost a neighbor to a change, are recomputed. Every other row merges
+        its previous neighbors with the changed records that now outrank
+        them. Pairs of unchanged records keep the similarity they had when
+        last computed, although IDF weights shift with every change, so
+        those rows can drift slightly from a full build until the next one
+        (at least FULL_REBUILD_FRACTION of records changed, or a restart
+        without a snapshot). Returns the table and the number of rows
+        recomputed.
+        """
+        size = similarity.size
+        old_index = {key: (pos, h) for pos, (key, h) in enumerate(previous_hashes.items())}
+        new_to_old = np.full(size, -1, dtype=np.int64)
+        old_to_new = np.full(len(old_index), -1, dtype=np.int64)
+        for pos, (key, content_hash) in enumerate(hashes.items()):
+            old = old_index.get(key)
+            if old is not None and old[1] == content_hash:
+                new_to_old[pos] = old[0]
+                old_to_new[old[0]] = pos
+
+        dirty = np.flatnonzero(new_to_old < 0)
+        if (
+            previous is None
+            or previous.n != n
+            or len(previous) != len(old_index)
+            or len(dirty) > FULL_REBUILD_FRACTION * size
+        ):
+            return cls.build(similarity, n), size
+
+        positions, scores = cls._empty(size, n)
+        unchanged = new_to_old >= 0
+        # A changed record can only enter rows where it beats the last neighbor
+        floors = np.zeros(size, dtype=np.float32)
+        floors[unchanged] = previous.scores[new_to_old[unchanged], -1]
+
+        candidates: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+        for pos in dirty:
+            row_scores = similarity.similar(pos)
+            cls._fill(positions, scores, pos, similarity.top_k(row_scores, n))
+            hits = np.flatnonzero(unchanged & (row_scores > 0) & (row_scores >= floors))
+            for other in hits:
+                candidates[int(other)].append((int(pos), float(row_scores[other])))
+
+        recomputed = len(dirty)
+        for pos in np.flatnonzero(unchanged):
+            old = new_to_old[pos]
+            row = [
+                (int(old_to_new[p]), float(s))
+                for p, s in zip(previous.positions[old], previous.scores[old])
+                if p >= 0
+            ]
+            if any(p < 0 for p, _ in row):
+                # A neighbor was removed or changed; its replacement is unknown
+                row = similarity.top_k(similarity.similar(pos), n)
+                recomputed += 1
+            elif pos in candidates:
+                row = sorted(row + candidates[pos], key=lambda c: (-c[1], c[0]))[:n]
+            cls._fill(positions, scores, pos, row)
+        return cls(positions, scores), recomputed
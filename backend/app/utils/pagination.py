@@ -0,0 +1,35 @@
+import base64
+import hashlib
+import json
+from typing import Tuple
+
+
+def cursor_context(*parts) -> str:
+    """Short hash of whatever a cursor must not be reused across."""
+    encoded = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(pos: int, score: float, context: str) -> str:
+    """
+    Opaque cursor pointing just after the (position, score) it was built
+    from, tied to one query and dataset state.
+    """
+    payload = json.dumps([pos, score, context], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, context: str) -> Tuple[int, float]:
+    """
+    (position, score) the cursor continues after. Raises ValueError if the
+    cursor is malformed or belongs to another query or dataset state.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        pos, score, cursor_ctx = json.loads(base64.urlsafe_b64decode(padded))
+        pos, score = int(pos), float(score)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if cursor_ctx != context:
+        raise ValueError("Cursor does not match this query or the data has been reloaded")
+    return pos, score
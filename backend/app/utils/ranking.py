@@ -0,0 +1,217 @@
+import heapq
+import math
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import Container, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.indexing import SubstringIndex, field_tokens, tokenize
+
+# Per-field weights for BM25F; `id` lets dataset IDs rank their own record first
+FIELD_WEIGHTS = {
+    "id": 3.0,
+    "title": 3.0,
+    "keywords": 2.0,
+    "organism": 1.5,
+    "platform": 1.0,
+    "description": 1.0,
+    "detailed_description": 1.0,
+}
+
+# Terms that only contain the query token score at a discount
+PARTIAL_MATCH_WEIGHT = 0.5
+
+
+class BM25Ranker:
+    """
+    BM25F scorer with per-field weights.
+
+    Field lengths, IDF and the per-(term, record) impact are all computed at
+    load time, so a query only sums precomputed impacts and takes a top-k heap.
+    """
+
+    def __init__(
+        self,
+        records: Sequence[dict],
+        field_weights: Dict[str, float] = FIELD_WEIGHTS,
+        k1: float = settings.BM25_K1,
+        b: float = settings.BM25_B,
+        substrings: Optional[SubstringIndex] = None,
+    ):
+        self.field_weights = dict(field_weights)
+        self.k1 = k1
+        self.b = b
+        self.size = len(records)
+
+        fields = tuple(self.field_weights)
+        # Per-record term frequencies and lengths, per field
+        field_tfs: List[Dict[str, Dict[str, int]]] = []
+        lengths: Dict[str, List[int]] = {f: [] for f in fields}
+        df: Dict[str, int] = defaultdict(int)
+        for pos in range(self.size):
+            tfs = {}
+            seen = set()
+            for field in fields:
+                counts: Dict[str, int] = defaultdict(int)
+                for term in field_tokens(records, pos, field):
+                    counts[term] += 1
+                lengths[field].append(sum(counts.values()))
+                tfs[field] = counts
+                seen.update(counts)
+            for term in seen:
+                df[term] += 1
+            field_tfs.append(tfs)
+
+        self.lengths = lengths
+        self.avg_lengths = {
+            f: (sum(lens) / len(lens) if lens and sum(lens) else 1.0)
+            for f, lens in lengths.items()
+        }
+        self.idf = {
+            term: math.log(1 + (self.size - n + 0.5) / (n + 0.5))
+            for term, n in df.items()
+        }
+
+        positions: Dict[str, array] = defaultdict(lambda: array("I"))
+        impacts: Dict[str, array] = defaultdict(lambda: array("f"))
+        for pos, tfs in enumerate(field_tfs):
+            pseudo_tf: Dict[str, float] = defaultdict(float)
+            for field, counts in tfs.items():
+                if not counts:
+                    continue
+                norm = 1 - b + b * lengths[field][pos] / self.avg_lengths[field]
+                weight = self.field_weights[field]
+                for term, tf in counts.items():
+                    pseudo_tf[term] += weight * tf / norm
+            for term, tf in pseudo_tf.items():
+                positions[term].append(pos)
+                impacts[term].append(self.idf[term] * tf / (k1 + tf))
+
+        self.positions: Dict[str, array] = dict(positions)
+        self.impacts: Dict[str, array] = dict(impacts)
+        self.vocabulary: List[str] = sorted(self.positions)
+        # The inverted index's substring index, when built over the same terms
+        if substrings is None or substrings.vocabulary != self.vocabulary:
+            substrings = SubstringIndex(self.vocabulary)
+        self.substrings = substrings
+        self._terms = lru_cache(maxsize=4096)(self._terms_uncached)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_terms"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._terms = lru_cache(maxsize=4096)(self._terms_uncached)
+
+    def _terms_uncached(self, token: str) -> Tuple[Tuple[str, float], ...]:
+        return tuple(
+            (term, 1.0 if term == token else PARTIAL_MATCH_WEIGHT)
+            for term in self.substrings.terms(token)
+        )
+
+    def postings(self, token: str) -> List[Tuple[Sequence[int], Sequence[float], float]]:
+        """
+        (positions, impacts, weight) of every term containing `token`, exact
+        term first; tokens under MIN_SUBSTRING_LENGTH match only themselves.
+        """
+        return [(self.positions[term], self.impacts[term], weight) for term, weight in self._terms(token)]
+
+    def scores(self, q: str, postings: Optional[Dict[str, list]] = None) -> Dict[int, float]:
+        """
+        Accumulate BM25F scores for every record matching any query token.
+        A `postings` dict shared across a batch of queries memoizes each
+        distinct token's postings, so repeated terms are looked up once.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(q)):
+            if postings is None:
+                token_postings = self.postings(token)
+            else:
+                if token not in postings:
+                    postings[token] = self.postings(token)
+                token_postings = postings[token]
+            for positions, impacts, weight in token_postings:
+                for pos, impact in zip(positions, impacts):
+                    scores[pos] += weight * impact
+        return scores
+
+    def top_k(
+        self,
+        q: str,
+        k: int,
+        candidates: Optional[Iterable[int]] = None,
+        mask: Optional[Container[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Highest scoring (position, score) pairs, ties broken by corpus order.
+        With `candidates`, only those positions are ranked (score 0 if unmatched);
+        otherwise every matching record is, restricted to `mask` if given.
+        """
+        return self.select(self.scores(q), k, candidates, mask)
+
+    @staticmethod
+    def _items(
+        scores: Dict[int, float],
+        candidates: Optional[Iterable[int]] = None,
+        mask: Optional[Container[int]] = None,
+    ) -> Iterable[Tuple[int, float]]:
+        if candidates is not None:
+            return ((pos, scores.get(pos, 0.0)) for pos in candidates)
+        if mask is not None:
+            return ((pos, score) for pos, score in scores.items() if pos in mask)
+        return scores.items()
+
+    @classmethod
+    def select(
+        cls,
+        scores: Dict[int, float],
+        k: int,
+        candidates: Optional[Iterable[int]] = None,
+        mask: Optional[Container[int]] = None,
+        after: Optional[Tuple[int, float]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Top-k selection over precomputed scores; see `top_k`. With `after`
+        (a previously returned pair), only items ranked below it are
+        considered, which is how result pages continue.
+        """
+        items = cls._items(scores, candidates, mask)
+        if after is not None:
+            bound = (after[1], -after[0])
+            items = (item for item in items if (item[1], -item[0]) < bound)
+        return heapq.nlargest(k, items, key=lambda item: (item[1], -item[0]))
+
+    @classmethod
+    def iter_ranked(
+        cls,
+        scores: Dict[int, float],
+        candidates: Optional[Iterable[int]] = None,
+        mask: Optional[Container[int]] = None,
+    ) -> Iterator[Tuple[int, float]]:
+        """
+        Yield (position, score) pairs in rank order without sorting them all
+        up front: heapify once, then pop lazily as the consumer reads.
+        """
+        heap = [(-score, pos) for pos, score in cls._items(scores, candidates, mask)]
+        heapq.heapify(heap)
+        while heap:
+            score, pos = heapq.heappop(heap)
+            yield pos, -score
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Tuple[int, float]]], k: int = settings.HYBRID_RRF_K
+) -> Dict[int, float]:
+    """
+    Fuse ranked (position, score) lists by reciprocal rank: each list adds
+    1 / (k + rank) to every item in it, so only ranks matter and scores on
+    different scales (BM25F, cosine) never need calibrating.
+    """
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, (pos, _) in enumerate(ranking, start=1):
+            fused[pos] += 1.0 / (k + rank)
+    return dict(fused)
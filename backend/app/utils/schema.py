@@ -0,0 +1,89 @@
+import ast
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Column kinds
+TEXT = "text"          # one string (or None) per record
+CATEGORY = "category"  # one interned value per record, dictionary-encoded
+LIST = "list"          # interned string lists, flattened with offsets
+
+# Values sources use to mean "unknown"; normalized to None
+PLACEHOLDERS = {"to be determined from paper analysis", "unknown", "n/a", "none", ""}
+
+
+class FieldSpec(NamedTuple):
+    kind: str
+    default: Any = None
+    searchable: bool = False
+
+
+# Record schema, in response key order
+SCHEMA: Dict[str, FieldSpec] = {
+    "id": FieldSpec(TEXT, "unknown", searchable=True),
+    "title": FieldSpec(TEXT, "Untitled Dataset", searchable=True),
+    "domain": FieldSpec(CATEGORY),
+    "description": FieldSpec(TEXT, "", searchable=True),
+    "detailed_description": FieldSpec(TEXT, "", searchable=True),
+    "organism": FieldSpec(CATEGORY, searchable=True),
+    "platform": FieldSpec(CATEGORY, searchable=True),
+    "keywords": FieldSpec(LIST, searchable=True),
+    "source_url": FieldSpec(TEXT),
+    "data_url": FieldSpec(TEXT),
+    "data_type": FieldSpec(CATEGORY),
+    "release_date": FieldSpec(TEXT),
+    "authors": FieldSpec(LIST),
+    "variables": FieldSpec(LIST),
+}
+
+SEARCHABLE_FIELDS: Tuple[str, ...] = tuple(f for f, spec in SCHEMA.items() if spec.searchable)
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _category(value: Any) -> Optional[str]:
+    value = _text(value)
+    if value is None or value.lower() in PLACEHOLDERS:
+        return None
+    return value
+
+
+def _list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        stripped = value.strip()
+        if stripped.startswith("["):
+            # Some exports store lists as their Python/JSON repr
+            try:
+                value = ast.literal_eval(stripped)
+            except (ValueError, SyntaxError):
+                value = stripped.strip("[]").split(",")
+        else:
+            value = stripped.split(",")
+    if not isinstance(value, (list, tuple)):
+        return []
+    items = []
+    for item in value:
+        item = _text(item)
+        if item:
+            items.append(item.strip("'\""))
+    return items
+
+
+NORMALIZERS = {TEXT: _text, CATEGORY: _category, LIST: _list}
+
+
+def normalize_record(item: dict, schema: Dict[str, FieldSpec] = SCHEMA) -> dict:
+    """
+    Coerce one raw source record to the schema: every field present, of the
+    right type, with placeholders and blanks replaced by the field default.
+    """
+    record = {}
+    for field, spec in schema.items():
+        value = NORMALIZERS[spec.kind](item.get(field))
+        if value is None or value == []:
+            value = list(spec.default or []) if spec.kind == LIST else spec.default
+        record[field] = value
+    return record
@@ -0,0 +1,57 @@
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import orjson
+
+from app.utils.store import LIST_VIEW_FIELDS, SOURCE_FIELDS, RecordStore
+
+# Projections most responses use; the SQLite index stores them per row
+COMMON_PROJECTIONS: Tuple[Tuple[str, ...], ...] = (LIST_VIEW_FIELDS, SOURCE_FIELDS)
+
+# Spliced (record, projection) pairs kept for repeat requests
+ASSEMBLED_CACHE_SIZE = 4096
+
+
+class RecordFragments:
+    """
+    Pre-serialized JSON for every record.
+
+    Each field of each record is encoded once at load time as a `"key":value`
+    fragment. A projection is spliced together from those bytes at response
+    time, and recently served records are kept spliced in a bounded LRU, so
+    responses never re-encode records and no whole-record copies are held.
+    """
+
+    def __init__(self, store: RecordStore):
+        self.fields = tuple(store.fields)
+        self.size = len(store)
+        self.columns: Dict[str, List[bytes]] = {}
+        for field in self.fields:
+            key = orjson.dumps(field) + b":"
+            self.columns[field] = [
+                key + orjson.dumps(store.value(pos, field)) for pos in range(len(store))
+            ]
+        self._assemble = lru_cache(maxsize=ASSEMBLED_CACHE_SIZE)(self._splice)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_assemble"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._assemble = lru_cache(maxsize=ASSEMBLED_CACHE_SIZE)(self._splice)
+
+    def _splice(self, pos: int, fields: Tuple[str, ...]) -> bytes:
+        columns = self.columns
+        return b"{" + b",".join(columns[field][pos] for field in fields) + b"}"
+
+    def record(self, pos: int, fields: Sequence[str] = ()) -> bytes:
+        """JSON bytes of one record, projected to `fields` when given."""
+        if not 0 <= pos < self.size:
+            raise IndexError(pos)
+        return self._assemble(pos, tuple(fields) or self.fields)
+
+    def fragment(self, pos: int, fields: Sequence[str] = ()) -> orjson.Fragment:
+        """The record as an orjson Fragment, embedded verbatim by `orjson.dumps`."""
+        return orjson.Fragment(self.record(pos, fields))
@@ -0,0 +1,207 @@
+import math
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.indexing import tokenize
+from app.utils.store import RecordStore
+
+# Fields a record's TF-IDF vector is built from
+SIMILARITY_FIELDS = ("title", "description", "keywords")
+
+# Terms in at least 1/DENSE_TERM_RATIO of records are multiplied as a dense
+# matrix in all-pairs similarity; rarer terms pair up the records holding them
+DENSE_TERM_RATIO = 32
+# Cap on that dense (records x common terms) float32 matrix
+DENSE_TERM_CELLS = 1 << 24
+
+
+def bitmap_array(bitmap: int, size: int) -> np.ndarray:
+    """Boolean array (one entry per record) from a facet bitmap."""
+    packed = np.frombuffer(bitmap.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(packed, bitorder="little")[:size].astype(bool)
+
+
+class TfidfModel:
+    """
+    TF-IDF vectors of every record over title, description and keywords,
+    stored as an L2-normalized CSR matrix (records x terms).
+
+    Similarity to a query or to a source record is a single vectorized
+    sparse matrix-vector product over the stored nonzeros, followed by a
+    partial sort for the top k.
+    """
+
+    def __init__(self, store: RecordStore, fields: Sequence[str] = SIMILARITY_FIELDS):
+        fields = [f for f in fields if f in store.searchable]
+        # Sublinear term frequencies per record, keyed by store term id
+        counts: List[Counter] = []
+        df: Counter = Counter()
+        for pos in range(len(store)):
+            record_counts: Counter = Counter()
+            for field in fields:
+                record_counts.update(store.token_ids(pos, field))
+            counts.append(record_counts)
+            df.update(record_counts.keys())
+
+        vocabulary = store.vocabulary.values
+        term_ids = sorted(df, key=lambda term_id: vocabulary[term_id])
+        column = {term_id: col for col, term_id in enumerate(term_ids)}
+        size = len(store)
+        idf = np.array(
+            [math.log((1 + size) / (1 + df[term_id])) + 1 for term_id in term_ids],
+            dtype=np.float32,
+        )
+
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for record_counts in counts:
+            row = sorted((column[term_id], tf) for term_id, tf in record_counts.items())
+            weights = [(1 + math.log(tf)) * float(idf[col]) for col, tf in row]
+            norm = math.sqrt(sum(w * w for w in weights)) or 1.0
+            indices.extend(col for col, _ in row)
+            data.extend(w / norm for w in weights)
+            indptr.append(len(indices))
+
+        self._set_arrays(
+            [vocabulary[term_id] for term_id in term_ids],
+            idf,
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int32),
+            np.array(data, dtype=np.float32),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        terms: List[str],
+        idf: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+    ) -> "TfidfModel":
+        """Rebuild a model from its stored vocabulary and CSR arrays."""
+        model = cls.__new__(cls)
+        model._set_arrays(terms, idf, indptr, indices, data, rows)
+        return model
+
+    def _set_arrays(self, terms, idf, indptr, indices, data, rows=None) -> None:
+        self.terms: List[str] = list(terms)
+        self.columns: Dict[str, int] = {term: col for col, term in enumerate(self.terms)}
+        self.idf = idf
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.size = len(indptr) - 1
+        # Row of each stored nonzero, so a product is one bincount
+        if rows is None:
+            rows = np.repeat(np.arange(self.size, dtype=np.int32), np.diff(indptr))
+        self.rows = rows
+
+    def _product(self, columns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Matrix-vector product with a sparse vector given as (columns, weights)."""
+        dense = np.zeros(len(self.terms), dtype=np.float32)
+        dense[columns] = weights
+        return np.bincount(
+            self.rows, weights=self.data * dense[self.indices], minlength=self.size
+        )
+
+    def scores(
+        self, q: str, expansion: Sequence[str] = (), expansion_weight: float = 0.5
+    ) -> np.ndarray:
+        """
+        Cosine similarity of every record to a free-text query. Terms of the
+        `expansion` phrases not already in the query join it at a term
+        frequency weight of `expansion_weight`.
+        """
+        counts = Counter(t for t in tokenize(q) if t in self.columns)
+        tf_weights = {t: 1 + math.log(tf) for t, tf in counts.items()}
+        for phrase in expansion:
+            for t in tokenize(phrase):
+                if t in self.columns and t not in tf_weights:
+                    tf_weights[t] = expansion_weight
+        if not tf_weights:
+            return np.zeros(self.size)
+        columns = np.array([self.columns[t] for t in tf_weights], dtype=np.int64)
+        weights = np.array(list(tf_weights.values())) * self.idf[columns]
+        return self._product(columns, weights / np.linalg.norm(weights))
+
+    def similar(self, pos: int) -> np.ndarray:
+        """Cosine similarity of every record to the record at `pos`, itself excluded."""
+        start, end = self.indptr[pos], self.indptr[pos + 1]
+        scores = self._product(self.indices[start:end], self.data[start:end])
+        scores[pos] = 0.0
+        return scores
+
+    def similar_blocks(self, block_cells: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Cosine similarity of every record to every other, as dense (rows x
+        records) blocks of about `block_cells` scores, each record to itself
+        zeroed. Yields (first row, block).
+
+        Each block is a product with the transposed matrix: common terms
+        as one dense matrix product, rare terms by pairing each entry with
+        the records holding the same term, so the cost follows the pairs
+        that share a term rather than records x nonzeros.
+        """
+        df = np.bincount(self.indices, minlength=len(self.terms))
+        common = np.flatnonzero(df * DENSE_TERM_RATIO >= max(self.size, 1))
+        limit = DENSE_TERM_CELLS // max(self.size, 1)
+        if len(common) > limit:
+            common = np.sort(common[np.argsort(-df[common], kind="stable")[:limit]])
+        is_common = np.zeros(len(self.terms), dtype=bool)
+        is_common[common] = True
+        dense_column = np.full(len(self.terms), -1, dtype=np.int64)
+        dense_column[common] = np.arange(len(common))
+        entry_common = is_common[self.indices]
+        dense = np.zeros((self.size, len(common)), dtype=np.float32)
+        dense[self.rows[entry_common], dense_column[self.indices[entry_common]]] = self.data[entry_common]
+
+        # Column-major copy of the rare terms: the records holding each one
+        rare = ~entry_common
+        order = np.argsort(self.indices[rare], kind="stable")
+        column_rows = self.rows[rare][order]
+        column_data = self.data[rare][order]
+        column_ptr = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(np.where(is_common, 0, df), out=column_ptr[1:])
+
+        step = max(1, block_cells // max(self.size, 1))
+        for start in range(0, self.size, step):
+            end = min(start + step, self.size)
+            entries = np.arange(self.indptr[start], self.indptr[end])
+            entries = entries[rare[entries]]
+            columns = self.indices[entries]
+            lengths = column_ptr[columns + 1] - column_ptr[columns]
+            # Every (entry, record holding its term) pair, flattened
+            first = np.repeat(column_ptr[columns] - np.cumsum(lengths) + lengths, lengths)
+            pairs = first + np.arange(int(lengths.sum()))
+            cells = np.repeat(self.rows[entries] - start, lengths) * self.size + column_rows[pairs]
+            weights = np.repeat(self.data[entries], lengths) * column_data[pairs]
+            block = np.bincount(cells, weights=weights, minlength=(end - start) * self.size)
+            block = block.astype(np.float64, copy=False).reshape(end - start, self.size)
+            if len(common):
+                block += dense[start:end] @ dense.T
+            block[np.arange(end - start), np.arange(start, end)] = 0.0
+            yield start, block
+
+    @staticmethod
+    def top_k(
+        scores: np.ndarray, k: int, mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Highest scoring (position, score) pairs with a positive score, ties
+        broken by corpus order, restricted to `mask` (a boolean array) if given.
+        """
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            # Keep everything tied with the k-th score so ties resolve by position
+            values = scores[candidates]
+            kth = np.partition(values, len(values) - k)[len(values) - k]
+            candidates = candidates[values >= kth]
+        order = np.lexsort((candidates, -scores[candidates]))[:k]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
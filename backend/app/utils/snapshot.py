@@ -0,0 +1,69 @@
+import hashlib
+import os
+import pickle
+import struct
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+# Bump whenever the layout of the pickled records or indexes changes
+SNAPSHOT_VERSION = 16
+
+MAGIC = b"BVSNAP\x00\x00"
+HEADER = struct.Struct(">8sH32s")
+
+
+def fingerprint(source_paths: Sequence[Path], *params: Any) -> bytes:
+    """
+    SHA-256 of the source files (names and contents) plus any build
+    parameters baked into the snapshot, so changing either invalidates it.
+    """
+    digest = hashlib.sha256()
+    for source_path in source_paths:
+        digest.update(str(source_path).encode() + b"\0")
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    digest.update(repr(params).encode())
+    return digest.digest()
+
+
+def read_snapshot(path: Path, expected: bytes) -> Optional[Any]:
+    """
+    Load a compiled snapshot, or return None if it is missing, from another
+    snapshot version, or built from a different source fingerprint.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) != HEADER.size:
+                return None
+            magic, version, digest = HEADER.unpack(header)
+            if magic != MAGIC or version != SNAPSHOT_VERSION or digest != expected:
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Warning: Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def write_snapshot(path: Path, digest: bytes, payload: Any) -> bool:
+    """
+    Write a snapshot atomically so concurrently booting workers never read a
+    partial file. Returns False if the directory is not writable.
+    """
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, digest))
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        print(f"⚠️ Warning: Could not write snapshot {path}: {e}")
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
@@ -0,0 +1,649 @@
+import heapq
+import os
+import sqlite3
+import threading
+from array import array
+from collections.abc import Mapping, Sequence as SequenceABC
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+
+from app.utils.ann import load_arrays, save_arrays
+from app.utils.dedup import DuplicateIndex
+from app.utils.facets import FACET_FIELDS, FacetIndex
+from app.utils.fuzzy import bounded_edit_distance, max_edits, trigrams
+from app.utils.indexing import MIN_SUBSTRING_LENGTH, tokenize
+from app.utils.neighbors import NeighborTable
+from app.utils.ranking import PARTIAL_MATCH_WEIGHT, BM25Ranker
+from app.utils.serialization import COMMON_PROJECTIONS
+from app.utils.similarity import TfidfModel
+from app.utils.topics import KeywordGraph
+from app.utils.store import FIELDS
+
+# Bump whenever the table layout changes
+SQLITE_INDEX_VERSION = 7
+
+# Joins list items in the match table; never part of a query
+ITEM_SEPARATOR = "\x1f"
+
+# Shared memory-mapped reads through the OS page cache
+MMAP_SIZE = 1 << 30
+
+# FTS5's trigram tokenizer needs three characters to use the index
+MIN_TRIGRAM_QUERY = 3
+
+SCHEMA_SQL = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value BLOB);
+CREATE TABLE records (
+    pos INTEGER PRIMARY KEY, key TEXT UNIQUE, hash TEXT, record BLOB, {projections}
+);
+CREATE INDEX records_lower_key ON records (lower(key));
+CREATE TABLE terms (term_id INTEGER PRIMARY KEY, term TEXT UNIQUE, positions BLOB, impacts BLOB);
+CREATE VIRTUAL TABLE terms_match USING fts5(
+    term, content='terms', content_rowid='term_id', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE search USING fts5({searchable}, tokenize='trigram');
+CREATE TABLE facets (
+    field TEXT, code INTEGER, value TEXT, lower TEXT, bitmap BLOB, PRIMARY KEY (field, code)
+);
+CREATE INDEX facets_lower ON facets (field, lower);
+CREATE TABLE fuzzy_terms (term_id INTEGER PRIMARY KEY, term TEXT, df INTEGER, positions BLOB);
+CREATE TABLE fuzzy_grams (gram TEXT, term_id INTEGER, PRIMARY KEY (gram, term_id)) WITHOUT ROWID;
+CREATE TABLE completions (term_id INTEGER PRIMARY KEY, term TEXT UNIQUE, weight INTEGER);
+CREATE TABLE completion_top (prefix TEXT PRIMARY KEY, ids BLOB) WITHOUT ROWID;
+"""
+
+
+def _uint_array(blob: bytes) -> array:
+    values = array("I")
+    values.frombytes(blob)
+    return values
+
+
+def _float_array(blob: bytes) -> array:
+    values = array("f")
+    values.frombytes(blob)
+    return values
+
+
+def arrays_path(path: Path) -> Path:
+    """The file beside a SQLite index holding its numeric arrays."""
+    return path.with_suffix(".arrays")
+
+
+def _text(values: Sequence[Optional[str]]) -> np.ndarray:
+    """Strings as a fixed-width bytes array, None stored as empty."""
+    return np.array([(v or "").encode() for v in values], dtype=bytes)
+
+
+class StoredStrings(SequenceABC):
+    """Strings read on demand from a fixed-width bytes array; empty reads as None."""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.values[i].decode() or None
+
+
+def build_database(path: Path, state, digest: bytes) -> None:
+    """
+    Write an in-memory DataState to a SQLite index file, atomically.
+
+    Records are stored as their pre-serialized JSON, searchable fields in an
+    FTS5 trigram table for substring matching, and every precomputed index
+    (BM25F impacts, facet bitmaps, fuzzy trigrams, completions) as tables,
+    so serving processes share one file instead of private copies. The
+    TF-IDF matrix, neighbor table, topic graph and near-duplicate
+    signatures go to an aligned array file beside it, which workers
+    memory-map instead of copying; it is written first, so an index file
+    always has arrays from the same build.
+    """
+    store = state.store
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA_SQL.format(
+            projections=", ".join(f"p{i} BLOB" for i in range(len(COMMON_PROJECTIONS))),
+            searchable=", ".join(store.searchable),
+        ))
+        meta = {
+            "version": str(SQLITE_INDEX_VERSION),
+            "digest": digest,
+            "size": str(len(store)),
+            "searchable": ",".join(store.searchable),
+            "completion_k": str(state.autocomplete.k),
+            "completion_depth": str(state.autocomplete.depth),
+        }
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+
+        fragments = state.fragments
+        keys = list(state.hashes.items())
+        conn.executemany(
+            f"INSERT INTO records VALUES (?, ?, ?, ?{', ?' * len(COMMON_PROJECTIONS)})",
+            (
+                (pos, key, content_hash, fragments.record(pos),
+                 *(fragments.record(pos, fields) for fields in COMMON_PROJECTIONS))
+                for pos, (key, content_hash) in enumerate(keys)
+            ),
+        )
+        conn.executemany(
+            f"INSERT INTO search (rowid, {', '.join(store.searchable)}) "
+            f"VALUES (?{', ?' * len(store.searchable)})",
+            (
+                (pos, *(
+                    ITEM_SEPARATOR.join(store.lower_values(pos, (field,)))
+                    for field in store.searchable
+                ))
+                for pos in range(len(store))
+            ),
+        )
+        conn.execute("INSERT INTO search (search) VALUES ('optimize')")
+
+        ranker = state.ranker
+        conn.executemany(
+            "INSERT INTO terms VALUES (?, ?, ?, ?)",
+            (
+                (term_id, term, ranker.positions[term].tobytes(), ranker.impacts[term].tobytes())
+                for term_id, term in enumerate(ranker.vocabulary)
+            ),
+        )
+        conn.execute("INSERT INTO terms_match (terms_match) VALUES ('rebuild')")
+
+        facets = state.facets
+        for field, bitmaps in facets.bitmaps.items():
+            lower = store.dictionaries[field].lower
+            width = (facets.size + 7) // 8
+            conn.executemany(
+                "INSERT INTO facets VALUES (?, ?, ?, ?, ?)",
+                (
+                    (field, code, value, lower[code], bitmaps[code].to_bytes(width, "little"))
+                    for code, value in enumerate(facets.values[field])
+                ),
+            )
+
+        fuzzy = state.fuzzy
+        conn.executemany(
+            "INSERT INTO fuzzy_terms VALUES (?, ?, ?, ?)",
+            (
+                (term_id, term, len(fuzzy.postings[term_id]), fuzzy.postings[term_id].tobytes())
+                for term_id, term in enumerate(fuzzy.terms)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO fuzzy_grams VALUES (?, ?)",
+            ((gram, term_id) for gram, term_ids in fuzzy.grams.items() for term_id in term_ids),
+        )
+
+        completions = state.autocomplete
+        conn.executemany(
+            "INSERT INTO completions VALUES (?, ?, ?)",
+            zip(range(len(completions.terms)), completions.terms, completions.weights),
+        )
+        conn.executemany(
+            "INSERT INTO completion_top VALUES (?, ?)",
+            ((prefix, array("I", ids).tobytes()) for prefix, ids in completions.top.items()),
+        )
+
+        similarity = state.similarity
+        arrays = {
+            "tfidf_idf": similarity.idf,
+            "tfidf_indptr": similarity.indptr,
+            "tfidf_indices": similarity.indices,
+            "tfidf_data": similarity.data,
+            "tfidf_rows": similarity.rows,
+            "neighbor_positions": state.neighbors.positions,
+            "neighbor_scores": state.neighbors.scores,
+            "topic_counts": state.topics.counts,
+            "topic_indptr": state.topics.indptr,
+            "topic_neighbors": state.topics.neighbors,
+            "topic_weights": state.topics.weights,
+            "topic_cooccurrences": state.topics.cooccurrences,
+            "dedup_ids": _text(state.duplicates.ids),
+            "dedup_hashes": _text(state.duplicates.hashes),
+            "dedup_signatures": state.duplicates.signatures,
+            "dedup_leaders": state.duplicates.leaders,
+            "dedup_flagged": state.duplicates.flagged,
+        }
+        save_arrays(arrays_path(path), arrays, {
+            "digest": digest.hex(),
+            "tfidf_terms": similarity.terms,
+            "topic_keywords": state.topics.keywords,
+        })
+        conn.commit()
+    except BaseException:
+        conn.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    conn.close()
+    os.replace(tmp_path, path)
+
+
+class SqliteDatabase:
+    """
+    Read-only connections to a SQLite index file, one per thread, so
+    request threads query it concurrently. Forked workers open their own;
+    every connection maps the same file through the OS page cache, as do
+    the memory-mapped arrays beside it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.meta: Dict[str, Any] = dict(self.query("SELECT key, value FROM meta"))
+        self.digest = bytes(self.meta["digest"])
+        self.size = int(self.meta["size"])
+        self.searchable: Tuple[str, ...] = tuple(self.meta["searchable"].split(","))
+        self.arrays_meta, self.arrays = load_arrays(arrays_path(self.path))
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            uri = f"{self.path.resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        return self._connection().execute(sql, params).fetchall()
+
+
+def open_database(path: Path, digest: bytes) -> Optional[SqliteDatabase]:
+    """
+    Open a SQLite index file, or return None if it or its arrays are
+    missing, from another layout version, or built from a different source
+    fingerprint.
+    """
+    if not path.exists() or not arrays_path(path).exists():
+        return None
+    try:
+        db = SqliteDatabase(path)
+    except (sqlite3.Error, KeyError, OSError, ValueError) as e:
+        print(f"⚠️ Warning: Ignoring unreadable SQLite index {path}: {e}")
+        return None
+    if db.meta.get("version") != str(SQLITE_INDEX_VERSION) or db.digest != digest:
+        return None
+    if db.arrays_meta.get("digest") != digest.hex():
+        return None
+    return db
+
+
+def _placeholders(n: int) -> str:
+    return ", ".join("?" * n)
+
+
+class SqliteRecords:
+    """Record access by position, decoding the stored JSON on demand."""
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.fields = dict(FIELDS)
+        self.searchable = db.searchable
+
+    def __len__(self) -> int:
+        return self.db.size
+
+    def record(self, pos: int, fields: Optional[Sequence[str]] = None) -> dict:
+        """One record as a plain dict, projected to `fields` when given."""
+        rows = self.db.query("SELECT record FROM records WHERE pos = ?", (pos,))
+        if not rows:
+            raise IndexError(pos)
+        record = orjson.loads(rows[0][0])
+        return {field: record[field] for field in fields} if fields else record
+
+    def value(self, pos: int, field: str):
+        """Original value of one field of one record."""
+        return self.record(pos)[field]
+
+    def position(self, record_id: str) -> Optional[int]:
+        """Position of the first record with this ID (case-insensitive), or None."""
+        rows = self.db.query(
+            "SELECT min(pos) FROM records WHERE lower(key) = ?", (record_id.strip().lower(),)
+        )
+        return rows[0][0]
+
+
+class SqliteFragments:
+    """Pre-serialized record JSON read straight from the records table."""
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.fields = tuple(FIELDS)
+        self.columns = {tuple(fields): f"p{i}" for i, fields in enumerate(COMMON_PROJECTIONS)}
+
+    def record(self, pos: int, fields: Sequence[str] = ()) -> bytes:
+        """JSON bytes of one record, projected to `fields` when given."""
+        fields = tuple(fields) or self.fields
+        column = "record" if fields == self.fields else self.columns.get(fields)
+        rows = self.db.query(f"SELECT {column or 'record'} FROM records WHERE pos = ?", (pos,))
+        if not rows:
+            raise IndexError(pos)
+        if column:
+            return rows[0][0]
+        record = orjson.loads(rows[0][0])
+        return orjson.dumps({field: record[field] for field in fields})
+
+    def fragment(self, pos: int, fields: Sequence[str] = ()) -> orjson.Fragment:
+        return orjson.Fragment(self.record(pos, fields))
+
+
+class SqliteHashes(Mapping):
+    """Record key -> content hash, read from the records table for reload diffs."""
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+
+    def __getitem__(self, key: str) -> str:
+        rows = self.db.query("SELECT hash FROM records WHERE key = ?", (key,))
+        if not rows:
+            raise KeyError(key)
+        return rows[0][0]
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, in self.db.query("SELECT key FROM records ORDER BY pos"))
+
+    def __len__(self) -> int:
+        return self.db.size
+
+    def items(self):
+        return self.db.query("SELECT key, hash FROM records ORDER BY pos")
+
+
+class SqliteIndex:
+    """
+    Substring search over the FTS5 trigram table. The trigram match narrows
+    candidates; `instr` on each field confirms `q` lies within one value,
+    and tokens under MIN_SUBSTRING_LENGTH must be whole terms of the
+    record, exactly as the in-memory index matches.
+    """
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.fields = db.searchable
+        self.size = db.size
+
+    def _term_positions(self, terms: Sequence[str]) -> Optional[set]:
+        """Records holding every one of `terms`, or None if one is not a term."""
+        rows = self.db.query(
+            f"SELECT positions FROM terms WHERE term IN ({_placeholders(len(terms))})", list(terms)
+        )
+        if len(rows) < len(terms):
+            return None
+        return set.intersection(*(set(_uint_array(blob)) for blob, in rows))
+
+    def search(self, q: str) -> List[int]:
+        """
+        Record positions with a searchable field containing `q`, in corpus order.
+        """
+        q = q.lower()
+        tokens = tokenize(q)
+        short = sorted({t for t in tokens if len(t) < MIN_SUBSTRING_LENGTH})
+        required = None
+        if short:
+            required = self._term_positions(short)
+            if required is None:
+                return []
+            if tokens == [q]:
+                return sorted(required)
+        contains = " OR ".join(f"instr({field}, ?) > 0" for field in self.fields)
+        params: list = [q] * len(self.fields)
+        if len(q) >= MIN_TRIGRAM_QUERY:
+            sql = f"SELECT rowid FROM search WHERE search MATCH ? AND ({contains}) ORDER BY rowid"
+            params.insert(0, '"' + q.replace('"', '""') + '"')
+        else:
+            sql = f"SELECT rowid FROM search WHERE {contains} ORDER BY rowid"
+        positions = [pos for pos, in self.db.query(sql, params)]
+        if required is not None:
+            positions = [pos for pos in positions if pos in required]
+        return positions
+
+
+class SqliteRanker(BM25Ranker):
+    """
+    BM25F scoring from impacts precomputed at build time and stored per term;
+    accumulation, selection and pagination are shared with the in-memory ranker.
+    """
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.size = db.size
+        self._terms = lru_cache(maxsize=4096)(self._terms_uncached)
+
+    def _terms_uncached(self, token: str) -> Tuple[Tuple[int, float], ...]:
+        # Substring tokens are at least MIN_TRIGRAM_QUERY long, so the trigram match applies
+        if len(token) < MIN_SUBSTRING_LENGTH:
+            rows = self.db.query("SELECT term_id, term FROM terms WHERE term = ?", (token,))
+        else:
+            rows = self.db.query(
+                "SELECT rowid, term FROM terms_match WHERE terms_match MATCH ? "
+                "AND instr(term, ?) > 0 ORDER BY rowid",
+                ('"' + token + '"', token),
+            )
+        rows.sort(key=lambda row: row[1] != token)
+        return tuple(
+            (term_id, 1.0 if term == token else PARTIAL_MATCH_WEIGHT) for term_id, term in rows
+        )
+
+    def postings(self, token: str) -> List[Tuple[Sequence[int], Sequence[float], float]]:
+        """
+        (positions, impacts, weight) of every term containing `token`, exact
+        term first; tokens under MIN_SUBSTRING_LENGTH match only themselves.
+        """
+        terms = self._terms(token)
+        if not terms:
+            return []
+        postings = {
+            term_id: (positions, impacts)
+            for term_id, positions, impacts in self.db.query(
+                f"SELECT term_id, positions, impacts FROM terms "
+                f"WHERE term_id IN ({_placeholders(len(terms))})",
+                [term_id for term_id, _ in terms],
+            )
+        }
+        # Same accumulation order as the in-memory ranker: exact term first
+        return [
+            (_uint_array(postings[term_id][0]), _float_array(postings[term_id][1]), weight)
+            for term_id, weight in terms
+        ]
+
+
+class SqliteFacetIndex(FacetIndex):
+    """
+    Facet filters and counts over the value bitmaps stored as blobs, read
+    and decoded once per opened index on first use, then served exactly
+    as the in-memory index serves them.
+    """
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.size = db.size
+        self.all = (1 << self.size) - 1
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            values: Dict[str, List[str]] = {field: [] for field in FACET_FIELDS}
+            bitmaps: Dict[str, List[int]] = {field: [] for field in FACET_FIELDS}
+            lookup: Dict[str, Dict[str, List[int]]] = {field: {} for field in FACET_FIELDS}
+            for field, code, value, lower, bitmap in self.db.query(
+                "SELECT field, code, value, lower, bitmap FROM facets ORDER BY field, code"
+            ):
+                values[field].append(value)
+                bitmaps[field].append(int.from_bytes(bitmap, "little"))
+                lookup[field].setdefault(lower, []).append(code)
+            self.values, self.bitmaps, self.lookup = values, bitmaps, lookup
+            self._loaded = True
+
+    def filter(self, filters: Dict[str, Optional[List[str]]]) -> int:
+        if not self._loaded:
+            self._load()
+        return super().filter(filters)
+
+    def counts(self, bitmap: int, limit: int = 10) -> Dict[str, List[dict]]:
+        if not self._loaded:
+            self._load()
+        return super().counts(bitmap, limit)
+
+
+class SqliteTrigramIndex:
+    """Typo-tolerant matching over the stored term trigrams."""
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+
+    def _similar(self, token: str) -> List[Tuple[int, str, int, int]]:
+        """(term id, term, distance, df) for terms within the token's edit budget."""
+        limit = max_edits(token)
+        token_grams = list(trigrams(token))
+        needed = len(token_grams) - 4 * limit
+        if needed > 0:
+            rows = self.db.query(
+                f"SELECT t.term_id, t.term, t.df FROM fuzzy_terms t JOIN ("
+                f"SELECT term_id FROM fuzzy_grams WHERE gram IN ({_placeholders(len(token_grams))}) "
+                f"GROUP BY term_id HAVING count(*) >= ?) g ON g.term_id = t.term_id",
+                [*token_grams, needed],
+            )
+        else:
+            # As in TrigramIndex: no trigram need be shared, so check by length
+            rows = self.db.query(
+                "SELECT term_id, term, df FROM fuzzy_terms WHERE length(term) BETWEEN ? AND ?",
+                (len(token) - limit, len(token) + limit),
+            )
+        matches = []
+        for term_id, term, df in rows:
+            distance = bounded_edit_distance(token, term, limit)
+            if distance <= limit:
+                matches.append((term_id, term, distance, df))
+        matches.sort(key=lambda m: (m[2], -m[3], m[0]))
+        return matches
+
+    def similar_terms(self, token: str) -> List[Tuple[str, int]]:
+        """Vocabulary terms within the token's edit budget, best first."""
+        return [(term, distance) for _, term, distance, _ in self._similar(token)]
+
+    def search(self, q: str) -> Tuple[List[int], Dict[str, str]]:
+        """
+        Records containing, for every query token, some term within its edit
+        budget. Also returns the best correction for each token.
+        """
+        result = None
+        corrections: Dict[str, str] = {}
+        for token in dict.fromkeys(tokenize(q)):
+            similar = self._similar(token)
+            if not similar:
+                return [], {}
+            corrections[token] = similar[0][1]
+            term_ids = [term_id for term_id, _, _, _ in similar]
+            positions = set()
+            for blob, in self.db.query(
+                f"SELECT positions FROM fuzzy_terms WHERE term_id IN ({_placeholders(len(term_ids))})",
+                term_ids,
+            ):
+                positions.update(_uint_array(blob))
+            result = positions if result is None else result & positions
+            if not result:
+                return [], corrections
+        return sorted(result or ()), corrections
+
+
+class SqliteAutocomplete:
+    """Completions from the stored per-prefix top-k and sorted term table."""
+
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.k = int(db.meta["completion_k"])
+        self.depth = int(db.meta["completion_depth"])
+
+    def complete(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Most used completions of a prefix."""
+        prefix = " ".join(tokenize(prefix)) + (" " if prefix[-1:].isspace() else "")
+        if not prefix.strip():
+            return []
+        if len(prefix) <= self.depth:
+            rows = self.db.query("SELECT ids FROM completion_top WHERE prefix = ?", (prefix,))
+            ids = list(_uint_array(rows[0][0]))[:limit] if rows else []
+            if not ids:
+                return []
+            found = dict(
+                (term_id, (term, weight)) for term_id, term, weight in self.db.query(
+                    f"SELECT term_id, term, weight FROM completions "
+                    f"WHERE term_id IN ({_placeholders(len(ids))})",
+                    ids,
+                )
+            )
+            entries = [found[term_id] for term_id in ids]
+        else:
+            entries = self.db.query(
+                "SELECT term, weight FROM completions WHERE term >= ? AND term < ? "
+                "ORDER BY weight DESC, term_id LIMIT ?",
+                (prefix, prefix + "\uffff", min(limit, self.k)),
+            )
+        return [{"text": term, "count": weight} for term, weight in entries]
+
+
+def _arrays(db: SqliteDatabase, prefix: str) -> Dict[str, np.ndarray]:
+    return {
+        name[len(prefix):]: values for name, values in db.arrays.items() if name.startswith(prefix)
+    }
+
+
+def load_similarity(db: SqliteDatabase) -> TfidfModel:
+    """The TF-IDF model over its memory-mapped CSR arrays; only the vocabulary is private."""
+    arrays = _arrays(db, "tfidf_")
+    return TfidfModel.from_arrays(
+        db.arrays_meta["tfidf_terms"],
+        arrays["idf"],
+        arrays["indptr"],
+        arrays["indices"],
+        arrays["data"],
+        arrays["rows"],
+    )
+
+
+def load_neighbors(db: SqliteDatabase) -> NeighborTable:
+    """The precomputed neighbor table, memory-mapped."""
+    arrays = _arrays(db, "neighbor_")
+    return NeighborTable(arrays["positions"], arrays["scores"])
+
+
+def load_topics(db: SqliteDatabase) -> KeywordGraph:
+    """The keyword co-occurrence graph over its memory-mapped adjacency arrays."""
+    arrays = _arrays(db, "topic_")
+    return KeywordGraph(
+        db.arrays_meta["topic_keywords"],
+        arrays["counts"],
+        arrays["indptr"],
+        arrays["neighbors"],
+        arrays["weights"],
+        arrays["cooccurrences"],
+    )
+
+
+def load_duplicates(db: SqliteDatabase) -> DuplicateIndex:
+    """Near-duplicate groups and signatures of the records as loaded, memory-mapped."""
+    arrays = _arrays(db, "dedup_")
+    return DuplicateIndex(
+        StoredStrings(arrays["ids"]),
+        StoredStrings(arrays["hashes"]),
+        arrays["signatures"],
+        arrays["leaders"],
+        arrays["flagged"],
+    )
@@ -0,0 +1,332 @@
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.utils.indexing import tokenize
+from app.utils.schema import CATEGORY, LIST, SCHEMA, SEARCHABLE_FIELDS, TEXT
+
+# Record layout (field -> column kind), in response key order
+FIELDS = {field: spec.kind for field, spec in SCHEMA.items()}
+
+# Default projection for list views: everything except long free text
+LIST_VIEW_FIELDS = tuple(f for f in FIELDS if f != "detailed_description")
+# Compact default for records cited as /describe sources
+SOURCE_FIELDS = ("id", "title", "organism", "platform", "data_url")
+
+# Short text columns with a precomputed lowercase copy for query-time
+# matching; category and list columns get theirs per distinct value. Long
+# text is matched through its tokens and only lowercased to verify phrases.
+LOWERCASE_FIELDS = ("id", "title")
+
+
+class StringDictionary:
+    """
+    Interned string values addressed by integer code, with lowercase forms.
+    """
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.lower: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.codes[value] = code
+            self.values.append(value)
+            self.lower.append(value.lower())
+        return code
+
+
+class RecordView(Mapping):
+    """Read-only, dict-like view of one record in a RecordStore."""
+
+    __slots__ = ("_store", "_pos")
+
+    def __init__(self, store: "RecordStore", pos: int):
+        self._store = store
+        self._pos = pos
+
+    def __getitem__(self, field: str):
+        if field not in self._store.fields:
+            raise KeyError(field)
+        return self._store.value(self._pos, field)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.fields)
+
+    def __len__(self) -> int:
+        return len(self._store.fields)
+
+    @property
+    def position(self) -> int:
+        return self._pos
+
+
+class RecordStore:
+    """
+    Columnar record storage: per-field arrays instead of one dict per record.
+
+    Repeated strings (keywords, organism, platform, ...) are interned once in
+    per-field dictionaries and stored as integer codes, and short search
+    columns are lowercased at build time so query paths rarely call `.lower()`.
+
+    Searchable fields are also tokenized once into arrays of term ids against
+    a shared vocabulary, which every index builds from instead of re-parsing
+    the text.
+    """
+
+    def __init__(
+        self,
+        records: Sequence[dict],
+        fields: Dict[str, str] = FIELDS,
+        searchable: Sequence[str] = SEARCHABLE_FIELDS,
+    ):
+        self.fields = dict(fields)
+        self.searchable = tuple(f for f in searchable if f in self.fields)
+        self.size = len(records)
+        self.text: Dict[str, List[Optional[str]]] = {}
+        self.lowercase: Dict[str, List[str]] = {}
+        self.categories: Dict[str, array] = {}
+        self.offsets: Dict[str, array] = {}
+        self.items: Dict[str, array] = {}
+        self.dictionaries: Dict[str, StringDictionary] = {}
+        # Tokenized search columns: text fields per record, others per value
+        self.vocabulary = StringDictionary()
+        self.token_offsets: Dict[str, array] = {}
+        self.token_items: Dict[str, array] = {}
+        self.value_tokens: Dict[str, List[array]] = {}
+
+        for field, kind in self.fields.items():
+            values = [record.get(field) for record in records]
+            if kind == TEXT:
+                self.text[field] = values
+                if field in LOWERCASE_FIELDS:
+                    self.lowercase[field] = [(v or "").lower() for v in values]
+            elif kind == CATEGORY:
+                dictionary = self.dictionaries[field] = StringDictionary()
+                self.categories[field] = array(
+                    "i", (dictionary.encode(v) if v else -1 for v in values)
+                )
+            elif kind == LIST:
+                dictionary = self.dictionaries[field] = StringDictionary()
+                offsets = array("I", [0])
+                items = array("I")
+                for value in values:
+                    items.extend(dictionary.encode(str(v)) for v in value or () if v)
+                    offsets.append(len(items))
+                self.offsets[field] = offsets
+                self.items[field] = items
+            else:
+                raise ValueError(f"Unknown column kind {kind!r} for {field}")
+
+        for field in self.searchable:
+            if self.fields[field] == TEXT:
+                offsets = array("I", [0])
+                items = array("I")
+                for value in self.lowercase.get(field) or self.text[field]:
+                    items.extend(self._term_ids(value))
+                    offsets.append(len(items))
+                self.token_offsets[field] = offsets
+                self.token_items[field] = items
+            else:
+                self.value_tokens[field] = [
+                    self._term_ids(value) for value in self.dictionaries[field].lower
+                ]
+
+    @classmethod
+    def merge(cls, segments: Iterable["RecordStore"]) -> "RecordStore":
+        """
+        Concatenate stores built separately (one per data shard) into one.
+        The first segment is extended in place; the rest can be freed as
+        soon as they are merged.
+        """
+        segments = iter(segments)
+        store = next(segments, None)
+        if store is None:
+            return cls(())
+        for segment in segments:
+            store.extend(segment)
+        return store
+
+    def extend(self, other: "RecordStore") -> None:
+        """
+        Append the records of another store with the same layout, re-coding
+        its dictionary codes and term ids into this store's.
+        """
+        if other.fields != self.fields or other.searchable != self.searchable:
+            raise ValueError("Cannot merge record stores with different layouts")
+        encode_term = self.vocabulary.encode
+        term_ids = array("I", (encode_term(term) for term in other.vocabulary.values))
+
+        for field, kind in self.fields.items():
+            if kind == TEXT:
+                self.text[field].extend(other.text[field])
+                if field in self.lowercase:
+                    self.lowercase[field].extend(other.lowercase[field])
+                continue
+
+            dictionary = self.dictionaries[field]
+            known = len(dictionary)
+            codes = array("i", (dictionary.encode(v) for v in other.dictionaries[field].values))
+            if field in self.value_tokens:
+                # New values get codes in order, so their token arrays append in order
+                value_tokens = self.value_tokens[field]
+                for code, tokens in zip(codes, other.value_tokens[field]):
+                    if code >= known:
+                        value_tokens.append(array("I", map(term_ids.__getitem__, tokens)))
+            if kind == CATEGORY:
+                self.categories[field].extend(
+                    codes[code] if code >= 0 else -1 for code in other.categories[field]
+                )
+            else:
+                self._extend_offsets(self.offsets[field], self.items[field], other.offsets[field])
+                self.items[field].extend(map(codes.__getitem__, other.items[field]))
+
+        for field, items in other.token_items.items():
+            self._extend_offsets(self.token_offsets[field], self.token_items[field], other.token_offsets[field])
+            self.token_items[field].extend(map(term_ids.__getitem__, items))
+
+        self.size += other.size
+        self.__dict__.pop("_id_positions", None)
+
+    @staticmethod
+    def _extend_offsets(offsets: array, items: array, other_offsets: array) -> None:
+        base = len(items)
+        offsets.extend(base + offset for offset in other_offsets[1:])
+
+    def take(self, positions: Sequence[int]) -> "RecordStore":
+        """
+        A store of the records at `positions`, in that order. Dictionaries
+        and the vocabulary are shared with this store, so codes and term ids
+        carry over unchanged.
+        """
+        store = RecordStore.__new__(RecordStore)
+        store.fields = self.fields
+        store.searchable = self.searchable
+        store.size = len(positions)
+        store.text = {f: [column[p] for p in positions] for f, column in self.text.items()}
+        store.lowercase = {f: [column[p] for p in positions] for f, column in self.lowercase.items()}
+        store.categories = {
+            f: array("i", (column[p] for p in positions)) for f, column in self.categories.items()
+        }
+        store.dictionaries = self.dictionaries
+        store.vocabulary = self.vocabulary
+        store.value_tokens = self.value_tokens
+        store.offsets, store.items = self._take_ragged(self.offsets, self.items, positions)
+        store.token_offsets, store.token_items = self._take_ragged(
+            self.token_offsets, self.token_items, positions
+        )
+        return store
+
+    @staticmethod
+    def _take_ragged(
+        offsets: Dict[str, array], items: Dict[str, array], positions: Sequence[int]
+    ) -> Tuple[Dict[str, array], Dict[str, array]]:
+        new_offsets, new_items = {}, {}
+        for field, field_offsets in offsets.items():
+            field_items = items[field]
+            taken_offsets = array("I", [0])
+            taken = array("I")
+            for pos in positions:
+                taken.extend(field_items[field_offsets[pos]:field_offsets[pos + 1]])
+                taken_offsets.append(len(taken))
+            new_offsets[field], new_items[field] = taken_offsets, taken
+        return new_offsets, new_items
+
+    def _term_ids(self, text: Optional[str]) -> array:
+        encode = self.vocabulary.encode
+        return array("I", (encode(term) for term in tokenize(text or "")))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, pos: int) -> RecordView:
+        if not 0 <= pos < self.size:
+            raise IndexError(pos)
+        return RecordView(self, pos)
+
+    def __iter__(self) -> Iterator[RecordView]:
+        return (RecordView(self, pos) for pos in range(self.size))
+
+    def _codes(self, pos: int, field: str) -> array:
+        offsets = self.offsets[field]
+        return self.items[field][offsets[pos]:offsets[pos + 1]]
+
+    def position(self, record_id: str) -> Optional[int]:
+        """Position of the first record with this ID (case-insensitive), or None."""
+        positions = self.__dict__.get("_id_positions")
+        if positions is None:
+            positions = {}
+            for pos, value in enumerate(self.text.get("id", ())):
+                if value:
+                    positions.setdefault(value.lower(), pos)
+            self._id_positions = positions
+        return positions.get(record_id.strip().lower())
+
+    def value(self, pos: int, field: str):
+        """Original value of one field of one record."""
+        kind = self.fields[field]
+        if kind == TEXT:
+            return self.text[field][pos]
+        if kind == CATEGORY:
+            code = self.categories[field][pos]
+            return self.dictionaries[field].values[code] if code >= 0 else None
+        values = self.dictionaries[field].values
+        return [values[code] for code in self._codes(pos, field)]
+
+    def token_ids(self, pos: int, field: str) -> array:
+        """Term ids (into `vocabulary`) of one searchable field, in order."""
+        if field in self.token_offsets:
+            offsets = self.token_offsets[field]
+            return self.token_items[field][offsets[pos]:offsets[pos + 1]]
+        value_tokens = self.value_tokens[field]
+        if self.fields[field] == CATEGORY:
+            code = self.categories[field][pos]
+            return value_tokens[code] if code >= 0 else array("I")
+        ids = array("I")
+        for code in self._codes(pos, field):
+            ids.extend(value_tokens[code])
+        return ids
+
+    def tokens(self, pos: int, field: str) -> List[str]:
+        """Lowercase terms of one searchable field, in order."""
+        terms = self.vocabulary.values
+        return [terms[i] for i in self.token_ids(pos, field)]
+
+    def lower_values(self, pos: int, fields: Sequence[str]) -> List[str]:
+        """Non-empty lowercase values of the given fields, lists flattened."""
+        return list(self.iter_lower_values(pos, fields))
+
+    def iter_lower_values(self, pos: int, fields: Sequence[str]) -> Iterator[str]:
+        """
+        Lowercase values of the given fields, lists flattened, lowercasing
+        long text only when the iteration reaches it.
+        """
+        for field in fields:
+            kind = self.fields[field]
+            if kind == TEXT:
+                column = self.lowercase.get(field)
+                value = column[pos] if column is not None else (self.text[field][pos] or "").lower()
+                if value:
+                    yield value
+            elif kind == CATEGORY:
+                code = self.categories[field][pos]
+                if code >= 0:
+                    yield self.dictionaries[field].lower[code]
+            else:
+                lower = self.dictionaries[field].lower
+                yield from (lower[code] for code in self._codes(pos, field))
+
+    def record(self, pos: int, fields: Optional[Sequence[str]] = None) -> dict:
+        """
+        Materialize one record as a plain dict for a response body,
+        projected to `fields` when given.
+        """
+        return {field: self.value(pos, field) for field in (fields or self.fields)}
@@ -1,102 +1,325 @@
-import requests
+import asyncio
 import os
+import secrets
+import time
+from typing import Optional
+
+import httpx
+import redis.asyncio as redis
+import requests
+
+from app.config import settings
+from app.utils.singleflight import SingleFlight
+from app.utils.summary_cache import SummaryCache, summary_key
 
 # Hugging Face API configuration
 HF_API_URL = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
 
+# HF API has input length limits
+MAX_INPUT_CHARS = 1024
+
+# Shared async client: one connection pool, kept alive across requests
+_client: Optional[httpx.AsyncClient] = None
+
+# Summaries already produced, shared by every worker through one SQLite file
+summary_cache = SummaryCache(
+    settings.SUMMARY_CACHE_PATH or None, settings.SUMMARY_CACHE_SIZE, settings.SUMMARY_CACHE_MAX_ROWS
+)
+
+# Upstream calls in progress in this worker, by cache key
+_flights = SingleFlight()
+
+# Redis client coordinating upstream calls across workers (REDIS_HOST set)
+_redis: Optional[redis.Redis] = None
+
+# Redis keys of the cross-worker lock and of the lock holder's result
+LOCK_PREFIX = "bioverse:summary-lock:"
+RESULT_PREFIX = "bioverse:summary:"
+# Seconds a result stays in Redis for workers that waited on it
+RESULT_TTL = 60
+# Seconds between checks while another worker holds a key's lock
+LOCK_POLL_INTERVAL = 0.05
+
+# Deletes the lock only if this worker still holds it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+return 0
+"""
+
 def get_hf_token():
     """Get Hugging Face API token from environment variable."""
     return os.getenv("HF_API_TOKEN", None)
 
+def fallback_summary(text: str) -> str:
+    """Truncated text, served whenever the summarization API cannot answer."""
+    return text[:500] + "..." if len(text) > 500 else text
+
+def _request(text: str, hf_token: str, max_len: int, min_len: int) -> dict:
+    """Headers and JSON payload of a summarization request."""
+    return {
+        "headers": {
+            "Authorization": f"Bearer {hf_token}",
+            "Content-Type": "application/json"
+        },
+        "json": {
+            "inputs": text[:MAX_INPUT_CHARS],
+            "parameters": {
+                "max_length": max_len,
+                "min_length": min_len,
+                "do_sample": False
+            },
+            "options": {
+                "wait_for_model": True  # Wait if model is loading
+            }
+        },
+    }
+
+def _cache_key(text: str, max_len: int, min_len: int) -> bytes:
+    """Cache key of a summary: the model and exactly what is sent to it."""
+    return summary_key(HF_API_URL, text[:MAX_INPUT_CHARS], max_len, min_len)
+
+def _parse_response(status_code: int, body, raw: str) -> Optional[str]:
+    """Summary from an API response, or None for errors and odd payloads."""
+    if status_code == 200:
+        # HF API returns a list
+        if isinstance(body, list) and len(body) > 0:
+            summary = body[0].get("summary_text", "")
+            if summary:
+                return summary
+        return None
+
+    # Model loading on HF servers
+    if status_code == 503:
+        estimated_time = body.get("estimated_time", 20) if isinstance(body, dict) else 20
+        print(f"⏳ Model is loading on HF servers (~{estimated_time}s). Using fallback.")
+    elif status_code == 429:
+        print("⚠️ Rate limit reached. Using fallback truncation.")
+    else:
+        print(f"⚠️ HF API error {status_code}: {raw}")
+    return None
+
+def _precheck(text: str) -> Optional[str]:
+    """The answer for inputs that need no API call, else None."""
+    if not text or not text.strip():
+        return "No content available to summarize."
+
+    # Only summarize if text is long enough
+    if len(text) < 100:
+        return text
+
+    if not get_hf_token():
+        print("⚠️ Warning: HF_API_TOKEN not set. Using fallback truncation.")
+        print("   Get a free token at: https://huggingface.co/settings/tokens")
+        return fallback_summary(text)
+    return None
+
 def summarize_text(text: str, max_len: int = 120, min_len: int = 30) -> str:
     """
     Summarize text using Hugging Face Inference API.
     No local model download required - uses cloud API.
-    
+
+    Blocking; request handlers should await `summarize_text_async`.
+
     Args:
         text: Text to summarize
         max_len: Maximum length of summary
         min_len: Minimum length of summary
-    
+
     Returns:
         Summarized text or truncated text if API fails
     """
-    if not text or not text.strip():
-        return "No content available to summarize."
-    
-    # Only summarize if text is long enough
-    if len(text) < 100:
-        return text
-    
-    # Get API token
-    hf_token = get_hf_token()
-    
-    if not hf_token:
-        print("⚠️ Warning: HF_API_TOKEN not set. Using fallback truncation.")
-        print("   Get a free token at: https://huggingface.co/settings/tokens")
-        return text[:500] + "..." if len(text) > 500 else text
-    
+    answer = _precheck(text)
+    if answer is not None:
+        return answer
+
+    key = _cache_key(text, max_len, min_len)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached
+
     try:
-        headers = {
-            "Authorization": f"Bearer {hf_token}",
-            "Content-Type": "application/json"
-        }
-        
-        # Prepare payload (truncate input to API limits)
-        payload = {
-            "inputs": text[:1024],  # HF API has input length limits
-            "parameters": {
-                "max_length": max_len,
-                "min_length": min_len,
-                "do_sample": False
-            },
-            "options": {
-                "wait_for_model": True  # Wait if model is loading
-            }
-        }
-        
-        # Make API request
         response = requests.post(
-            HF_API_URL, 
-            headers=headers, 
-            json=payload, 
-            timeout=30
+            HF_API_URL,
+            timeout=settings.SUMMARIZER_TIMEOUT,
+            **_request(text, get_hf_token(), max_len, min_len)
         )
-        
-        # Handle successful response
-        if response.status_code == 200:
-            result = response.json()
-            
-            # Parse response (HF API returns a list)
-            if isinstance(result, list) and len(result) > 0:
-                summary = result[0].get("summary_text", "")
-                if summary:
-                    return summary
-            
-            # Fallback if parsing fails
-            return text[:500] + "..." if len(text) > 500 else text
-        
-        # Handle model loading (503 status)
-        elif response.status_code == 503:
-            error_data = response.json()
-            estimated_time = error_data.get("estimated_time", 20)
-            print(f"⏳ Model is loading on HF servers (~{estimated_time}s). Using fallback.")
-            return text[:500] + "..." if len(text) > 500 else text
-        
-        # Handle rate limiting
-        elif response.status_code == 429:
-            print("⚠️ Rate limit reached. Using fallback truncation.")
-            return text[:500] + "..." if len(text) > 500 else text
-        
-        # Handle other errors
-        else:
-            print(f"⚠️ HF API error {response.status_code}: {response.text}")
-            return text[:500] + "..." if len(text) > 500 else text
-            
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        summary = _parse_response(response.status_code, body, response.text)
+        if summary is None:
+            return fallback_summary(text)
+        summary_cache.put(key, summary)
+        return summary
+
     except requests.exceptions.Timeout:
         print("⚠️ HF API request timed out. Using fallback.")
-        return text[:500] + "..." if len(text) > 500 else text
-    
+        return fallback_summary(text)
+
+    except Exception as e:
+        print(f"❌ Summarization failed: {e}")
+        return fallback_summary(text)
+
+def get_client() -> httpx.AsyncClient:
+    """
+    The process-wide async client. Its pool keeps connections to the API
+    alive between requests, so most summaries skip the TCP and TLS setup.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.SUMMARIZER_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUMMARIZER_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+            timeout=settings.SUMMARIZER_TIMEOUT,
+        )
+    return _client
+
+def get_redis() -> Optional[redis.Redis]:
+    """The process-wide Redis client, or None when REDIS_HOST is not set."""
+    global _redis
+    if _redis is None and settings.REDIS_HOST:
+        _redis = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD or None,
+            decode_responses=True,
+        )
+    return _redis
+
+async def close_client() -> None:
+    """Close the shared clients' pooled connections, e.g. on shutdown."""
+    global _client, _redis
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+async def _call_api(key: bytes, text: str, max_len: int, min_len: int) -> Optional[str]:
+    """One request to the API; the summary, cached, or None if it failed."""
+    try:
+        response = await get_client().post(
+            HF_API_URL,
+            **_request(text, get_hf_token(), max_len, min_len)
+        )
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        summary = _parse_response(response.status_code, body, response.text)
+        if summary is not None:
+            await asyncio.get_running_loop().run_in_executor(None, summary_cache.put, key, summary)
+        return summary
+
+    except httpx.TimeoutException:
+        print("⚠️ HF API request timed out. Using fallback.")
+        return None
+
     except Exception as e:
         print(f"❌ Summarization failed: {e}")
-        return text[:500] + "..." if len(text) > 500 else text
+        return None
+
+async def _summarize_shared(key: bytes, text: str, max_len: int, min_len: int) -> Optional[str]:
+    """
+    The upstream call for `key`, made once for every caller in this worker.
+
+    With Redis configured, workers also take a per-key lock, so only one
+    of them calls the API at a time; the others poll for the holder's
+    result and take the lock over if it finishes without one. Redis errors
+    fall back to calling the API directly.
+    """
+    client = get_redis()
+    if client is None:
+        return await _call_api(key, text, max_len, min_len)
+
+    name = key.hex()
+    lock, result = LOCK_PREFIX + name, RESULT_PREFIX + name
+    token = secrets.token_hex(16)
+    # A crashed holder's lock expires shortly after its request would have
+    lock_ttl = int((settings.SUMMARIZER_TIMEOUT + 5) * 1000)
+    give_up = time.monotonic() + settings.SUMMARIZER_TIMEOUT
+    try:
+        while not await client.set(lock, token, nx=True, px=lock_ttl):
+            summary, held = await client.pipeline().get(result).exists(lock).execute()
+            if summary is not None:
+                await asyncio.get_running_loop().run_in_executor(None, summary_cache.put, key, summary)
+                return summary
+            if time.monotonic() >= give_up:
+                print("⚠️ Timed out waiting on another worker's summarization. Using fallback.")
+                return None
+            if held:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+        # The previous holder may have finished just before the lock was free
+        summary = await client.get(result)
+    except redis.RedisError as e:
+        print(f"⚠️ Redis unavailable, summarizing without a cross-worker lock: {e}")
+        return await _call_api(key, text, max_len, min_len)
+
+    try:
+        if summary is not None:
+            await asyncio.get_running_loop().run_in_executor(None, summary_cache.put, key, summary)
+            return summary
+        summary = await _call_api(key, text, max_len, min_len)
+        if summary is not None:
+            await client.set(result, summary, ex=RESULT_TTL)
+        return summary
+    except redis.RedisError as e:
+        print(f"⚠️ Could not share summary through Redis: {e}")
+        return summary
+    finally:
+        try:
+            await client.eval(_RELEASE_SCRIPT, 1, lock, token)
+        except redis.RedisError as e:
+            print(f"⚠️ Could not release summary lock (expires on its own): {e}")
+
+async def summarize_text_async(
+    text: str,
+    max_len: int = 120,
+    min_len: int = 30,
+    deadline: Optional[float] = None,
+) -> str:
+    """
+    Non-blocking `summarize_text` over the shared connection pool.
+
+    `deadline` is a `time.monotonic()` instant the whole call must finish
+    by, connection wait included; when it passes, or is already past, the
+    fallback truncation is returned instead of waiting on the API.
+
+    Concurrent calls for the same text and parameters share one upstream
+    request (across workers too, with Redis); a caller that runs out of
+    time stops waiting without cancelling it for the others.
+    """
+    answer = _precheck(text)
+    if answer is not None:
+        return answer
+
+    # Memory hits are answered on the event loop; disk reads and writes go
+    # to a thread so a busy cache file never stalls it
+    key = _cache_key(text, max_len, min_len)
+    cached = summary_cache.get(key, disk=False)
+    if cached is None:
+        cached = await asyncio.get_running_loop().run_in_executor(None, summary_cache.get, key)
+    if cached is not None:
+        return cached
+
+    budget = settings.SUMMARIZER_TIMEOUT
+    if deadline is not None:
+        budget = min(budget, deadline - time.monotonic())
+    if budget <= 0:
+        print("⚠️ No time left for summarization. Using fallback.")
+        return fallback_summary(text)
+
+    try:
+        summary = await asyncio.wait_for(
+            _flights.do(key, lambda: _summarize_shared(key, text, max_len, min_len)),
+            timeout=budget,
+        )
+    except asyncio.TimeoutError:
+        print(f"⚠️ Summarization exceeded its {budget:.1f}s budget. Using fallback.")
+        return fallback_summary(text)
+    return summary if summary is not None else fallback_summary(text)
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from prometheus_client import Counter
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key BLOB PRIMARY KEY, summary TEXT, stored_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS summaries_stored_at ON summaries (stored_at);
+"""
+
+# Seconds a worker waits on another worker's write before giving up on the store
+BUSY_TIMEOUT = 1.0
+
+# Puts by one worker between prunes of the store down to its row limit
+PRUNE_INTERVAL = 100
+
+# Exported on /metrics; `stats` keeps the same counts for the admin report
+LOOKUPS = Counter(
+    "summary_cache_lookups", "Summary cache lookups by outcome", ["result"]
+)
+LOOKUP_RESULTS = {
+    "memory_hits": LOOKUPS.labels("memory_hit"),
+    "disk_hits": LOOKUPS.labels("disk_hit"),
+    "misses": LOOKUPS.labels("miss"),
+}
+PRUNED = Counter("summary_cache_pruned_rows", "Summaries pruned from the shared store")
+
+
+def summary_key(model: str, text: str, max_len: int, min_len: int) -> bytes:
+    """Content address of a summary: the model, its exact input and parameters."""
+    digest = hashlib.sha256()
+    for part in (model, str(max_len), str(min_len), text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class SummaryCache:
+    """
+    Summaries by content address, in an LRU dict in front of a SQLite file
+    that survives restarts and is shared by every worker process. Only
+    summaries the API produced are stored, never fallback truncations.
+
+    Store errors are logged and treated as misses, so a broken or locked
+    file costs a summarization call, not a failed request. With `max_rows`,
+    the file is pruned to the most recently stored summaries every
+    PRUNE_INTERVAL puts.
+    """
+
+    def __init__(self, path: Optional[Path], size: int, max_rows: int = 0):
+        self.path = Path(path) if path else None
+        self.size = size
+        self.max_rows = max_rows
+        self._puts = 0
+        # Memory hits never wait on disk I/O held by another thread
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._memory: "OrderedDict[bytes, str]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "stored": 0, "pruned": 0
+        }
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._pid != os.getpid():
+            # Forked workers open their own connection
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.path), timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA_SQL)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _count(self, outcome: str) -> None:
+        self.stats[outcome] += 1
+        LOOKUP_RESULTS[outcome].inc()
+
+    def _remember(self, key: bytes, summary: str) -> None:
+        self._memory[key] = summary
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: bytes, disk: bool = True) -> Optional[str]:
+        """
+        The cached summary for `key`, from memory first, then disk. With
+        `disk=False` a memory miss returns None without being counted, for
+        callers that go to disk on another thread.
+        """
+        with self._lock:
+            summary = self._memory.get(key)
+            if summary is not None:
+                self._memory.move_to_end(key)
+                self._count("memory_hits")
+                return summary
+        if not disk:
+            return None
+        with self._db_lock:
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT summary FROM summaries WHERE key = ?", (key,)
+                ).fetchone() if conn else None
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ Summary cache read failed: {e}")
+                row = None
+        with self._lock:
+            if row is None:
+                self._count("misses")
+                return None
+            self._count("disk_hits")
+            self._remember(key, row[0])
+        return row[0]
+
+    def put(self, key: bytes, summary: str) -> None:
+        """Cache a summary in memory and on disk, pruning the disk store now and then."""
+        with self._lock:
+            self._remember(key, summary)
+        pruned = 0
+        with self._db_lock:
+            try:
+                conn = self._connection()
+                if conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)", (key, summary, time.time())
+                    )
+                    self._puts += 1
+                    if self.max_rows and self._puts % PRUNE_INTERVAL == 0:
+                        pruned = self._prune(conn)
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ Summary cache write failed: {e}")
+                return
+        with self._lock:
+            self.stats["stored"] += 1
+            self.stats["pruned"] += pruned
+        PRUNED.inc(pruned)
+
+    def _prune(self, conn: sqlite3.Connection) -> int:
+        """Delete all but the `max_rows` most recently stored summaries."""
+        return conn.execute(
+            "DELETE FROM summaries WHERE key IN "
+            "(SELECT key FROM summaries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        ).rowcount
+
+    def report(self) -> dict:
+        """Hit and miss counts of this worker, with the cache sizes."""
+        with self._db_lock:
+            try:
+                conn = self._connection()
+                stored = conn.execute("SELECT count(*) FROM summaries").fetchone()[0] if conn else None
+            except (sqlite3.Error, OSError):
+                stored = None
+        with self._lock:
+            stats = dict(self.stats)
+            memory_entries = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        return {
+            **stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "memory_entries": memory_entries,
+            "disk_entries": stored,
+            "max_rows": self.max_rows or None,
+            "path": str(self.path) if self.path else None,
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn, self._pid = None, None
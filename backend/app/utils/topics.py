@@ -0,0 +1,151 @@
+import math
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.utils.indexing import tokenize
+from app.utils.store import RecordStore
+
+# Keyword pairs seen together in fewer records than this are noise, not topics
+MIN_COOCCURRENCE = 2
+
+# Longest keyword phrase, in tokens, looked up in a query
+MAX_PHRASE_TOKENS = 4
+
+
+class KeywordGraph:
+    """
+    Keyword co-occurrence graph: an edge joins two keywords listed on the
+    same records, weighted by pointwise mutual information,
+    log(N * n(a, b) / (n(a) * n(b))).
+
+    Only each keyword's `n` strongest positive-PMI edges are kept, stored as
+    CSR adjacency arrays (indptr, neighbor ids, PMI, pair counts) with
+    every list pre-sorted, so related topics are one array slice.
+    """
+
+    def __init__(
+        self,
+        keywords: List[str],
+        counts: np.ndarray,
+        indptr: np.ndarray,
+        neighbors: np.ndarray,
+        weights: np.ndarray,
+        cooccurrences: np.ndarray,
+    ):
+        self.keywords = keywords
+        # Keywords by their tokens rejoined, the form a query spells them in
+        self.ids: Dict[str, int] = {}
+        for i, keyword in enumerate(keywords):
+            self.ids.setdefault(" ".join(tokenize(keyword)), i)
+        self.counts = counts
+        self.indptr = indptr
+        self.neighbors = neighbors
+        self.weights = weights
+        self.cooccurrences = cooccurrences
+
+    @classmethod
+    def build(cls, store: RecordStore, n: int, field: str = "keywords") -> "KeywordGraph":
+        """Count keyword pairs over every record and keep each keyword's top-n edges."""
+        if field not in store.dictionaries:
+            empty = np.zeros(0, dtype=np.int32)
+            return cls([], empty, np.zeros(1, dtype=np.int64), empty, empty.astype(np.float32), empty)
+
+        # Case variants of a keyword are one node
+        lower = store.dictionaries[field].lower
+        keywords = sorted(set(lower))
+        node = {keyword: i for i, keyword in enumerate(keywords)}
+        code_node = [node[keyword] for keyword in lower]
+
+        counts: Counter = Counter()
+        pairs: Counter = Counter()
+        for pos in range(len(store)):
+            nodes = sorted({code_node[code] for code in store._codes(pos, field)})
+            counts.update(nodes)
+            for i, a in enumerate(nodes):
+                for b in nodes[i + 1:]:
+                    pairs[a, b] += 1
+
+        edges: List[List[Tuple[float, int, int]]] = [[] for _ in keywords]
+        size = len(store)
+        for (a, b), together in pairs.items():
+            if together < MIN_COOCCURRENCE:
+                continue
+            pmi = math.log(size * together / (counts[a] * counts[b]))
+            if pmi > 0:
+                edges[a].append((pmi, together, b))
+                edges[b].append((pmi, together, a))
+
+        indptr = [0]
+        neighbors: List[int] = []
+        weights: List[float] = []
+        cooccurrences: List[int] = []
+        for row in edges:
+            # Strongest first; among equal PMI, the better attested pair
+            for pmi, together, other in sorted(row, key=lambda e: (-e[0], -e[1], e[2]))[:n]:
+                neighbors.append(other)
+                weights.append(pmi)
+                cooccurrences.append(together)
+            indptr.append(len(neighbors))
+
+        return cls(
+            keywords,
+            np.array([counts[i] for i in range(len(keywords))], dtype=np.int32),
+            np.array(indptr, dtype=np.int64),
+            np.array(neighbors, dtype=np.int32),
+            np.array(weights, dtype=np.float32),
+            np.array(cooccurrences, dtype=np.int32),
+        )
+
+    def related(self, keyword: str, limit: int = 10) -> List[dict]:
+        """Keywords most associated with `keyword`, strongest first."""
+        i = self.ids.get(" ".join(tokenize(keyword)))
+        if i is None:
+            return []
+        start = self.indptr[i]
+        end = min(self.indptr[i + 1], start + limit)
+        return [
+            {
+                "keyword": self.keywords[self.neighbors[j]],
+                "pmi": round(float(self.weights[j]), 4),
+                "count": int(self.cooccurrences[j]),
+            }
+            for j in range(start, end)
+        ]
+
+    def find(self, q: str) -> List[str]:
+        """Keywords spelled out in a query, longest phrases first, not overlapping."""
+        tokens = tokenize(q)
+        found = []
+        start = 0
+        while start < len(tokens):
+            for length in range(min(MAX_PHRASE_TOKENS, len(tokens) - start), 0, -1):
+                phrase = " ".join(tokens[start:start + length])
+                if phrase in self.ids:
+                    found.append(phrase)
+                    start += length
+                    break
+            else:
+                start += 1
+        return found
+
+    def expand(self, q: str, limit: int) -> List[str]:
+        """
+        Up to `limit` related keywords for the keywords in a query, by PMI
+        summed over the query's keywords, excluding those already in it.
+        """
+        found = [self.ids[phrase] for phrase in self.find(q)]
+        # (summed PMI, summed pair count) per candidate; counts break PMI ties
+        weights: Dict[int, Tuple[float, int]] = {}
+        for i in found:
+            for j in range(self.indptr[i], self.indptr[i + 1]):
+                other = int(self.neighbors[j])
+                pmi, together = weights.get(other, (0.0, 0))
+                weights[other] = (pmi + float(self.weights[j]), together + int(self.cooccurrences[j]))
+        for i in found:
+            weights.pop(i, None)
+        ranked = sorted(
+            weights, key=lambda other: (-weights[other][0], -weights[other][1], other)
+        )[:limit]
+        return [self.keywords[other] for other in ranked]
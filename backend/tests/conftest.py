@@ -0,0 +1,72 @@
+import os
+import random
+import re
+from pathlib import Path
+
+# Settings are read at import; point them at the bundled corpus before any app import
+DATA_FILE = Path(__file__).resolve().parents[1] / "data" / "nasa_bio_data.json"
+os.environ.setdefault("DATA_SOURCE", str(DATA_FILE))
+os.environ.setdefault("SUMMARY_CACHE_PATH", "")
+os.environ.setdefault("REDIS_HOST", "")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.database as database
+from app.database import build_state, load_data, source_digest, sqlite_state
+from app.routes import autocomplete, recommend, search
+from app.utils.sqlite_index import build_database, open_database
+
+
+@pytest.fixture(scope="session")
+def memory_state():
+    """Dataset state built in memory from the bundled corpus."""
+    return build_state(*load_data(), source_digest())
+
+
+QUERY_PATTERN = re.compile(r"^[a-zA-Z0-9\s\-_]+$")
+FIXED_QUERIES = [
+    "a", "ab", "-", "_", "mice", "bone loss", "arabidopsis", "exp0", "rodent research", "nasa",
+    "spaceflight", "microgravity", "muscle atrophy", "radiation", "mouse liver", "cel", "zzzz",
+]
+
+
+@pytest.fixture(scope="session")
+def queries(memory_state):
+    """410 queries: whole terms, term pairs and fragments of terms from the corpus vocabulary."""
+    rng = random.Random(7)
+    words = sorted(w for w in memory_state.store.vocabulary.values if QUERY_PATTERN.match(w))
+    sampled = []
+    for _ in range(410 - len(FIXED_QUERIES)):
+        q = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        if rng.random() < 0.5:
+            start = rng.randint(0, max(0, len(q) - 2))
+            q = q[start:start + rng.randint(1, 8)]
+        sampled.append(q.strip() or "a")
+    return FIXED_QUERIES + sampled
+
+
+@pytest.fixture(scope="session")
+def disk_state(memory_state, tmp_path_factory):
+    """The same state written to a SQLite index file and served from it."""
+    path = tmp_path_factory.mktemp("sqlite") / "index.sqlite"
+    build_database(path, memory_state, memory_state.digest)
+    return sqlite_state(open_database(path, memory_state.digest))
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Client for the list routes, serving whichever state `serve` installs."""
+    app = FastAPI()
+    for module in (search, recommend, autocomplete):
+        app.include_router(module.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Install a dataset state as the one routes read."""
+    def install(state):
+        monkeypatch.setattr(database, "_state", state)
+    return install
@@ -0,0 +1,52 @@
+"""
+Completions are the heaviest dictionary entries starting with the typed
+prefix, whether served from the precomputed per-prefix lists or by
+bisecting, and weights count the records using each entry.
+"""
+from collections import Counter
+
+from app.utils.autocomplete import PHRASE_FIELDS, TERM_FIELDS
+from app.utils.indexing import tokenize
+
+
+def brute_force(autocomplete, prefix, limit):
+    matches = [i for i, term in enumerate(autocomplete.terms) if term.startswith(prefix)]
+    matches.sort(key=lambda i: (-autocomplete.weights[i], i))
+    return [
+        {"text": autocomplete.terms[i], "count": autocomplete.weights[i]}
+        for i in matches[:min(limit, autocomplete.k)]
+    ]
+
+
+def test_weights_count_records(memory_state):
+    store, autocomplete = memory_state.store, memory_state.autocomplete
+    counts = Counter()
+    for pos in range(len(store)):
+        entries = {t for field in TERM_FIELDS for t in store.tokens(pos, field) if len(t) > 1}
+        for value in store.lower_values(pos, PHRASE_FIELDS):
+            if len(tokenize(value)) > 1:
+                entries.add(" ".join(tokenize(value)))
+        counts.update(entries)
+    assert dict(zip(autocomplete.terms, autocomplete.weights)) == counts
+
+
+def test_completions_match_brute_force(memory_state, queries):
+    autocomplete = memory_state.autocomplete
+    prefixes = {term[:n] for term in autocomplete.terms[::7] for n in (1, 2, 3, 6, 7, 9)}
+    prefixes |= {q[:n] for q in queries for n in (1, 4, 8) if q[:n].strip()}
+    for prefix in sorted(prefixes):
+        normalized = " ".join(tokenize(prefix)) + (" " if prefix[-1].isspace() else "")
+        for limit in (1, 5, 10):
+            expected = brute_force(autocomplete, normalized, limit) if normalized.strip() else []
+            assert autocomplete.complete(prefix, limit) == expected, prefix
+
+
+def test_route_normalizes_the_prefix(client, serve, memory_state):
+    serve(memory_state)
+    body = client.get("/autocomplete/", params={"q": "Bone  L", "limit": 5}).json()
+    assert body["suggestions"] == brute_force(memory_state.autocomplete, "bone l", 5)
+    assert body["suggestions"] and all(s["text"].startswith("bone l") for s in body["suggestions"])
+    assert client.get("/autocomplete/", params={"q": "-"}).json()["suggestions"] == []
+    # A trailing space continues into phrases
+    phrases = client.get("/autocomplete/", params={"q": "bone "}).json()["suggestions"]
+    assert phrases and all(s["text"].startswith("bone ") for s in phrases)
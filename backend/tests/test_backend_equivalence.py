@@ -0,0 +1,139 @@
+"""
+The SQLite backend (SEARCH_BACKEND=sqlite) must answer every route exactly
+as the in-memory indexes it was built from, on 410 queries, and serve its
+numeric arrays memory-mapped from the file beside the index.
+"""
+import numpy as np
+import pytest
+
+from app.utils.sqlite_index import arrays_path, build_database, open_database
+from app.utils.store import LIST_VIEW_FIELDS
+from conftest import FIXED_QUERIES, QUERY_PATTERN
+
+
+@pytest.fixture(scope="module")
+def filters(memory_state):
+    """Facet filters on the most common values, and one matching nothing."""
+    facets = memory_state.facets
+    counts = facets.counts(facets.all)
+    common = {field: [top["value"] for top in values[:2]] for field, values in counts.items()}
+    return [
+        {"organism": common["organism"][:1]},
+        {"platform": common["platform"]},
+        {"organism": common["organism"], "domain": common["domain"][:1]},
+        {"data_type": ["no such data type"]},
+    ]
+
+
+def responses(client, serve, states, path, params):
+    """The JSON each state answers `path` with."""
+    answers = []
+    for state in states:
+        serve(state)
+        response = client.get(path, params=params)
+        answers.append((response.status_code, response.json()))
+    return answers
+
+
+def assert_same(client, serve, states, path, params):
+    memory, sqlite = responses(client, serve, states, path, params)
+    assert memory == sqlite, f"{path} {params}"
+    return memory
+
+
+@pytest.fixture
+def states(memory_state, disk_state):
+    return (memory_state, disk_state)
+
+
+def test_match_sets_scores_and_corrections_match(states, queries):
+    memory, sqlite = states
+    for q in queries:
+        assert memory.index.search(q) == sqlite.index.search(q), q
+        assert memory.ranker.scores(q) == pytest.approx(sqlite.ranker.scores(q), rel=1e-6), q
+        assert memory.fuzzy.search(q) == sqlite.fuzzy.search(q), q
+
+
+def test_records_and_hashes_match(states):
+    memory, sqlite = states
+    assert len(memory.store) == len(sqlite.store)
+    for fields in ((), LIST_VIEW_FIELDS, ("id", "title"), ("organism", "id")):
+        for pos in range(len(memory.store)):
+            assert memory.fragments.record(pos, fields) == sqlite.fragments.record(pos, fields)
+    assert list(memory.hashes.items()) == list(sqlite.hashes.items())
+
+
+def test_arrays_are_memory_mapped(states):
+    memory, sqlite = states
+    pairs = [
+        (memory.similarity.data, sqlite.similarity.data),
+        (memory.similarity.rows, sqlite.similarity.rows),
+        (memory.neighbors.positions, sqlite.neighbors.positions),
+        (memory.neighbors.scores, sqlite.neighbors.scores),
+        (memory.topics.weights, sqlite.topics.weights),
+        (memory.duplicates.signatures, sqlite.duplicates.signatures),
+    ]
+    for in_memory, mapped in pairs:
+        assert isinstance(mapped, np.memmap)
+        assert np.array_equal(in_memory, mapped)
+    assert sqlite.similarity.terms == memory.similarity.terms
+    assert sqlite.topics.keywords == memory.topics.keywords
+    assert list(sqlite.duplicates.ids) == list(memory.duplicates.ids)
+    assert list(sqlite.duplicates.hashes) == list(memory.duplicates.hashes)
+    assert sqlite.duplicates.report() == memory.duplicates.report()
+
+
+def test_index_with_arrays_from_another_build_is_stale(memory_state, tmp_path):
+    path, other = tmp_path / "index.sqlite", tmp_path / "other.sqlite"
+    build_database(path, memory_state, memory_state.digest)
+    build_database(other, memory_state, b"another build")
+    assert open_database(path, memory_state.digest) is not None
+    arrays_path(other).replace(arrays_path(path))
+    assert open_database(path, memory_state.digest) is None
+    arrays_path(path).unlink()
+    assert open_database(path, memory_state.digest) is None
+
+
+def test_search_pages_match(client, serve, states, queries):
+    for q in queries:
+        for fuzzy in (True, False):
+            params = {"q": q, "limit": 7, "fuzzy": fuzzy}
+            status, body = assert_same(client, serve, states, "/search/", params)
+            if status == 200 and body["next_cursor"]:
+                assert_same(client, serve, states, "/search/", {**params, "cursor": body["next_cursor"]})
+
+
+def test_filtered_search_and_facets_match(client, serve, states, queries, filters):
+    for q in queries[:40]:
+        for facet_filter in filters:
+            assert_same(client, serve, states, "/search/", {"q": q, **facet_filter})
+
+
+def test_facet_counts_match(states):
+    memory, sqlite = states
+    assert memory.facets.counts(memory.facets.all) == sqlite.facets.counts(sqlite.facets.all)
+
+
+def test_recommend_matches(client, serve, states, queries, filters, memory_state):
+    ids = [memory_state.store.value(pos, "id") for pos in range(0, len(memory_state.store), 25)]
+    for q in queries + [i.lower() for i in ids if i and QUERY_PATTERN.match(i)]:
+        assert_same(client, serve, states, "/recommend/", {"q": q})
+    for q in FIXED_QUERIES:
+        for facet_filter in filters:
+            assert_same(client, serve, states, "/recommend/", {"q": q, **facet_filter})
+
+
+def test_batches_match(client, serve, states, queries):
+    for path in ("/search/batch", "/recommend/batch"):
+        answers = []
+        for state in states:
+            serve(state)
+            answers.append(client.post(path, json={"queries": queries[:50]}).json())
+        assert answers[0] == answers[1], path
+
+
+def test_autocomplete_matches(client, serve, states, queries):
+    prefixes = {q[:n] for q in queries for n in (1, 2, 4) if q[:n].strip()}
+    for prefix in sorted(prefixes):
+        for limit in (3, 10):
+            assert_same(client, serve, states, "/autocomplete/", {"q": prefix, "limit": limit})
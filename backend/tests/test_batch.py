@@ -0,0 +1,58 @@
+"""
+Every entry of a /search/batch or /recommend/batch response equals the
+corresponding GET response, on either backend, and batches are validated
+like the GET parameters.
+"""
+import pytest
+
+from app.config import settings
+
+BATCH = [
+    "mice", "Mice", "bone loss", "arabidopsis", "cel", "bnoe", "zzzz", "microgr",
+    "spaceflight", "rodent research", "radiation", "exp0", "-",
+]
+
+
+def batch_ids(state):
+    return [state.store.value(pos, "id") for pos in range(0, len(state.store), 150)]
+
+
+@pytest.mark.parametrize("backend", ["memory_state", "disk_state"])
+def test_batch_entries_equal_get_responses(request, client, serve, backend, memory_state, queries):
+    state = request.getfixturevalue(backend)
+    serve(state)
+    batch = BATCH + queries[20:52:2] + batch_ids(state)
+    organism = memory_state.store.dictionaries["organism"].values[0]
+    for limit, fields, filters in (
+        (25, None, {}), (7, "id,title", {}), (25, "all", {"organism": [organism], "platform": []}),
+    ):
+        options = {"fields": fields, "filters": filters}
+        params = {"fields": fields, **filters}
+        searched = client.post(
+            "/search/batch", json={"queries": batch, "limit": limit, **options}
+        ).json()["results"]
+        recommended = client.post("/recommend/batch", json={"queries": batch, **options}).json()["results"]
+        assert list(searched) == list(recommended) == list(dict.fromkeys(batch))
+        for q in batch:
+            assert searched[q] == client.get("/search/", params={"q": q, "limit": limit, **params}).json(), q
+            assert recommended[q] == client.get("/recommend/", params={"q": q, **params}).json(), q
+
+
+def test_batch_cursors_continue_through_get(client, serve, memory_state):
+    serve(memory_state)
+    first = client.post("/search/batch", json={"queries": ["mice"], "limit": 5}).json()["results"]["mice"]
+    page = client.get("/search/", params={"q": "mice", "limit": 5, "cursor": first["next_cursor"]})
+    second = client.get("/search/", params={"q": "mice", "limit": 10}).json()
+    assert [r["id"] for r in first["results"] + page.json()["results"]] == [r["id"] for r in second["results"]]
+
+
+def test_batches_are_validated(client, serve, memory_state):
+    serve(memory_state)
+    too_many = ["mice"] * (settings.BATCH_MAX_QUERIES + 1)
+    for path in ("/search/batch", "/recommend/batch"):
+        assert client.post(path, json={"queries": too_many}).status_code == 422
+        assert client.post(path, json={"queries": []}).status_code == 422
+        assert client.post(path, json={"queries": ["mice", "bad;query"]}).status_code == 422
+        assert client.post(path, json={"queries": ["   "]}).status_code == 422
+        assert client.post(path, json={"queries": ["mice"], "fields": "id,colour"}).status_code == 400
+    assert client.post("/search/batch", json={"queries": ["mice"], "limit": 101}).status_code == 422
@@ -0,0 +1,93 @@
+"""
+MinHash LSH collapses exactly the record groups a brute-force Jaccard
+scan over title and description shingles puts at the threshold, keeps
+each group's earliest record, and only signs new records on reload.
+"""
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import app.database as database
+from app.config import settings
+from app.utils.dedup import DEDUP_FIELDS, SHINGLE_SIZE, DuplicateIndex
+from app.utils.loader import record_hash
+from app.utils.store import RecordStore
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    """The corpus as loaded, before near-duplicates are collapsed."""
+    return database.load_data()
+
+
+def shingles(store, pos):
+    tokens = tuple(t for field in DEDUP_FIELDS for t in store.tokens(pos, field))
+    if len(tokens) < SHINGLE_SIZE:
+        return set(tokens)
+    return {tokens[i:i + SHINGLE_SIZE] for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def brute_force_groups(store, threshold):
+    """Earliest member of each record's group, joining pairs at or above the threshold."""
+    sets = [shingles(store, pos) for pos in range(len(store))]
+    leaders = list(range(len(store)))
+
+    def find(i):
+        while leaders[i] != i:
+            i = leaders[i]
+        return i
+
+    for a, b in combinations(range(len(store)), 2):
+        if sets[a] and sets[b] and len(sets[a] & sets[b]) >= threshold * len(sets[a] | sets[b]):
+            root_a, root_b = find(a), find(b)
+            leaders[max(root_a, root_b)] = min(root_a, root_b)
+    return [find(i) for i in range(len(store))]
+
+
+def test_groups_match_brute_force_jaccard(loaded, memory_state):
+    store, hashes = loaded
+    duplicates = memory_state.duplicates
+    assert duplicates.leaders.tolist() == brute_force_groups(store, settings.DEDUP_THRESHOLD)
+    assert len(duplicates.kept) < len(store)
+
+    # The served store holds each group's earliest record; aliases resolve to it
+    for pos, loaded_pos in enumerate(duplicates.kept):
+        assert memory_state.store.record(pos) == store.record(int(loaded_pos))
+    for i in np.flatnonzero(duplicates.leaders != np.arange(len(store))):
+        record_id = store.value(int(i), "id")
+        if record_id and record_id.lower() in duplicates.aliases:
+            canonical = duplicates.position(f" {record_id.upper()} ")
+            assert memory_state.store.record(canonical) == store.record(int(duplicates.leaders[i]))
+    report = duplicates.report()
+    assert report["records_loaded"] == len(store) and report["records_kept"] == len(memory_state.store)
+    assert all(a["similarity"] >= settings.DEDUP_THRESHOLD for g in report["groups"] for a in g["aliases"])
+
+    disabled = DuplicateIndex.build(store, hashes, 0)
+    assert len(disabled.kept) == len(store) and not disabled.aliases
+
+
+def test_reload_signs_and_flags_only_new_records(loaded, memory_state):
+    store, hashes = loaded
+    previous = memory_state.duplicates
+    pos = max(range(len(store)), key=lambda p: len(store.value(p, "description") or ""))
+    copy = {**store.record(pos), "id": "COPY-1", "title": store.value(pos, "title") + " (copy)"}
+    records = [store.record(p) for p in range(len(store))] + [copy]
+    grown = DuplicateIndex.build(
+        RecordStore(records), hashes + [record_hash(copy)], settings.DEDUP_THRESHOLD, previous
+    )
+    assert grown.flagged.tolist() == [len(store)]
+    assert grown.leaders[len(store)] == previous.leaders[pos]
+    assert (grown.signatures[:len(store)] == previous.signatures).all()
+    assert grown.report()["new_possible_duplicates"] == ["COPY-1"]
+
+
+def test_recommend_resolves_aliases(client, serve, memory_state):
+    serve(memory_state)
+    duplicates = memory_state.duplicates
+    alias, canonical = next(iter(sorted(duplicates.aliases.items())))
+    by_alias = client.get("/recommend/", params={"q": alias}).json()
+    by_canonical = client.get(
+        "/recommend/", params={"q": memory_state.store.value(canonical, "id")}
+    ).json()
+    assert by_alias["results"] and by_alias["results"] == by_canonical["results"]
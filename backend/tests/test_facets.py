@@ -0,0 +1,79 @@
+"""
+Facet bitmaps filter and count exactly what a scan over the records
+finds, and /search applies them to its match set and facet counts.
+"""
+import random
+from collections import Counter
+
+from app.utils.facets import (
+    FACET_FIELDS,
+    BitmapMask,
+    bitmap_count,
+    bitmap_from_positions,
+    bitmap_positions,
+)
+
+
+def scan(store, filters):
+    """Positions whose value of every filtered field is one of its wanted values, ignoring case."""
+    return [
+        pos for pos in range(len(store))
+        if all(
+            (store.value(pos, field) or "").lower() in {v.strip().lower() for v in wanted}
+            for field, wanted in filters.items()
+        )
+    ]
+
+
+def expected_counts(store, positions, limit=10):
+    """Top values per facet field among `positions`, most frequent first, then by first appearance."""
+    facets = {}
+    for field in FACET_FIELDS:
+        counts = Counter(store.value(pos, field) for pos in positions)
+        counts.pop(None, None)
+        codes = store.dictionaries[field].codes
+        top = sorted(counts.items(), key=lambda item: (-item[1], codes[item[0]]))[:limit]
+        facets[field] = [{"value": value, "count": count} for value, count in top]
+    return facets
+
+
+def sample_filters(store):
+    rng = random.Random(3)
+    values = {field: list(store.dictionaries[field].values) for field in FACET_FIELDS}
+    yield {"organism": [values["organism"][0].upper()]}
+    yield {"organism": values["organism"][:3], "platform": [f" {values['platform'][0]} "]}
+    yield {"domain": ["no such domain"]}
+    for _ in range(30):
+        fields = rng.sample(FACET_FIELDS, rng.randint(1, 3))
+        yield {field: rng.sample(values[field], min(2, len(values[field]))) for field in fields}
+
+
+def test_filters_and_counts_match_a_scan(memory_state):
+    store, facets = memory_state.store, memory_state.facets
+    assert facets.counts(facets.all) == expected_counts(store, range(len(store)))
+    for filters in sample_filters(store):
+        bitmap = facets.filter(filters)
+        positions = scan(store, filters)
+        assert bitmap_positions(bitmap) == positions, filters
+        assert bitmap_count(bitmap) == len(positions)
+        assert facets.counts(bitmap, limit=3) == expected_counts(store, positions, limit=3), filters
+
+
+def test_search_applies_filters(client, serve, memory_state):
+    serve(memory_state)
+    store = memory_state.store
+    matched = memory_state.index.search("mice")
+    organism = memory_state.facets.counts(bitmap_from_positions(matched, len(store)))["organism"][0]["value"]
+    body = client.get("/search/", params={"q": "mice", "organism": organism.lower(), "limit": 100}).json()
+    expected = [pos for pos in matched if store.value(pos, "organism") == organism]
+    assert body["count"] == len(expected) > 0
+    assert all(r["organism"] == organism for r in body["results"])
+    assert body["facets"] == expected_counts(store, expected)
+
+
+def test_bitmap_helpers_round_trip():
+    positions = sorted(random.Random(5).sample(range(5000), 700))
+    bitmap = bitmap_from_positions(positions, 5000)
+    assert bitmap_positions(bitmap) == positions and bitmap_count(bitmap) == 700
+    mask = BitmapMask(bitmap)
+    assert [pos for pos in range(5100) if pos in mask] == positions
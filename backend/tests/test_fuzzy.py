@@ -0,0 +1,76 @@
+"""
+Typo-tolerant matching finds exactly the vocabulary terms within each
+token's edit budget, and /search falls back to it only when nothing
+matches exactly.
+"""
+import random
+
+from app.utils.fuzzy import bounded_edit_distance, max_edits
+
+
+def edit_distance(a, b):
+    """Optimal string alignment distance, unbounded."""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def typo(rng, term):
+    """The term with one or two random edits."""
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(term))
+        kind = rng.choice("dist")
+        if kind == "d" and len(term) > 1:
+            term = term[:i] + term[i + 1:]
+        elif kind == "i":
+            term = term[:i] + rng.choice("abcdeimnorst") + term[i:]
+        elif kind == "s":
+            term = term[:i] + rng.choice("abcdeimnorst") + term[i + 1:]
+        elif i + 1 < len(term):
+            term = term[:i] + term[i + 1] + term[i] + term[i + 2:]
+    return term
+
+
+def test_bounded_distance_matches_full_distance():
+    rng = random.Random(11)
+    for _ in range(2000):
+        a = "".join(rng.choice("abc") for _ in range(rng.randint(0, 7)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randint(0, 7)))
+        limit = rng.randint(0, 3)
+        assert bounded_edit_distance(a, b, limit) == min(edit_distance(a, b), limit + 1), (a, b, limit)
+
+
+def test_similar_terms_match_brute_force(memory_state):
+    fuzzy = memory_state.fuzzy
+    rng = random.Random(2)
+    tokens = [typo(rng, term) for term in rng.sample(fuzzy.terms, 80)]
+    for token in tokens + ["microgravty", "arabidopsys", "mcie", "bnoe"]:
+        limit = max_edits(token)
+        distances = (
+            (term_id, edit_distance(token, term))
+            for term_id, term in enumerate(fuzzy.terms)
+            if abs(len(term) - len(token)) <= limit
+        )
+        expected = sorted(
+            (m for m in distances if m[1] <= limit),
+            key=lambda m: (m[1], -len(fuzzy.postings[m[0]]), m[0]),
+        )
+        assert fuzzy.similar_terms(token) == [(fuzzy.terms[i], d) for i, d in expected], token
+
+
+def test_search_falls_back_to_corrections(client, serve, memory_state):
+    serve(memory_state)
+    exact = client.get("/search/", params={"q": "bone"}).json()
+    assert "corrected_query" not in exact
+    # A transposition in a four-letter word shares no trigram with the word
+    typed = client.get("/search/", params={"q": "bnoe"}).json()
+    assert typed["corrected_query"] == "bone"
+    assert typed["count"] >= exact["count"] > 0
+    assert typed["results"][0]["id"] == exact["results"][0]["id"]
+    assert client.get("/search/", params={"q": "bnoe", "fuzzy": False}).json()["count"] == 0
+    both = client.get("/search/", params={"q": "microgravty bnoe"}).json()
+    assert both["corrected_query"] == "microgravity bone" and both["count"] > 0
@@ -0,0 +1,88 @@
+"""
+A corpus split into JSON and JSON-lines shards loads, through the process
+pool and the segment merge, into the same records and tokens as one store
+built from the whole file.
+"""
+import io
+import json
+
+import pytest
+
+import app.database as database
+from app.utils.loader import iter_json_array, load_segments, record_hash, shard_paths
+from app.utils.schema import normalize_record
+from app.utils.store import RecordStore
+from conftest import DATA_FILE
+
+
+@pytest.fixture(scope="module")
+def raw():
+    with open(DATA_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def shards(tmp_path, raw):
+    """The corpus in five shards of both formats, with junk entries the loader skips."""
+    source = tmp_path / "shards"
+    (source / "b").mkdir(parents=True)
+    step = len(raw) // 5 + 1
+    parts = [raw[i:i + step] for i in range(0, len(raw), step)]
+    (source / "a.json").write_text(json.dumps(parts[0] + [None, 3]))
+    (source / "b" / "c.jsonl").write_text(
+        "\n".join(json.dumps(r) for r in parts[1]) + '\n{"id": broken\n\n["list"]\n'
+    )
+    (source / "b" / "d.json").write_text(json.dumps(parts[2], indent=2))
+    (source / "e.ndjson").write_text("".join(json.dumps(r) + "\n" for r in parts[3]))
+    (source / "f.json").write_text("\n".join(json.dumps(r) for r in parts[4]))
+    (source / ".hidden.json").write_text(json.dumps(raw[:3]))
+    (source / "notes.txt").write_text("not a shard")
+    (source / "g.json").write_text('[{"id": "cut off"')
+    return source
+
+
+def assert_same_store(store, expected):
+    assert len(store) == len(expected)
+    for pos in range(len(expected)):
+        assert store.record(pos) == expected.record(pos)
+        for field in expected.searchable:
+            assert store.tokens(pos, field) == expected.tokens(pos, field), (pos, field)
+        assert store.lower_values(pos, expected.searchable) == expected.lower_values(pos, expected.searchable)
+    assert set(store.vocabulary.values) == set(expected.vocabulary.values)
+    for field, dictionary in expected.dictionaries.items():
+        assert list(store.dictionaries[field].values) == list(dictionary.values)
+
+
+def test_json_array_streams_like_json_load(raw):
+    text = DATA_FILE.read_text(encoding="utf-8")
+    assert list(iter_json_array(io.StringIO(text), chunk_size=7)) == raw
+    for sample in ("[]", " [ 1 , 2.5e3,\n-7, \"a]\" , [[]], {\"k\": [1]} ] ", "[12345678901234567890]"):
+        assert list(iter_json_array(io.StringIO(sample), chunk_size=3)) == json.loads(sample)
+    for broken in ("", "{}", "[1 2]", "[1,", '["unterminated'):
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.StringIO(broken), chunk_size=3))
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_merged_shards_match_a_single_store(shards, raw, workers):
+    paths = shard_paths(shards)
+    assert [p.relative_to(shards).as_posix() for p in paths] == [
+        "a.json", "b/c.jsonl", "b/d.json", "e.ndjson", "f.json", "g.json"
+    ]
+    segments = list(load_segments(paths, workers))
+    assert [s.skipped for s in segments] == [2, 2, 0, 0, 0, 0]
+    assert [bool(s.error) for s in segments] == [False] * 5 + [True]
+
+    records = [normalize_record(item) for item in raw]
+    merged = RecordStore.merge(s.store for s in segments)
+    assert_same_store(merged, RecordStore(records))
+    assert [h for s in segments for h in s.hashes] == [record_hash(r) for r in records]
+
+
+def test_database_loads_a_shard_directory(shards, raw, monkeypatch):
+    (shards / "g.json").unlink()
+    monkeypatch.setattr(database, "DATA_PATH", shards)
+    store, hashes = database.load_data()
+    records = [normalize_record(item) for item in raw]
+    assert_same_store(store, RecordStore(records))
+    assert hashes == [record_hash(r) for r in records]
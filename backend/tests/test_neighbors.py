@@ -0,0 +1,34 @@
+"""
+The blocked all-pairs neighbor build agrees with scoring each record alone,
+up to the order of neighbors whose scores differ only by rounding.
+"""
+import numpy as np
+import pytest
+
+import app.utils.neighbors as neighbors
+import app.utils.similarity as similarity
+from app.utils.neighbors import NeighborTable
+
+
+def per_record(model, n):
+    positions, scores = NeighborTable._empty(model.size, n)
+    for pos in range(model.size):
+        NeighborTable._fill(positions, scores, pos, model.top_k(model.similar(pos), n))
+    return positions, scores
+
+
+@pytest.mark.parametrize("block_cells,dense_ratio", [(1 << 22, 32), (1, 32), (5000, 4), (5000, 10 ** 9)])
+def test_blocked_build_matches_per_record(memory_state, monkeypatch, block_cells, dense_ratio):
+    monkeypatch.setattr(neighbors, "BLOCK_CELLS", block_cells)
+    monkeypatch.setattr(similarity, "DENSE_TERM_RATIO", dense_ratio)
+    model = memory_state.similarity
+    for n in (1, 10, model.size + 5):
+        positions, scores = per_record(model, n)
+        table = NeighborTable.build(model, n)
+        assert ((table.positions >= 0) == (positions >= 0)).all()
+        assert np.allclose(table.scores, scores, atol=1e-6)
+        for pos in range(model.size):
+            exact = model.similar(pos)
+            row = table.positions[pos][table.positions[pos] >= 0]
+            assert len(set(row)) == len(row)
+            assert np.allclose(exact[row], table.scores[pos][:len(row)], atol=1e-6)
@@ -0,0 +1,53 @@
+"""
+Following next_cursor through /search walks the whole ranking exactly
+once, /search/stream yields the same order, and cursors only continue
+the query and data they were issued for.
+"""
+import json
+
+from app.routes.search import match
+
+
+def ranked_ids(state, q):
+    matched, _, ranked_query, _ = match(state, q, True, {})
+    scores = state.ranker.scores(ranked_query)
+    ranked = sorted(((pos, scores[pos]) for pos in matched), key=lambda item: (-item[1], item[0]))
+    return [state.store.value(pos, "id") for pos, _ in ranked]
+
+
+def walk(client, params):
+    ids, cursor = [], None
+    while True:
+        body = client.get("/search/", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        ids += [r["id"] for r in body["results"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids, body["count"]
+
+
+def test_cursor_pages_and_stream_follow_the_ranking(client, serve, memory_state):
+    serve(memory_state)
+    for q in ("mice", "bone loss", "radiation", "cel", "bnoe"):
+        expected = ranked_ids(memory_state, q)
+        ids, count = walk(client, {"q": q, "limit": 7})
+        assert ids == expected and count == len(expected), q
+
+        response = client.get("/search/stream", params={"q": q})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["x-total-count"] == str(len(expected))
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["id"] for r in lines] == expected, q
+    limited = client.get("/search/stream", params={"q": "mice", "limit": 3}).text.splitlines()
+    assert [json.loads(line)["id"] for line in limited] == ranked_ids(memory_state, "mice")[:3]
+
+
+def test_cursors_are_bound_to_query_and_data(client, serve, memory_state):
+    serve(memory_state)
+    cursor = client.get("/search/", params={"q": "mice", "limit": 5}).json()["next_cursor"]
+    assert client.get("/search/", params={"q": "mice", "limit": 5, "cursor": cursor}).status_code == 200
+    assert client.get("/search/", params={"q": "bone", "cursor": cursor}).status_code == 400
+    assert client.get("/search/", params={"q": "mice", "organism": "x", "cursor": cursor}).status_code == 400
+    assert client.get("/search/", params={"q": "mice", "cursor": "not-a-cursor"}).status_code == 400
+    # After a reload the digest changes and old cursors stop working
+    serve(memory_state._replace(digest=b"\x00" * len(memory_state.digest)))
+    assert client.get("/search/", params={"q": "mice", "cursor": cursor}).status_code == 400
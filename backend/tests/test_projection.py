@@ -0,0 +1,67 @@
+"""
+`fields` projects every record a list endpoint or /describe returns, in
+store order, with compact defaults, and unknown fields are rejected.
+"""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import describe
+from app.utils.store import FIELDS, LIST_VIEW_FIELDS, SOURCE_FIELDS
+
+PROJECTIONS = [
+    (None, LIST_VIEW_FIELDS),
+    ("all", tuple(FIELDS)),
+    ("ALL", tuple(FIELDS)),
+    ("id,title", ("id", "title")),
+    (" title , id,title", ("title", "id")),
+]
+
+
+@pytest.fixture
+def describe_client(serve, memory_state, monkeypatch):
+    async def summarize(text, deadline=None):
+        return "summary"
+    monkeypatch.setattr(describe, "summarize_text_async", summarize)
+    serve(memory_state)
+    app = FastAPI()
+    app.include_router(describe.router)
+    return TestClient(app)
+
+
+def assert_projected(store, records, fields):
+    assert records
+    for record in records:
+        assert list(record) == list(fields)
+        assert record == store.record(store.position(record["id"]), fields)
+
+
+@pytest.mark.parametrize("fields,expected", PROJECTIONS)
+def test_list_endpoints_project_records(client, serve, memory_state, fields, expected):
+    serve(memory_state)
+    store = memory_state.store
+    params = {"q": "bone"} if fields is None else {"q": "bone", "fields": fields}
+    assert_projected(store, client.get("/search/", params=params).json()["results"], expected)
+    assert_projected(store, client.get("/recommend/", params=params).json()["results"], expected)
+    stream = client.get("/search/stream", params={**params, "limit": 20}).text.splitlines()
+    assert_projected(store, [json.loads(line) for line in stream], expected)
+
+
+@pytest.mark.parametrize("fields,expected", [(None, SOURCE_FIELDS)] + PROJECTIONS[1:])
+def test_describe_projects_sources(describe_client, memory_state, fields, expected):
+    params = {"q": "bone"} if fields is None else {"q": "bone", "fields": fields}
+    body = describe_client.get("/describe/", params=params).json()
+    assert len(body["sources"]) == 5
+    assert_projected(memory_state.store, body["sources"], expected)
+
+
+def test_unknown_fields_are_rejected(client, serve, describe_client, memory_state):
+    serve(memory_state)
+    for path, test_client in (("/search/", client), ("/recommend/", client),
+                              ("/search/stream", client), ("/describe/", describe_client)):
+        for fields in ("id,colour", ",", "descriptions"):
+            response = test_client.get(path, params={"q": "bone", "fields": fields})
+            assert response.status_code == 400, (path, fields)
+            assert "Available: id" in response.json()["detail"]
@@ -0,0 +1,72 @@
+"""
+BM25F scores follow the formula over weighted fields, whole terms outrank
+terms that only contain the query token, and top-k selection and result
+pages agree with sorting every score.
+"""
+import math
+
+import pytest
+
+from app.utils.indexing import field_values, tokenize
+from app.utils.ranking import FIELD_WEIGHTS, PARTIAL_MATCH_WEIGHT, BM25Ranker
+
+RECORDS = [
+    {"id": "A", "title": "bone loss in mice", "description": "spaceflight study"},
+    {"id": "B", "title": "plant roots", "description": "bone density of mice in orbit, bone"},
+    {"id": "C", "title": "muscle", "keywords": ["bone", "rodent"]},
+    {"id": "D", "title": "cell culture", "description": "osteoblasts and bones"},
+]
+
+
+def expected_score(records, term, pos, k1=1.2, b=0.75):
+    """BM25F by the book: length-normalized weighted term frequency, saturated, times IDF."""
+    def tokens(record, field):
+        return [t for value in field_values(record, (field,)) for t in tokenize(value)]
+
+    df = sum(1 for record in records if any(term in tokens(record, f) for f in FIELD_WEIGHTS))
+    pseudo_tf = 0.0
+    for field, weight in FIELD_WEIGHTS.items():
+        field_tokens = tokens(records[pos], field)
+        lengths = [len(tokens(record, field)) for record in records]
+        if not field_tokens:
+            continue
+        norm = 1 - b + b * len(field_tokens) / (sum(lengths) / len(lengths))
+        pseudo_tf += weight * field_tokens.count(term) / norm
+    idf = math.log(1 + (len(records) - df + 0.5) / (df + 0.5))
+    return idf * pseudo_tf / (k1 + pseudo_tf)
+
+
+def test_scores_follow_bm25f():
+    ranker = BM25Ranker(RECORDS, k1=1.2, b=0.75)
+    scores = ranker.scores("mice")
+    assert set(scores) == {0, 1}
+    for pos in (0, 1):
+        assert scores[pos] == pytest.approx(expected_score(RECORDS, "mice", pos), rel=1e-5)
+
+
+def test_weighted_fields_and_whole_terms_rank_first():
+    ranker = BM25Ranker(RECORDS)
+    scores = ranker.scores("bone")
+    # One title mention outweighs two in a description; "bones" only contains the token
+    assert scores[0] > scores[1]
+    assert scores[3] == pytest.approx(PARTIAL_MATCH_WEIGHT * ranker.impacts["bones"][0])
+    # Tokens under three characters never match inside longer terms
+    assert ranker.scores("os") == {} and ranker.scores("ne") == {}
+    assert set(ranker.scores("in")) == {0, 1}
+
+
+def test_top_k_and_pages_match_a_full_sort(memory_state, queries):
+    ranker = memory_state.ranker
+    for q in queries[:100]:
+        scores = ranker.scores(q)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        assert ranker.top_k(q, 10) == ranked[:10], q
+        assert list(ranker.iter_ranked(scores)) == ranked, q
+        paged, after = [], None
+        while True:
+            page = ranker.select(scores, 7, after=after)
+            paged += page
+            if len(page) < 7:
+                break
+            after = page[-1]
+        assert paged == ranked, q
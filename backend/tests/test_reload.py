@@ -0,0 +1,75 @@
+"""
+A reload swaps in a state equal to one built from scratch, while readers
+holding the old state keep a consistent view of it; a file change that
+changes no record keeps the serving indexes.
+"""
+import json
+
+import pytest
+
+import app.database as database
+from conftest import DATA_FILE
+
+
+@pytest.fixture
+def data_file(tmp_path, monkeypatch):
+    """A copy of the corpus the database module loads and reloads from."""
+    path = tmp_path / "data.json"
+    path.write_bytes(DATA_FILE.read_bytes())
+    for name, suffix in (
+        ("DATA_PATH", ".json"), ("SNAPSHOT_PATH", ".snapshot"),
+        ("EMBEDDINGS_PATH", ".embeddings.npy"), ("ANN_PATH", ".ann"),
+    ):
+        monkeypatch.setattr(database, name, path.with_suffix(suffix))
+    monkeypatch.setattr(database, "_state", database.load_state())
+    return path
+
+
+def edit(path, change):
+    records = json.loads(path.read_text())
+    change(records)
+    path.write_text(json.dumps(records))
+    return records
+
+
+def test_reload_swaps_in_the_new_records(data_file, queries):
+    old = database.get_state()
+    removed, changed = old.store.value(0, "id"), old.store.value(1, "id")
+    old_title = old.store.value(1, "title")
+
+    def change(records):
+        records[1]["title"] = "Zebrafish otolith growth in altered gravity"
+        records.append({**records[2], "id": "NEW-0001", "title": "Xyloquartz desiccation"})
+        del records[0]
+
+    edit(data_file, change)
+    result = database.reload_data()
+    assert result["swapped"]
+    assert result["diff"] == {"added": ["NEW-0001"], "changed": [changed], "removed": [removed]}
+
+    new = database.get_state()
+    assert new.store.position("NEW-0001") is not None and new.store.position(removed) is None
+    assert new.index.search("xyloquartz") and not old.index.search("xyloquartz")
+    # Readers still holding the old state see it unchanged
+    assert old.store.value(1, "title") == old_title and old.store.position(removed) == 0
+
+    scratch = database.build_state(*database.load_data(), database.source_digest())
+    for q in queries[:100] + ["zebrafish otolith", "xyloquartz"]:
+        assert new.index.search(q) == scratch.index.search(q), q
+        assert new.ranker.scores(q) == scratch.ranker.scores(q), q
+    assert (new.neighbors.positions >= 0).sum() == (scratch.neighbors.positions >= 0).sum()
+
+
+def test_reload_without_record_changes_keeps_the_indexes(data_file):
+    old = database.get_state()
+    data_file.write_text(json.dumps(json.loads(data_file.read_text()), indent=2))
+    result = database.reload_data()
+    assert not result["swapped"] and result["diff"] == {"added": [], "changed": [], "removed": []}
+    new = database.get_state()
+    assert new.index is old.index and new.store is old.store
+    assert new.digest != old.digest
+
+
+def test_concurrent_reload_is_refused(data_file):
+    with database._reload_lock:
+        assert database.reload_data() is None
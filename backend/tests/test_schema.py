@@ -0,0 +1,79 @@
+"""
+Raw records are coerced to the schema on load, and every searchable
+field, not just title, description and keywords, is matched.
+"""
+import json
+from collections import Counter
+
+from app.utils.schema import SCHEMA, SEARCHABLE_FIELDS, normalize_record
+from conftest import DATA_FILE
+
+
+def test_normalize_record_coerces_types_and_defaults():
+    record = normalize_record({
+        "id": "  OSD-1 ",
+        "title": "   ",
+        "description": None,
+        "organism": "To be determined from paper analysis",
+        "platform": " N/A ",
+        "domain": "Plants",
+        "keywords": "['bone loss', \"mice\", '']",
+        "authors": "Smith, Jones ,",
+        "variables": ["a", None, 3, {"x": 1}],
+        "source_url": "https://example.org/osd-1",
+        "release_date": 2020,
+    })
+    assert list(record) == list(SCHEMA)
+    assert record["id"] == "OSD-1"
+    assert record["title"] == "Untitled Dataset"
+    assert record["description"] == "" and record["detailed_description"] == ""
+    assert record["organism"] is None and record["platform"] is None
+    assert record["domain"] == "Plants"
+    assert record["keywords"] == ["bone loss", "mice"]
+    assert record["authors"] == ["Smith", "Jones"]
+    assert record["variables"] == ["a", "3"]
+    assert record["source_url"] == "https://example.org/osd-1"
+    assert record["release_date"] == "2020"
+    assert record["data_url"] is None and record["data_type"] is None
+
+
+def test_list_reprs_fall_back_to_splitting():
+    assert normalize_record({"keywords": "[bone, 'mice']"})["keywords"] == ["bone", "mice"]
+    assert normalize_record({"keywords": "[]"})["keywords"] == []
+    assert normalize_record({"keywords": 7})["keywords"] == []
+    assert normalize_record({})["id"] == "unknown"
+
+
+def test_loaded_records_are_normalized(memory_state):
+    with open(DATA_FILE, encoding="utf-8") as f:
+        normalized = Counter(json.dumps(normalize_record(item)) for item in json.load(f))
+    store = memory_state.store
+    loaded = Counter(json.dumps(store.record(pos)) for pos in range(len(store)))
+    # Collapsed near-duplicates are the only records missing
+    assert not loaded - normalized
+    assert sum((normalized - loaded).values()) == len(memory_state.duplicates.leaders) - len(store)
+
+
+def test_every_searchable_field_is_matched(client, serve, memory_state):
+    serve(memory_state)
+    store = memory_state.store
+    assert set(SEARCHABLE_FIELDS) == {
+        "id", "title", "description", "detailed_description", "keywords", "organism", "platform"
+    }
+    # Terms that occur in only one field of the whole corpus
+    fields_of = {}
+    for pos in range(len(store)):
+        for field in SEARCHABLE_FIELDS:
+            for term in store.tokens(pos, field):
+                fields_of.setdefault(term, Counter())[field] += 1
+    checked = set()
+    for term, fields in sorted(fields_of.items()):
+        field = next(iter(fields))
+        if len(fields) > 1 or field in checked or len(term) < 4 or not term.isalnum():
+            continue
+        matched = memory_state.index.search(term)
+        assert any(term in store.tokens(pos, field) for pos in matched), (term, field)
+        body = client.get("/search/", params={"q": term, "fuzzy": False}).json()
+        assert body["count"] == len(matched), (term, field)
+        checked.add(field)
+    assert {"detailed_description", "platform", "id"} <= checked
@@ -0,0 +1,47 @@
+"""
+The inverted index matches exactly the records a linear scan over every
+searchable field finds.
+"""
+import pytest
+
+from app.utils.indexing import MIN_SUBSTRING_LENGTH, field_values, tokenize
+
+
+@pytest.fixture(scope="module")
+def scanned(memory_state):
+    """Each record's lowercase field values, and its terms joined for substring tests."""
+    store = memory_state.store
+    records = []
+    for pos in range(len(store)):
+        values = field_values(store.record(pos), store.searchable)
+        terms = {term for value in values for term in tokenize(value)}
+        records.append((values, terms, "\0".join(terms)))
+    return records
+
+
+def scan(records, q):
+    """
+    Positions whose terms contain every query token (whole terms only for
+    short tokens) and, for phrases, with a field value containing `q`.
+    """
+    q = q.lower()
+    tokens = tokenize(q)
+    found = []
+    for pos, (values, terms, joined) in enumerate(records):
+        if not all(
+            t in joined if len(t) >= MIN_SUBSTRING_LENGTH else t in terms for t in tokens
+        ):
+            continue
+        if tokens == [q] or any(q in value for value in values):
+            found.append(pos)
+    return found
+
+
+def test_index_matches_linear_scan(memory_state, scanned, queries):
+    index = memory_state.index
+    for q in queries + ["BONE", "bone-loss", "mice, rats", "C57BL/6", " mice "]:
+        assert index.search(q) == scan(scanned, q), q
+
+
+def test_empty_query_matches_everything(memory_state):
+    assert memory_state.index.search("") == list(range(len(memory_state.store)))
@@ -0,0 +1,157 @@
+"""
+Semantic search pages through exactly the records it counts, with or
+without an ANN index, under selective and broad facet filters; hybrid
+search counts and facets the candidates it fuses and falls back to
+keywords.
+"""
+import logging
+import time
+import zlib
+
+import httpx
+import numpy as np
+import pytest
+
+import app.routes.search as search
+from app.config import settings
+from app.database import content_hashes
+from app.routes.search import semantic_scores
+from app.utils.ann import build_ann
+from app.utils.embeddings import EmbeddingIndex, SciBertClient, build_embeddings
+from app.utils.facets import bitmap_from_positions, bitmap_positions
+
+DIM = 32
+QUERY = "bone loss in microgravity"
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    """Deterministic clustered vector for a text."""
+    seed = zlib.crc32(text.encode("utf-8"))
+    rng = np.random.default_rng(seed)
+    center = np.random.default_rng(seed % 8).normal(size=DIM)
+    return (center + 0.5 * rng.normal(size=DIM)).astype(np.float32)
+
+
+@pytest.fixture(autouse=True)
+def fake_scibert(monkeypatch):
+    monkeypatch.setattr(SciBertClient, "embed", lambda self, text: fake_embedding(text))
+
+
+def embedded_state(state, tmp_path, nlist=0, pq_subvectors=0):
+    """The state with fake embeddings attached, and an IVF index if `nlist`."""
+    matrix_path, ann_path = tmp_path / "e.embeddings.npy", tmp_path / "e.ann"
+    hashes = content_hashes(state)
+    build_embeddings(
+        matrix_path, hashes, lambda pos: state.store.value(pos, "title") or str(pos),
+        lambda texts: np.stack([fake_embedding(t) for t in texts]),
+    )
+    if nlist:
+        build_ann(matrix_path, ann_path, nlist, pq_subvectors)
+    return state._replace(embeddings=EmbeddingIndex(matrix_path, hashes, ann_path if nlist else None))
+
+
+def filters_by_size(state):
+    """Organism filters: one matching few records, one matching many."""
+    counts = state.facets.counts(state.facets.all, limit=1000)["organism"]
+    return {"selective": counts[-1]["value"], "broad": counts[0]["value"]}
+
+
+def page_through(client, params):
+    """Every result ID across all pages, and the count of the first page."""
+    first = client.get("/search/", params=params).json()
+    ids = [r["id"] for r in first["results"]]
+    body = first
+    while body["next_cursor"]:
+        body = client.get("/search/", params={**params, "cursor": body["next_cursor"]}).json()
+        ids += [r["id"] for r in body["results"]]
+    return first, ids
+
+
+def exact_ranking(state, organism):
+    """Positions of records with this organism, most similar first."""
+    allowed = state.facets.filter({"organism": [organism]})
+    query = fake_embedding(QUERY)
+    scores = state.embeddings.scores(query, 0)
+    positions = [p for p in range(len(state.store)) if allowed >> p & 1]
+    return sorted(positions, key=lambda p: (-scores[p], p))
+
+
+@pytest.mark.parametrize("nlist,pq,nprobe", [(0, 0, 0), (16, 0, 1), (16, 0, 4), (16, 4, 1)])
+def test_filtered_semantic_pages_match_count(client, serve, memory_state, tmp_path, nlist, pq, nprobe):
+    state = embedded_state(memory_state, tmp_path, nlist, pq)
+    serve(state)
+    for organism in filters_by_size(state).values():
+        params = {"q": QUERY, "mode": "semantic", "nprobe": nprobe, "limit": 10, "organism": organism}
+        first, ids = page_through(client, params)
+        selected = len(exact_ranking(state, organism))
+        assert first["results"], organism
+        assert len(ids) == len(set(ids)) == first["count"]
+        assert sum(f["count"] for f in first["facets"]["organism"]) == first["count"]
+        # Probing never leaves the filter with fewer rows than one refine batch
+        assert first["count"] >= min(selected, 256)
+
+
+@pytest.mark.parametrize("pq", [0, 4])
+def test_selective_filter_is_scored_exactly(client, serve, memory_state, tmp_path, pq):
+    state = embedded_state(memory_state, tmp_path, nlist=16, pq_subvectors=pq)
+    serve(state)
+    organism = filters_by_size(state)["selective"]
+    params = {"q": QUERY, "mode": "semantic", "nprobe": 1, "limit": 100, "organism": organism}
+    _, ids = page_through(client, params)
+    expected = [state.store.value(p, "id") for p in exact_ranking(state, organism)]
+    assert ids == expected
+
+
+@pytest.mark.parametrize("nlist", [0, 16])
+def test_hybrid_counts_fused_candidates(client, serve, memory_state, tmp_path, nlist):
+    state = embedded_state(memory_state, tmp_path, nlist=nlist)
+    serve(state)
+    n = settings.HYBRID_CANDIDATES
+    organism = filters_by_size(state)["broad"]
+    for filters in ({}, {"organism": [organism]}):
+        params = {"q": "bone", **filters}
+        hybrid, ids = page_through(client, {**params, "mode": "hybrid", "limit": 25})
+        assert hybrid["semantic"]
+
+        matched = bitmap_from_positions(state.index.search("bone"), len(state.store))
+        if filters:
+            matched &= state.facets.filter(filters)
+        lexical = state.ranker.select(
+            state.ranker.scores("bone"), n, candidates=bitmap_positions(matched)
+        )
+        scores, _ = semantic_scores(state, fake_embedding("bone"), filters, settings.ANN_NPROBE)
+        semantic = state.embeddings.top_k(scores, n)
+        fused = {pos for pos, _ in lexical} | {pos for pos, _ in semantic}
+        assert hybrid["count"] == len(fused) == len(ids) == len(set(ids))
+        assert set(ids) == {state.store.value(pos, "id") for pos in fused}
+        # Facets describe the lexical matches and the fused semantic candidates only
+        expected = matched | bitmap_from_positions((pos for pos, _ in semantic), len(state.store))
+        assert hybrid["facets"] == state.facets.counts(expected)
+
+def test_hybrid_falls_back_when_embedding_is_slow(client, serve, memory_state, tmp_path, monkeypatch):
+    state = embedded_state(memory_state, tmp_path)
+    serve(state)
+    monkeypatch.setattr(settings, "HYBRID_EMBED_TIMEOUT", 0.05)
+    monkeypatch.setattr(SciBertClient, "embed", lambda self, text: time.sleep(0.5) or fake_embedding(text))
+    keyword = client.get("/search/", params={"q": "bone"}).json()
+    started = time.monotonic()
+    hybrid = client.get("/search/", params={"q": "bone", "mode": "hybrid"}).json()
+    assert time.monotonic() - started < 0.4
+    assert not hybrid["semantic"]
+    assert [r["id"] for r in hybrid["results"]] == [r["id"] for r in keyword["results"]]
+    assert hybrid["count"] == min(keyword["count"], settings.HYBRID_CANDIDATES)
+
+
+def test_hybrid_fallback_warns_once_per_interval(client, serve, memory_state, tmp_path, monkeypatch, caplog):
+    serve(embedded_state(memory_state, tmp_path))
+    monkeypatch.setattr(search, "_fallback_logged_at", float("-inf"))
+
+    def unavailable(self, text):
+        raise httpx.ConnectError("SciBERT is down")
+
+    monkeypatch.setattr(SciBertClient, "embed", unavailable)
+    with caplog.at_level(logging.DEBUG, logger=search.__name__):
+        for _ in range(5):
+            assert not client.get("/search/", params={"q": "bone", "mode": "hybrid"}).json()["semantic"]
+    levels = [r.levelno for r in caplog.records if r.name == search.__name__]
+    assert levels == [logging.WARNING] + [logging.DEBUG] * 4
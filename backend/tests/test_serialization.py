@@ -0,0 +1,40 @@
+"""
+Pre-serialized fragments are byte-for-byte what orjson would encode for
+the projected record, from memory or from the SQLite index, and embed
+verbatim in responses.
+"""
+import pickle
+
+import orjson
+import pytest
+
+from app.utils.serialization import RecordFragments
+from app.utils.store import FIELDS, LIST_VIEW_FIELDS, SOURCE_FIELDS
+
+PROJECTIONS = [
+    (), tuple(FIELDS), LIST_VIEW_FIELDS, SOURCE_FIELDS, ("keywords", "id"), ("detailed_description",),
+]
+
+
+@pytest.mark.parametrize("backend", ["memory_state", "disk_state"])
+def test_fragments_match_encoding_the_record(request, memory_state, backend):
+    fragments = request.getfixturevalue(backend).fragments
+    store = memory_state.store
+    for pos in range(len(store)):
+        for fields in PROJECTIONS:
+            expected = orjson.dumps(store.record(pos, fields or None))
+            assert fragments.record(pos, fields) == expected, (pos, fields)
+            # Repeat requests are served spliced from the cache
+            assert fragments.record(pos, fields) == expected
+    assert orjson.dumps({"results": [fragments.fragment(0, SOURCE_FIELDS)]}) == orjson.dumps(
+        {"results": [store.record(0, SOURCE_FIELDS)]}
+    )
+    with pytest.raises(IndexError):
+        fragments.record(len(store))
+
+
+def test_fragments_survive_pickling(memory_state):
+    fragments = RecordFragments(memory_state.store.take(range(20)))
+    restored = pickle.loads(pickle.dumps(fragments))
+    for pos in range(20):
+        assert restored.record(pos, LIST_VIEW_FIELDS) == fragments.record(pos, LIST_VIEW_FIELDS)
@@ -0,0 +1,99 @@
+"""
+The CSR TF-IDF model scores queries and records as a dense cosine
+computation over the same vectors would, and /recommend returns its
+top matches.
+"""
+import math
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.utils.indexing import tokenize
+from app.utils.similarity import SIMILARITY_FIELDS, TfidfModel
+
+
+@pytest.fixture(scope="module")
+def dense(memory_state):
+    """Sublinear TF x smoothed IDF vectors, L2-normalized, as a dense (records x terms) matrix."""
+    store = memory_state.store
+    counts = [
+        Counter(t for field in SIMILARITY_FIELDS for t in store.tokens(pos, field))
+        for pos in range(len(store))
+    ]
+    terms = sorted({t for c in counts for t in c})
+    column = {t: i for i, t in enumerate(terms)}
+    df = Counter(t for c in counts for t in c)
+    idf = np.array([math.log((1 + len(store)) / (1 + df[t])) + 1 for t in terms])
+    matrix = np.zeros((len(store), len(terms)))
+    for pos, c in enumerate(counts):
+        for t, tf in c.items():
+            matrix[pos, column[t]] = (1 + math.log(tf)) * idf[column[t]]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return terms, idf, matrix / np.where(norms > 0, norms, 1)
+
+
+def reference_top(scores, k, mask=None):
+    scores = np.where(mask, scores, 0) if mask is not None else scores
+    return sorted(((p, s) for p, s in enumerate(scores) if s > 0), key=lambda x: (-x[1], x[0]))[:k]
+
+
+def test_vectors_match_dense_tfidf(memory_state, dense):
+    model = memory_state.similarity
+    terms, idf, matrix = dense
+    assert model.terms == terms
+    np.testing.assert_allclose(model.idf, idf, rtol=1e-6)
+    stored = np.zeros_like(matrix)
+    stored[model.rows, model.indices] = model.data
+    np.testing.assert_allclose(stored, matrix, atol=1e-6)
+
+
+def test_similar_and_blocks_match_dense_cosine(memory_state, dense):
+    model = memory_state.similarity
+    cosine = dense[2] @ dense[2].T
+    np.fill_diagonal(cosine, 0)
+    for pos in range(len(cosine)):
+        np.testing.assert_allclose(model.similar(pos), cosine[pos], atol=1e-5)
+    for start, block in model.similar_blocks(block_cells=40_000):
+        np.testing.assert_allclose(block, cosine[start:start + len(block)], atol=1e-5)
+
+
+def test_query_scores_match_dense_cosine(memory_state, dense, queries):
+    model = memory_state.similarity
+    terms, idf, matrix = dense
+    column = {t: i for i, t in enumerate(terms)}
+    for q, expansion in [(q, ()) for q in queries[:100]] + [("bone", ["muscle atrophy", "bone"])]:
+        vector = np.zeros(len(terms))
+        for t, tf in Counter(t for t in tokenize(q) if t in column).items():
+            vector[column[t]] = (1 + math.log(tf)) * idf[column[t]]
+        for t in {t for phrase in expansion for t in tokenize(phrase)}:
+            if t in column and not vector[column[t]]:
+                vector[column[t]] = 0.5 * idf[column[t]]
+        norm = np.linalg.norm(vector)
+        expected = matrix @ (vector / norm) if norm else np.zeros(len(matrix))
+        np.testing.assert_allclose(model.scores(q, expansion), expected, atol=1e-5, err_msg=q)
+
+
+def test_top_k_breaks_ties_by_position():
+    rng = random.Random(4)
+    for _ in range(200):
+        scores = np.array([rng.choice([0.0, 0.25, 0.5, 0.75, rng.random()]) for _ in range(60)])
+        mask = np.array([rng.random() < 0.7 for _ in range(60)])
+        k = rng.randint(1, 20)
+        assert TfidfModel.top_k(scores, k) == reference_top(scores, k)
+        assert TfidfModel.top_k(scores, k, mask=mask) == reference_top(scores, k, mask)
+
+
+def test_recommend_returns_the_most_similar(client, serve, memory_state, dense):
+    serve(memory_state)
+    store, model = memory_state.store, memory_state.similarity
+    for pos in range(0, len(store), 97):
+        record_id = store.value(pos, "id")
+        body = client.get("/recommend/", params={"q": record_id.upper(), "fields": "id"}).json()
+        expected = reference_top(model.similar(pos), 5)
+        assert [r["id"] for r in body["results"]] == [store.value(p, "id") for p, _ in expected]
+    # Partial words have no TF-IDF term and fall back to BM25F ranking of substring hits
+    body = client.get("/recommend/", params={"q": "microgr", "fields": "id"}).json()
+    top = memory_state.ranker.top_k("microgr", 5)
+    assert [r["id"] for r in body["results"]] == [store.value(p, "id") for p, _ in top]
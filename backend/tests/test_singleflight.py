@@ -0,0 +1,244 @@
+"""
+Concurrent summarizations of one text make one upstream call: within a
+worker through SingleFlight, across workers through a Redis lock. Callers
+that give up never cancel the shared call, the lock is always released,
+and Redis errors fall back to calling the API directly.
+"""
+import asyncio
+import time
+
+import pytest
+import redis.exceptions
+
+import app.utils.summarizer as summarizer
+from app.utils.singleflight import SingleFlight
+
+
+class FakeRedis:
+    """In-memory stand-in for the commands the summary lock uses; TTLs are ignored."""
+
+    def __init__(self, fail: bool = False):
+        self.data = {}
+        self.fail = fail
+        self.releases = 0
+
+    def _check(self):
+        if self.fail:
+            raise redis.exceptions.ConnectionError("Redis is down")
+
+    async def set(self, name, value, nx=False, px=None, ex=None):
+        self._check()
+        if nx and name in self.data:
+            return None
+        self.data[name] = value
+        return True
+
+    async def get(self, name):
+        self._check()
+        return self.data.get(name)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    async def eval(self, script, numkeys, name, token):
+        self._check()
+        assert script == summarizer._RELEASE_SCRIPT
+        self.releases += 1
+        if self.data.get(name) == token:
+            del self.data[name]
+            return 1
+        return 0
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self.reads = []
+
+    def get(self, name):
+        self.reads.append(lambda: self.client.data.get(name))
+        return self
+
+    def exists(self, name):
+        self.reads.append(lambda: int(name in self.client.data))
+        return self
+
+    async def execute(self):
+        self.client._check()
+        return [read() for read in self.reads]
+
+
+class FakeApi:
+    """Counts upstream calls; each takes `delay` seconds."""
+
+    def __init__(self, delay: float = 0.1, summary: str = "summary"):
+        self.calls = 0
+        self.delay = delay
+        self.summary = summary
+        self.finished = 0
+
+    async def __call__(self, key, text, max_len, min_len):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        return self.summary
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setenv("HF_API_TOKEN", "test")
+    fake = FakeApi()
+    monkeypatch.setattr(summarizer, "_call_api", fake)
+    return fake
+
+
+def text(name: str) -> str:
+    """A text long enough to summarize, distinct per test so the cache never answers."""
+    return f"{name} {time.monotonic()} " + "spaceflight bone loss in mice " * 10
+
+
+def test_concurrent_calls_share_one_flight():
+    flights = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        results = await asyncio.gather(*(flights.do("key", fn) for _ in range(20)))
+        return results, len(flights)
+
+    results, in_flight = asyncio.run(main())
+    assert results == ["result"] * 20
+    assert len(calls) == 1
+    assert in_flight == 0
+
+
+def test_caller_giving_up_does_not_cancel_the_flight():
+    flights = SingleFlight()
+    finished = []
+
+    async def fn():
+        await asyncio.sleep(0.1)
+        finished.append(1)
+        return "result"
+
+    async def main():
+        impatient = asyncio.wait_for(flights.do("key", fn), timeout=0.01)
+        patient = flights.do("key", fn)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(main())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient == "result"
+    assert finished == [1]
+
+
+def test_failed_flight_is_shared_then_retried():
+    flights = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise ValueError("upstream failed")
+        return "result"
+
+    async def main():
+        failed = await asyncio.gather(*(flights.do("key", fn) for _ in range(5)), return_exceptions=True)
+        return failed, await flights.do("key", fn)
+
+    failed, retried = asyncio.run(main())
+    assert all(isinstance(e, ValueError) for e in failed)
+    assert retried == "result"
+    assert len(calls) == 2
+
+
+def test_summaries_make_one_upstream_call(api):
+    shared = text("one")
+
+    async def main():
+        return await asyncio.gather(*(summarizer.summarize_text_async(shared) for _ in range(50)))
+
+    assert asyncio.run(main()) == ["summary"] * 50
+    assert api.calls == 1
+    assert len(summarizer._flights) == 0
+
+
+def test_expired_deadline_leaves_the_call_running(api):
+    shared = text("deadline")
+
+    async def main():
+        short = summarizer.summarize_text_async(shared, deadline=time.monotonic() + 0.01)
+        long = summarizer.summarize_text_async(shared, deadline=time.monotonic() + 5)
+        return await asyncio.gather(short, long)
+
+    short, long = asyncio.run(main())
+    assert short == summarizer.fallback_summary(shared)
+    assert long == "summary"
+    assert api.calls == api.finished == 1
+
+
+def test_redis_lock_makes_one_call_across_workers(api, monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(summarizer, "get_redis", lambda: client)
+    monkeypatch.setattr(summarizer, "LOCK_POLL_INTERVAL", 0.01)
+    key = summarizer._cache_key(text("workers"), 120, 30)
+
+    async def main():
+        # Each direct call stands for a different worker: no SingleFlight between them
+        return await asyncio.gather(
+            *(summarizer._summarize_shared(key, "text", 120, 30) for _ in range(10))
+        )
+
+    assert asyncio.run(main()) == ["summary"] * 10
+    assert api.calls == 1
+    assert summarizer.LOCK_PREFIX + key.hex() not in client.data
+    assert client.data[summarizer.RESULT_PREFIX + key.hex()] == "summary"
+
+
+def test_redis_lock_is_released_when_the_call_fails(api, monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(summarizer, "get_redis", lambda: client)
+    api.summary = None
+    key = summarizer._cache_key(text("failure"), 120, 30)
+
+    assert asyncio.run(summarizer._summarize_shared(key, "text", 120, 30)) is None
+    assert client.releases == 1
+    assert client.data == {}
+
+
+def test_redis_lock_taken_over_is_not_released(api, monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(summarizer, "get_redis", lambda: client)
+    key = summarizer._cache_key(text("takeover"), 120, 30)
+    lock = summarizer.LOCK_PREFIX + key.hex()
+
+    async def expire_and_take_over():
+        await asyncio.sleep(0.05)
+        # The holder's lock expired and another worker holds it now
+        client.data[lock] = "another worker"
+
+    async def main():
+        return await asyncio.gather(
+            summarizer._summarize_shared(key, "text", 120, 30), expire_and_take_over()
+        )
+
+    summary, _ = asyncio.run(main())
+    assert summary == "summary"
+    assert client.data[lock] == "another worker"
+
+
+def test_redis_errors_fall_back_to_direct_calls(api, monkeypatch):
+    monkeypatch.setattr(summarizer, "get_redis", lambda: FakeRedis(fail=True))
+    shared = text("down")
+
+    async def main():
+        return await asyncio.gather(*(summarizer.summarize_text_async(shared) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["summary"] * 5
+    # SingleFlight still coalesces within the worker
+    assert api.calls == 1
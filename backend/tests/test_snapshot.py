@@ -0,0 +1,72 @@
+"""
+The compiled snapshot loads the same state it was written from, and is
+reused only while the snapshot version, the source files and every build
+parameter are unchanged.
+"""
+import shutil
+
+import pytest
+
+import app.database as database
+import app.utils.snapshot as snapshot
+from app.config import settings
+from app.database import source_digest
+from app.utils.snapshot import fingerprint, read_snapshot, write_snapshot
+from conftest import DATA_FILE
+
+
+def test_snapshot_round_trips_the_state(memory_state, tmp_path, queries):
+    path = tmp_path / "data.snapshot"
+    assert write_snapshot(path, memory_state.digest, memory_state)
+    assert [p.name for p in tmp_path.iterdir()] == ["data.snapshot"]
+    loaded = read_snapshot(path, memory_state.digest)
+    for q in queries[:50]:
+        assert loaded.index.search(q) == memory_state.index.search(q)
+        assert loaded.ranker.scores(q) == memory_state.ranker.scores(q)
+    assert loaded.hashes == memory_state.hashes
+    assert all(
+        loaded.fragments.record(pos) == memory_state.fragments.record(pos)
+        for pos in range(len(memory_state.store))
+    )
+
+
+def test_stale_or_damaged_snapshots_are_ignored(memory_state, tmp_path, monkeypatch):
+    source = tmp_path / "data.json"
+    shutil.copy(DATA_FILE, source)
+    digest = fingerprint([source], *database.build_parameters())
+    path = tmp_path / "data.snapshot"
+    write_snapshot(path, digest, memory_state.hashes)
+    assert read_snapshot(path, digest) == memory_state.hashes
+
+    with open(source, "ab") as f:
+        f.write(b" ")
+    assert read_snapshot(path, fingerprint([source], *database.build_parameters())) is None
+
+    monkeypatch.setattr(snapshot, "SNAPSHOT_VERSION", snapshot.SNAPSHOT_VERSION + 1)
+    assert read_snapshot(path, digest) is None
+    monkeypatch.undo()
+
+    path.write_bytes(path.read_bytes()[:100])
+    assert read_snapshot(path, digest) is None
+    assert read_snapshot(tmp_path / "missing.snapshot", digest) is None
+
+
+@pytest.mark.parametrize("name,value", [
+    ("BM25_K1", 2.0), ("BM25_B", 0.5), ("DEDUP_THRESHOLD", 0.5), ("NEIGHBORS", 3), ("TOPIC_NEIGHBORS", 5),
+])
+def test_build_settings_change_the_digest(monkeypatch, name, value):
+    before = source_digest()
+    monkeypatch.setattr(settings, name, value)
+    assert source_digest() != before
+
+
+def test_changing_a_build_setting_rebuilds(monkeypatch, tmp_path):
+    path = tmp_path / "data.snapshot"
+    monkeypatch.setattr(database, "SNAPSHOT_PATH", path)
+    assert database.load_indexes().neighbors.n == settings.NEIGHBORS
+    assert read_snapshot(path, source_digest()) is not None
+
+    monkeypatch.setattr(settings, "NEIGHBORS", 3)
+    assert read_snapshot(path, source_digest()) is None
+    assert database.load_indexes().neighbors.n == 3
+    assert read_snapshot(path, source_digest()).neighbors.n == 3
@@ -0,0 +1,59 @@
+"""
+The columnar store gives back every record exactly as normalized, with
+repeated values interned once, and keeps that through `take`.
+"""
+import json
+
+import pytest
+
+from app.utils.indexing import field_values, tokenize
+from app.utils.schema import normalize_record
+from app.utils.store import RecordStore
+from conftest import DATA_FILE
+
+
+@pytest.fixture(scope="module")
+def records():
+    with open(DATA_FILE, encoding="utf-8") as f:
+        return [normalize_record(item) for item in json.load(f)]
+
+
+@pytest.fixture(scope="module")
+def store(records):
+    return RecordStore(records)
+
+
+def test_records_round_trip(store, records):
+    assert len(store) == len(records)
+    for pos, record in enumerate(records):
+        assert store.record(pos) == record
+        assert dict(store[pos]) == record
+        assert store.record(pos, ("title", "keywords")) == {
+            "title": record["title"], "keywords": record["keywords"]
+        }
+        for field in store.searchable:
+            assert store.tokens(pos, field) == [
+                t for value in field_values(record, (field,)) for t in tokenize(value)
+            ]
+        assert store.lower_values(pos, store.searchable) == field_values(record, store.searchable)
+
+
+def test_repeated_values_are_interned(store, records):
+    organisms = {record["organism"] for record in records if record["organism"]}
+    assert len(store.dictionaries["organism"]) == len(organisms)
+    firsts = {}
+    for pos in range(len(store)):
+        for keyword in store.value(pos, "keywords"):
+            assert firsts.setdefault(keyword, keyword) is keyword
+
+
+def test_take_and_position(store, records):
+    positions = list(range(len(records) - 1, -1, -3))
+    taken = store.take(positions)
+    assert len(taken) == len(positions)
+    for i, pos in enumerate(positions):
+        assert taken.record(i) == records[pos]
+        assert taken.tokens(i, "detailed_description") == store.tokens(pos, "detailed_description")
+    record_id = records[positions[0]]["id"]
+    assert taken.position(f"  {record_id.lower()} ") == 0
+    assert taken.position("no such id") is None
@@ -0,0 +1,119 @@
+"""
+Async summaries go through one pooled client without blocking the event
+loop, parse API responses like the sync path, and fall back to truncated
+text on errors or when the deadline runs out.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import app.utils.summarizer as summarizer
+from app.config import settings
+
+
+def text(name: str) -> str:
+    """A text long enough to summarize, distinct per test so the cache never answers."""
+    return f"{name} {time.monotonic()} " + "microgravity alters gene expression in plants " * 10
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Serve the summarization API from `api.respond(request)` after `api.latency` seconds."""
+    monkeypatch.setenv("HF_API_TOKEN", "test")
+
+    class Api:
+        latency = 0.0
+        requests = []
+
+        @staticmethod
+        def respond(request):
+            return httpx.Response(200, json=[{"summary_text": "summary"}])
+
+    async def handler(request):
+        Api.requests.append(request)
+        await asyncio.sleep(Api.latency)
+        return Api.respond(request)
+
+    monkeypatch.setattr(summarizer, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return Api
+
+
+def test_client_is_shared_and_pooled():
+    async def main():
+        client = summarizer.get_client()
+        assert summarizer.get_client() is client
+        pool = client._transport._pool
+        assert pool._max_connections == pool._max_keepalive_connections == settings.SUMMARIZER_MAX_CONNECTIONS
+        await summarizer.close_client()
+        assert client.is_closed and summarizer.get_client() is not client
+        await summarizer.close_client()
+
+    asyncio.run(main())
+
+
+def test_requests_and_responses_match_the_sync_path(api):
+    api.respond = staticmethod(lambda request: httpx.Response(200, json=[{"summary_text": "short"}]))
+    body = text("request")
+    assert asyncio.run(summarizer.summarize_text_async(body, max_len=80, min_len=20)) == "short"
+    sent = api.requests[-1]
+    assert str(sent.url) == summarizer.HF_API_URL
+    assert sent.headers["authorization"] == "Bearer test"
+    expected = summarizer._request(body, "test", 80, 20)["json"]
+    assert httpx.Response(200, content=sent.content).json() == expected
+    # A second call is answered from the cache
+    assert asyncio.run(summarizer.summarize_text_async(body, max_len=80, min_len=20)) == "short"
+    assert len(api.requests) == 1
+
+    for response in (
+        httpx.Response(503, json={"estimated_time": 5}), httpx.Response(429), httpx.Response(500, text="oops"),
+        httpx.Response(200, json=[]), httpx.Response(200, text="not json"),
+    ):
+        api.respond = staticmethod(lambda request, response=response: response)
+        failed = text("failed")
+        assert asyncio.run(summarizer.summarize_text_async(failed)) == summarizer.fallback_summary(failed)
+
+    def unreachable(request):
+        raise httpx.ConnectError("unreachable", request=request)
+    api.respond = staticmethod(unreachable)
+    failed = text("unreachable")
+    assert asyncio.run(summarizer.summarize_text_async(failed)) == summarizer.fallback_summary(failed)
+
+
+def test_slow_summaries_do_not_block_the_loop(api):
+    api.latency = 0.3
+    texts = [text(f"concurrent {i}") for i in range(50)]
+
+    async def main():
+        ticks = []
+
+        async def heartbeat():
+            while len(ticks) < 10:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.02)
+
+        start = time.monotonic()
+        summaries, _ = await asyncio.gather(
+            asyncio.gather(*(summarizer.summarize_text_async(t) for t in texts)), heartbeat()
+        )
+        return summaries, time.monotonic() - start, ticks
+
+    summaries, elapsed, ticks = asyncio.run(main())
+    assert summaries == ["summary"] * 50 and len(api.requests) == 50
+    # Fifty 0.3 s calls overlap rather than queue, and the loop keeps running meanwhile
+    assert elapsed < 1.5
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.15
+
+
+def test_deadline_bounds_the_call(api):
+    api.latency = 2.0
+    slow = text("slow")
+    start = time.monotonic()
+    summary = asyncio.run(summarizer.summarize_text_async(slow, deadline=time.monotonic() + 0.2))
+    assert summary == summarizer.fallback_summary(slow)
+    assert time.monotonic() - start < 1.0
+    past = text("past")
+    assert asyncio.run(summarizer.summarize_text_async(past, deadline=time.monotonic() - 1)) == (
+        summarizer.fallback_summary(past)
+    )
@@ -0,0 +1,59 @@
+"""
+The shared summary cache counts its lookups on /metrics and keeps its file
+to the configured number of rows.
+"""
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+import app.utils.summary_cache as summary_cache
+from app.utils.summary_cache import SummaryCache, summary_key
+
+
+def key(n: int) -> bytes:
+    return summary_key("model", f"text {n}", 100, 10)
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Distinct store times, however fast the puts."""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(summary_cache, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def lookups(result: str) -> float:
+    return REGISTRY.get_sample_value("summary_cache_lookups_total", {"result": result}) or 0.0
+
+
+def test_lookups_are_exported(tmp_path):
+    before = {result: lookups(result) for result in ("memory_hit", "disk_hit", "miss")}
+    cache = SummaryCache(tmp_path / "summaries.sqlite", size=8)
+    assert cache.get(key(1)) is None
+    cache.put(key(1), "one")
+    assert cache.get(key(1)) == "one"
+    # Another worker finds it on disk
+    other = SummaryCache(tmp_path / "summaries.sqlite", size=8)
+    assert other.get(key(1)) == "one"
+    assert other.get(key(1)) == "one"
+
+    assert lookups("miss") - before["miss"] == 1
+    assert lookups("memory_hit") - before["memory_hit"] == 2
+    assert lookups("disk_hit") - before["disk_hit"] == 1
+    assert cache.report()["misses"] == 1 and other.report()["disk_hits"] == 1
+
+
+def test_put_prunes_oldest_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_cache, "PRUNE_INTERVAL", 10)
+    cache = SummaryCache(tmp_path / "summaries.sqlite", size=8, max_rows=50)
+    for n in range(205):
+        cache.put(key(n), str(n))
+    report = cache.report()
+    assert report["disk_entries"] == 55  # pruned to 50 at put 200, five since
+    assert report["pruned"] == 150
+
+    reader = SummaryCache(tmp_path / "summaries.sqlite", size=8)
+    assert reader.get(key(204)) == "204" and reader.get(key(150)) == "150"
+    assert reader.get(key(149)) is None
+
@@ -0,0 +1,79 @@
+"""
+Every keyword's related topics are its strongest PMI edges as a brute-force
+count over the records finds them, from memory or from the SQLite index,
+and free-text recommendations are expanded with them.
+"""
+import math
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from app.config import settings
+from app.utils.topics import MIN_COOCCURRENCE
+
+
+@pytest.fixture(scope="module")
+def expected_edges(memory_state):
+    """keyword -> [(related keyword, PMI, pair count)], strongest first."""
+    store = memory_state.store
+    records = [{k.lower() for k in store.value(pos, "keywords")} for pos in range(len(store))]
+    counts = Counter(k for keywords in records for k in keywords)
+    pairs = Counter(pair for keywords in records for pair in combinations(sorted(keywords), 2))
+    edges = {keyword: [] for keyword in counts}
+    for (a, b), together in pairs.items():
+        pmi = math.log(len(records) * together / (counts[a] * counts[b]))
+        if together >= MIN_COOCCURRENCE and pmi > 0:
+            edges[a].append((b, pmi, together))
+            edges[b].append((a, pmi, together))
+    return {
+        keyword: sorted(row, key=lambda e: (-e[1], -e[2], e[0]))[:settings.TOPIC_NEIGHBORS]
+        for keyword, row in edges.items()
+    }
+
+
+@pytest.mark.parametrize("backend", ["memory_state", "disk_state"])
+def test_related_topics_match_brute_force_pmi(request, expected_edges, backend):
+    topics = request.getfixturevalue(backend).topics
+    assert sorted(topics.keywords) == sorted(expected_edges)
+    mismatches = 0
+    for keyword, expected in expected_edges.items():
+        related = topics.related(keyword, limit=50)
+        got = [(r["keyword"], r["count"]) for r in related]
+        mismatches += got != [(other, together) for other, _, together in expected]
+        for r, (_, pmi, _) in zip(related, expected):
+            assert r["pmi"] == pytest.approx(pmi, abs=1e-3)
+    assert mismatches == 0
+    keyword = max(expected_edges, key=lambda k: len(expected_edges[k]))
+    assert len(topics.related(keyword.upper(), limit=3)) == 3
+    assert topics.related("no such keyword") == []
+
+
+def test_expansion_sums_pmi_over_query_keywords(memory_state, expected_edges):
+    topics = memory_state.topics
+    multiword = sorted(k for k in expected_edges if " " in k and expected_edges[k])
+    single = sorted(k for k in expected_edges if " " not in k and expected_edges[k])
+    for q in [f"{multiword[0]} and {single[0]}", multiword[1], f"{single[1]} {single[2]}"]:
+        found = topics.find(q)
+        assert found and all(k in q for k in found)
+        totals = {}
+        for keyword in found:
+            for other, pmi, together in expected_edges[keyword]:
+                total_pmi, total_count = totals.get(other, (0.0, 0))
+                totals[other] = (total_pmi + pmi, total_count + together)
+        for keyword in found:
+            totals.pop(keyword, None)
+        ranked = sorted(totals, key=lambda k: (-round(totals[k][0], 4), -totals[k][1], k))[:3]
+        assert topics.expand(q, 3) == ranked, q
+
+
+def test_routes_report_topics_and_expansion(client, serve, memory_state, expected_edges):
+    serve(memory_state)
+    keyword = next(k for k in sorted(expected_edges) if " " in k and len(expected_edges[k]) >= 5)
+    body = client.get("/recommend/topics", params={"q": f"{keyword} in space", "limit": 5}).json()
+    assert body["topics"][0]["keyword"] == keyword
+    assert [r["keyword"] for r in body["topics"][0]["related"]] == [
+        other for other, _, _ in expected_edges[keyword][:5]
+    ]
+    body = client.get("/recommend/", params={"q": keyword}).json()
+    assert body["expanded_with"] == memory_state.topics.expand(keyword, settings.TOPIC_EXPANSION)
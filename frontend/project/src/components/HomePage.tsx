@@ -1,6 +1,11 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { Home, Search, Compass, Cpu, Info } from "lucide-react";
 
+// At most 5 suggestion requests per second while typing, well inside the
+// backend's per-IP rate limit (RATE_LIMIT_PER_SECOND, 10) with room left
+// for the search requests a submit sends
+const SUGGEST_DEBOUNCE_MS = 200;
+
 export default function HomePage() {
   const [query, setQuery] = useState("");
   const [results, setResults] = useState<any[]>([]);
@@ -9,10 +14,37 @@ export default function HomePage() {
   const [nerResult, setNerResult] = useState<any>(null);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [suggestions, setSuggestions] = useState<string[]>([]);
 
   // Use VITE_API_URL if provided, otherwise default to backend FastAPI port 8000
   const API_BASE = import.meta.env.VITE_API_URL || "http://127.0.0.1:8000";
 
+  // Search-as-you-type suggestions, debounced and cancelled on each keystroke
+  useEffect(() => {
+    const prefix = query.trimStart();
+    if (!prefix || !/^[a-zA-Z0-9\s\-_]+$/.test(prefix)) {
+      setSuggestions([]);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const res = await fetch(
+          `${API_BASE}/autocomplete?q=${encodeURIComponent(prefix)}`,
+          { signal: controller.signal }
+        );
+        const data = await res.json();
+        setSuggestions((data.suggestions || []).map((s: any) => s.text));
+      } catch (err) {
+        if ((err as Error).name !== "AbortError") setSuggestions([]);
+      }
+    }, SUGGEST_DEBOUNCE_MS);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [query, API_BASE]);
+
   const handleSearch = async () => {
     if (!query) return;
     setLoading(true);
@@ -132,6 +164,7 @@ export default function HomePage() {
             <div className="max-w-3xl mx-auto flex gap-2">
               <input
                 type="text"
+                list="search-suggestions"
                 value={query}
                 onChange={(e) => setQuery(e.target.value)}
                 onKeyDown={(e) => {
@@ -140,6 +173,11 @@ export default function HomePage() {
                 placeholder="Search for space biology research"
                 className="flex-1 px-6 py-4 rounded-full bg-gray-900/80 border border-gray-700 text-white placeholder-gray-400 focus:outline-none focus:border-cyan-500 transition-colors backdrop-blur-sm"
               />
+              <datalist id="search-suggestions">
+                {suggestions.map((s) => (
+                  <option key={s} value={s} />
+                ))}
+              </datalist>
               <button
                 onClick={handleSearch}
                 className="px-8 py-4 rounded-full bg-cyan-500 text-white font-semibold hover:bg-cyan-600 transition-colors"
@@ -57,6 +57,13 @@ def get_tokenizer():
     return AutoTokenizer.from_pretrained('allenai/scibert_scivocab_uncased')
 
 
+def mean_pool(hidden: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+    """Mean of each text's token vectors, leaving out padding, so a text
+    embeds the same alone and in a batch."""
+    mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+    return (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+
+
 class InferenceRequest(BaseModel):
     text: str
 
@@ -92,7 +99,7 @@ async def predict(request: InferenceRequest):
         outputs = model(**inputs)
     
     # Process results
-    embeddings = outputs.last_hidden_state.mean(dim=1)
+    embeddings = mean_pool(outputs.last_hidden_state, inputs["attention_mask"])
     result = {
         "embeddings": embeddings[0].cpu().numpy().tolist()
     }
@@ -134,7 +141,7 @@ async def batch_predict(request: BatchInferenceRequest):
         outputs = model(**inputs)
     
     # Process results
-    embeddings = outputs.last_hidden_state.mean(dim=1)
+    embeddings = mean_pool(outputs.last_hidden_state, inputs["attention_mask"])
     results = [emb.cpu().numpy().tolist() for emb in embeddings]
     
     return {"embeddings": results}
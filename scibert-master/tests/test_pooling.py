@@ -0,0 +1,57 @@
+"""
+A text gets the same embedding from /predict and from /batch_predict,
+whatever the lengths of the texts batched with it.
+"""
+import pytest
+import torch
+from fastapi.testclient import TestClient
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+import app
+
+WORDS = "bone loss in mice during spaceflight microgravity muscle plant root growth radiation".split()
+TEXTS = [
+    "bone loss in mice",
+    "plant root growth during spaceflight in microgravity with radiation and muscle loss",
+    "radiation",
+]
+
+
+class NoCache:
+    def get(self, key):
+        return None
+
+    def setex(self, key, ttl, value):
+        pass
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab))
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(WORDS) + 5, hidden_size=32, num_hidden_layers=2,
+        num_attention_heads=4, intermediate_size=64,
+    )
+    model = BertModel(config).eval()
+    monkeypatch.setattr(app, "get_model", lambda: model)
+    monkeypatch.setattr(app, "get_tokenizer", lambda: tokenizer)
+    monkeypatch.setattr(app, "redis_client", NoCache())
+    monkeypatch.setattr(app.settings, "USE_CUDA", False)
+    return TestClient(app.app)
+
+
+def test_batched_embeddings_match_single(client):
+    batch = client.post("/batch_predict", json={"texts": TEXTS}).json()["embeddings"]
+    for text, batched in zip(TEXTS, batch):
+        alone = client.post("/predict", json={"text": text}).json()["embeddings"]
+        assert torch.allclose(torch.tensor(batched), torch.tensor(alone), atol=1e-5), text
+
+
+def test_mean_pool_ignores_padding():
+    hidden = torch.arange(12, dtype=torch.float32).reshape(2, 3, 2)
+    mask = torch.tensor([[1, 1, 1], [1, 0, 0]])
+    pooled = app.mean_pool(hidden, mask)
+    assert torch.equal(pooled, torch.tensor([[2.0, 3.0], [6.0, 7.0]]))